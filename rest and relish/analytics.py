@@ -0,0 +1,288 @@
+"""
+Revenue analytics.
+
+Reads revenue_rollups - paid orders and revenue per day by menu category,
+table, room type and order status, added to by every order as it is paid
+(see queries.ROLLUP_QUERIES) - instead of joining orders, order_items,
+menu_items and bookings. A year of one dimension is a few thousand rows
+read with one primary-key range scan, however many orders it summarises.
+
+Each dimension is loaded as columns into member x day matrices (NumPy
+arrays) and every question is answered for all members at once with
+whole-array operations:
+
+  * totals, share and average spend (revenue per order), e.g. per room type
+  * trend: daily revenue, its moving average and the least-squares slope
+  * percentiles of daily revenue
+  * comparison of the last `period` days with the `period` days before
+
+NumPy is optional: without it the same numbers are computed in plain
+Python, only more slowly.
+
+    python analytics.py                                  # every dimension, last 365 days
+    python analytics.py --dimension room_type --days 90 --format json
+    python analytics.py --backfill                        # rebuild the rollups from the orders
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import db
+import queries
+
+try:
+    import numpy as np
+except ImportError:  # analytics works without it, just slower
+    np = None
+
+DEFAULT_DAYS = 365
+DEFAULT_PERIOD = 30   # days compared with the ones before them
+MOVING_AVERAGE = 7    # days
+PERCENTILES = (25, 50, 75, 95)
+
+
+def fetch_rollups(conn, dimension, start, end):
+    """
+    (day, member, orders, items, revenue) of one dimension for the days in
+    [start, end); the day as 'YYYY-MM-DD' and revenue as a float, which
+    skips building a date and a Decimal for every row.
+    """
+    return db.stream(conn, """
+        SELECT CAST(day AS CHAR(10)), member, orders, items, CAST(revenue AS DOUBLE) FROM revenue_rollups
+        WHERE dimension = %s AND day >= %s AND day < %s
+        ORDER BY day, member
+    """, (dimension, start, end))
+
+
+class Rollup:
+    """
+    One dimension over the days [start, end), as columns: row i of the
+    member x day matrices `orders`, `items` and `revenue` is members[i].
+    They are NumPy arrays, or lists of lists without NumPy.
+    """
+
+    def __init__(self, dimension, start, end, rows):
+        self.dimension = dimension
+        self.start, self.end = start, end
+        self.days = (end - start).days
+        rows = list(rows)
+        self.members = sorted({row[1] for row in rows})
+        index = {member: i for i, member in enumerate(self.members)}
+        day_index = {(start + timedelta(days=d)).isoformat(): d for d in range(self.days)}
+        shape = (len(self.members), self.days)
+        if np is not None:
+            self.orders, self.items, self.revenue = np.zeros(shape), np.zeros(shape), np.zeros(shape)
+            if rows:
+                days, members, orders, items, revenue = zip(*rows)
+                at = (np.fromiter((index[m] for m in members), dtype=np.intp, count=len(rows)),
+                      np.fromiter((day_index[d] for d in days), dtype=np.intp, count=len(rows)))
+                # The primary key makes every (member, day) cell unique: plain assignment
+                self.orders[at] = np.array(orders, dtype=float)
+                self.items[at] = np.array(items, dtype=float)
+                self.revenue[at] = np.array(revenue, dtype=float)
+        else:
+            self.orders, self.items, self.revenue = ([[0.0] * self.days for _ in self.members] for _ in range(3))
+            for day, member, orders, items, revenue in rows:
+                i, d = index[member], day_index[day]
+                self.orders[i][d], self.items[i][d], self.revenue[i][d] = float(orders), float(items), float(revenue)
+
+
+def load(conn, dimension, start, end):
+    return Rollup(dimension, start, end, fetch_rollups(conn, dimension, start, end))
+
+
+# --- Whole-matrix operations (one result per member row) ---
+
+def _row_sums(m):
+    if np is not None:
+        return m.sum(axis=1)
+    return [sum(row) for row in m]
+
+
+def _column_sums(m, days):
+    if np is not None:
+        return m.sum(axis=0)
+    return [sum(column) for column in zip(*m)] if m else [0.0] * days
+
+
+def _moving_average(series, window):
+    """Trailing `window`-day mean of a daily series; the first days average what there is."""
+    if np is not None:
+        sums = np.cumsum(np.insert(series, 0, 0.0))
+        counts = np.minimum(np.arange(1, len(series) + 1), window)
+        return (sums[1:] - sums[np.maximum(np.arange(1, len(series) + 1) - window, 0)]) / counts
+    averages, total = [], 0.0
+    for d, value in enumerate(series):
+        total += value - (series[d - window] if d >= window else 0.0)
+        averages.append(total / min(d + 1, window))
+    return averages
+
+
+def _slopes(m, days):
+    """Least-squares slope of each row against the day number: revenue change per day."""
+    if days < 2:
+        return [0.0] * len(m)
+    mean_x = (days - 1) / 2
+    if np is not None:
+        x = np.arange(days) - mean_x
+        return m @ x / (x @ x)
+    x = [d - mean_x for d in range(days)]
+    xx = sum(v * v for v in x)
+    return [sum(a * b for a, b in zip(row, x)) / xx for row in m]
+
+
+def _percentiles(m, pcts):
+    """Per row, the `pcts` percentiles of its values (linear interpolation, as NumPy's default)."""
+    if np is not None:
+        if not len(m) or not m.shape[1]:
+            return [[0.0] * len(pcts) for _ in range(len(m))]
+        return np.percentile(m, pcts, axis=1).T
+    result = []
+    for row in m:
+        values = sorted(row)
+        found = []
+        for pct in pcts:
+            if not values:
+                found.append(0.0)
+                continue
+            position = (len(values) - 1) * pct / 100
+            low = int(position)
+            high = min(low + 1, len(values) - 1)
+            found.append(values[low] + (values[high] - values[low]) * (position - low))
+        result.append(found)
+    return result
+
+
+def _period_sums(m, first, last):
+    """Per row, the sum over the day columns [first, last)."""
+    if np is not None:
+        return m[:, first:last].sum(axis=1)
+    return [sum(row[first:last]) for row in m]
+
+
+# --- Report ---
+
+def _money(value):
+    return round(float(value), 2)
+
+
+def _change(now, before):
+    return round((now - before) * 100 / before, 1) if before else None
+
+
+def analyse(rollup, period=DEFAULT_PERIOD, window=MOVING_AVERAGE, pcts=PERCENTILES):
+    """Totals, trend, percentiles and period comparison for every member of `rollup`."""
+    days = rollup.days
+    revenue, orders, items = _row_sums(rollup.revenue), _row_sums(rollup.orders), _row_sums(rollup.items)
+    total = float(sum(revenue))
+    slopes = _slopes(rollup.revenue, days)
+    spreads = _percentiles(rollup.revenue, pcts)
+    period = min(period, days // 2)
+    current = _period_sums(rollup.revenue, days - period, days)
+    previous = _period_sums(rollup.revenue, days - 2 * period, days - period)
+
+    members = []
+    for i, member in enumerate(rollup.members):
+        members.append({
+            "member": member,
+            "revenue": _money(revenue[i]),
+            "orders": int(orders[i]),
+            "items": int(items[i]),
+            "share_pct": round(float(revenue[i]) * 100 / total, 1) if total else 0.0,
+            "average_spend": _money(revenue[i] / orders[i]) if orders[i] else None,
+            "trend_per_day": _money(slopes[i]),
+            "daily_percentiles": {f"p{pct}": _money(value) for pct, value in zip(pcts, spreads[i])},
+            "last_period": _money(current[i]),
+            "previous_period": _money(previous[i]),
+            "change_pct": _change(float(current[i]), float(previous[i])),
+        })
+    members.sort(key=lambda m: -m["revenue"])
+
+    daily = _column_sums(rollup.revenue, days)
+    return {
+        "dimension": rollup.dimension,
+        "revenue": _money(total),
+        "period_days": period,
+        "members": members,
+        "daily": [_money(v) for v in daily],
+        "moving_average": [_money(v) for v in _moving_average(daily, window)],
+    }
+
+
+def dashboard(conn, dimensions=queries.ROLLUP_DIMENSIONS, end=None, days=DEFAULT_DAYS, period=DEFAULT_PERIOD):
+    """analyse() of each dimension over the `days` days before `end` (default: up to and including today)."""
+    started = time.perf_counter()
+    end = end or date.today() + timedelta(days=1)
+    start = end - timedelta(days=days)
+    report = {"start": start.isoformat(), "end": end.isoformat(), "engine": "numpy" if np is not None else "python",
+              "generated_at": datetime.now().isoformat(timespec="seconds"), "dimensions": {}}
+    for dimension in dimensions:
+        report["dimensions"][dimension] = analyse(load(conn, dimension, start, end), period)
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    return report
+
+
+# --- Output ---
+
+def format_text(report):
+    lines = [f"REVENUE ANALYTICS - {report['start']} to {report['end']} (exclusive)", ""]
+    for dimension, result in report["dimensions"].items():
+        period = result["period_days"]
+        lines.append(f"BY {dimension.upper().replace('_', ' ')}   total {result['revenue']:,.2f}")
+        lines.append(f"  {'':<18}{'revenue':>14}{'share':>7}{'orders':>8}{'avg spend':>11}"
+                     f"{'p50/day':>10}{'trend/day':>11}{f'last {period}d':>13}{'change':>8}")
+        for m in result["members"]:
+            spend = f"{m['average_spend']:,.2f}" if m["average_spend"] is not None else "-"
+            change = f"{m['change_pct']:+.1f}%" if m["change_pct"] is not None else "-"
+            lines.append(f"  {str(m['member'])[:17]:<18}{m['revenue']:>14,.2f}{m['share_pct']:>6.1f}%{m['orders']:>8}"
+                         f"{spend:>11}{m['daily_percentiles']['p50']:>10,.2f}{m['trend_per_day']:>+11,.2f}"
+                         f"{m['last_period']:>13,.2f}{change:>8}")
+        lines.append("")
+    lines.append(f"Computed in {report['seconds']:.3f}s ({report['engine']})")
+    return "\n".join(lines) + "\n"
+
+
+def format_json(report):
+    return json.dumps(report, indent=2) + "\n"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rest & Relish revenue analytics")
+    parser.add_argument("--dimension", choices=queries.ROLLUP_DIMENSIONS, action="append",
+                        help="report just this dimension (repeatable; default: all)")
+    parser.add_argument("--days", type=int, default=DEFAULT_DAYS, help=f"days covered (default: {DEFAULT_DAYS})")
+    parser.add_argument("--end", type=date.fromisoformat, help="first day after the range (default: tomorrow)")
+    parser.add_argument("--period", type=int, default=DEFAULT_PERIOD, help="days compared with the ones before")
+    parser.add_argument("--format", choices=["text", "json"], default="text")
+    parser.add_argument("--output", help="write the report here (default: stdout)")
+    parser.add_argument("--backfill", action="store_true", help="rebuild the rollups from the orders first")
+    args = parser.parse_args(argv)
+
+    try:
+        pool = db.create_pool(size=1)
+    except db.Error as e:
+        raise SystemExit(f"Cannot connect to the database: {e}")
+    try:
+        with pool.connection() as conn:
+            if args.backfill:
+                started = time.perf_counter()
+                written = queries.backfill_rollups(conn)
+                print(f"Rebuilt {written} rollup rows in {time.perf_counter() - started:.2f}s", file=sys.stderr)
+            with pool.metrics.operation("analytics"):
+                report = dashboard(conn, args.dimension or queries.ROLLUP_DIMENSIONS, args.end, args.days, args.period)
+    finally:
+        pool.close()
+
+    output = (format_json if args.format == "json" else format_text)(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+        print(f"Analytics written to {args.output} ({report['seconds']:.2f}s)", file=sys.stderr)
+    else:
+        sys.stdout.write(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,407 @@
+"""
+HTTP/JSON API for tablets and POS terminals.
+
+One asyncio process serves every terminal from a single connection pool,
+one reference cache and one availability index, instead of each terminal
+running a full Tk client with its own database connections. Requests are
+parsed on the event loop; the service calls (services.py) run on a worker
+thread per pooled connection.
+
+    python api.py --host 0.0.0.0 --port 8080
+
+    GET  /health
+    GET  /metrics                        Prometheus text (?format=json for a JSON snapshot)
+    GET  /rooms
+    GET  /rooms/available?check_in=YYYY-MM-DD&check_out=YYYY-MM-DD
+    GET  /rooms/{room_number}/booking
+    GET  /guests?q=ann+sm                type-ahead guest search (name, email or phone prefixes)
+    GET  /tables
+    GET  /menu
+    GET  /bookings/{booking_id}/folio
+    POST /bookings                       {"first_name", "last_name", "email", "phone",
+                                          "room_id", "check_in", "check_out", "guest_id"?}
+    POST /bookings/group                 {"check_in", "check_out", "guests": [{"first_name", "last_name",
+                                          "email"?, "phone"?, "room_type"?, "room_id"?}]}
+    POST /bookings/{booking_id}/checkout
+    POST /orders                         {"table_id", "items": [{"item_id", "quantity"}],
+                                          "room_number"?}
+
+Responses are JSON; money is sent as a decimal string ("1250.00") so no
+precision is lost. Errors come back as {"error": "..."} with 400 (bad
+input), 404, 409 (room already booked; an order for a table that has an
+open tab, which is paid from the till holding it) or 500.
+"""
+import argparse
+import asyncio
+import json
+import re
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+from urllib.parse import parse_qs, urlsplit
+
+import availability
+import changefeed
+import db
+import guest_index
+import queries
+import services
+from cache import ReferenceCache
+from changefeed import ChangeFeed
+from metrics import operation_name
+
+CHANGE_POLL_SECONDS = 3
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large",
+           500: "Internal Server Error"}
+
+
+class RawResponse:
+    """A non-JSON response body."""
+
+    def __init__(self, text, content_type):
+        self.body = text.encode("utf-8")
+        self.content_type = content_type
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _records(rows):
+    """db.Row tuples as JSON objects (json would write a tuple as an array)."""
+    return [row._asdict() if isinstance(row, db.Row) else row for row in rows]
+
+
+def encode_json(data):
+    return json.dumps(data, default=_json_default).encode("utf-8")
+
+
+class ApiServer:
+    def __init__(self, pool, cache=None):
+        self.pool = pool
+        self.cache = cache or ReferenceCache(max_age={"menu": 600})
+        self.workers = ThreadPoolExecutor(max_workers=pool.size, thread_name_prefix="api-worker")
+        self.availability = None
+        self.guests = None
+        self.change_feed = None
+        self._server = None
+        self._tasks = []
+        self.routes = [
+            ("GET", r"/health", self.health),
+            ("GET", r"/metrics", self.metrics),
+            ("GET", r"/rooms", self.rooms),
+            ("GET", r"/rooms/available", self.available_rooms),
+            ("GET", r"/rooms/(?P<room_number>[^/]+)/booking", self.room_booking),
+            ("GET", r"/guests", self.search_guests),
+            ("GET", r"/tables", self.tables),
+            ("GET", r"/menu", self.menu),
+            ("GET", r"/bookings/(?P<booking_id>\d+)/folio", self.folio),
+            ("POST", r"/bookings", self.check_in),
+            ("POST", r"/bookings/group", self.group_check_in),
+            ("POST", r"/bookings/(?P<booking_id>\d+)/checkout", self.check_out),
+            ("POST", r"/orders", self.create_order),
+        ]
+        self.routes = [(method, re.compile(pattern + "$"), handler) for method, pattern, handler in self.routes]
+
+    # --- Running service calls ---
+
+    def _run(self, fn, args):
+        # Runs on a worker thread
+        with self.pool.metrics.operation(operation_name(fn)), self.pool.connection() as conn:
+            return fn(conn, *args)
+
+    async def call(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.workers, self._run, fn, args)
+
+    async def cached(self, name, fetch):
+        entry = self.cache.lookup(name)
+        if entry is None:
+            version = self.cache.version(name)
+            entry = self.cache.store(name, version, await self.call(fetch))
+        return entry.rows
+
+    # --- Handlers: (params, query, body) -> (status, data) ---
+
+    async def health(self, params, query, body):
+        return 200, {"status": "ok", "backend": self.pool.backend.name, "cache": self.cache.stats()}
+
+    async def metrics(self, params, query, body):
+        if query.get("format") == "json":
+            return 200, self.pool.metrics.snapshot()
+        return 200, RawResponse(self.pool.metrics.to_prometheus(), "text/plain; version=0.0.4; charset=utf-8")
+
+    async def rooms(self, params, query, body):
+        return 200, _records(await self.cached("rooms", queries.fetch_rooms))
+
+    async def available_rooms(self, params, query, body):
+        check_in, check_out = services.parse_stay(query.get("check_in"), query.get("check_out"))
+        if self.availability is None:
+            return 200, await self.call(services.available_rooms, check_in, check_out)
+        rooms = await self.cached("rooms", queries.fetch_rooms)
+        free = self.availability.free_rooms(rooms, check_in, check_out)
+        return 200, [{k: room[k] for k in ("room_id", "room_number", "room_type", "price_per_night")} for room in free]
+
+    async def room_booking(self, params, query, body):
+        booking_id = await self.call(services.find_booking, params["room_number"])
+        return 200, {"room_number": params["room_number"], "booking_id": booking_id}
+
+    async def search_guests(self, params, query, body):
+        text = query.get("q", "")
+        try:
+            limit = max(1, min(int(query.get("limit", 20)), 100))
+        except ValueError:
+            raise HTTPError(400, "limit must be a number.")
+        if self.guests is None:
+            return 200, await self.call(services.search_guests, text, limit)
+        return 200, self.guests.search(text, limit)
+
+    async def tables(self, params, query, body):
+        return 200, _records(await self.cached("tables", queries.fetch_tables))
+
+    async def menu(self, params, query, body):
+        return 200, _records(await self.cached("menu", queries.fetch_menu))
+
+    async def folio(self, params, query, body):
+        return 200, await self.call(services.booking_folio, params["booking_id"])
+
+    async def check_in(self, params, query, body):
+        booking = await self.call(
+            services.check_in, body.get("first_name"), body.get("last_name"), body.get("email"),
+            body.get("phone"), body.get("room_id"), body.get("check_in"), body.get("check_out"), body.get("guest_id"))
+        self.cache.invalidate("rooms")
+        if self.availability is not None:
+            self.availability.set_booking(booking['booking_id'], booking['room_id'],
+                                          booking['check_in_date'], booking['check_out_date'])
+        return 201, booking
+
+    async def group_check_in(self, params, query, body):
+        guests = body.get("guests")
+        if not isinstance(guests, list) or not all(isinstance(g, dict) for g in guests):
+            raise HTTPError(400, "guests must be a list of objects.")
+        bookings = await self.call(services.group_check_in, guests, body.get("check_in"), body.get("check_out"))
+        self.cache.invalidate("rooms")
+        if self.availability is not None:
+            for booking in bookings:
+                self.availability.set_booking(booking['booking_id'], booking['room_id'],
+                                              booking['check_in_date'], booking['check_out_date'])
+        return 201, bookings
+
+    async def check_out(self, params, query, body):
+        folio = await self.call(services.check_out, params["booking_id"])
+        self.cache.invalidate("rooms")
+        if self.availability is not None:
+            self.availability.drop_booking(folio['booking_id'])
+        return 200, folio
+
+    async def create_order(self, params, query, body):
+        items, _ = await self.call(services.price_items, body.get("items"))
+        order = await self.call(services.place_order, body.get("table_id"), items, body.get("room_number"))
+        self.cache.invalidate("tables")
+        return 201, order
+
+    # --- HTTP ---
+
+    async def dispatch(self, method, target, body_bytes):
+        url = urlsplit(target)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        allowed = False
+        for route_method, pattern, handler in self.routes:
+            match = pattern.match(url.path)
+            if match is None:
+                continue
+            if route_method != method:
+                allowed = True
+                continue
+            body = {}
+            if body_bytes:
+                try:
+                    body = json.loads(body_bytes)
+                except ValueError:
+                    raise HTTPError(400, "Request body is not valid JSON.")
+                if not isinstance(body, dict):
+                    raise HTTPError(400, "Request body must be a JSON object.")
+            return await handler(match.groupdict(), query, body)
+        if allowed:
+            raise HTTPError(405, f"{method} is not allowed on {url.path}.")
+        raise HTTPError(404, f"No such endpoint: {url.path}")
+
+    async def respond(self, method, target, body_bytes):
+        try:
+            return await self.dispatch(method, target, body_bytes)
+        except HTTPError as e:
+            return e.status, {"error": str(e)}
+        except services.NotFound as e:
+            return 404, {"error": str(e)}
+        except services.Conflict as e:
+            return 409, {"error": str(e)}
+        except services.ServiceError as e:
+            return 400, {"error": str(e)}
+        except db.Error as e:
+            return 500, {"error": f"Database error: {e}"}
+        except Exception:
+            # A bug, not bad input: log it and still answer, rather than drop the connection
+            print(f"Unhandled error in {method} {target}:")
+            traceback.print_exc()
+            return 500, {"error": "Internal server error."}
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                except asyncio.LimitOverrunError:
+                    await self._write(writer, 413, {"error": "Request headers too large."}, close=True)
+                    return
+
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    await self._write(writer, 400, {"error": "Malformed request line."}, close=True)
+                    return
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get("content-length", 0) or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._write(writer, 400, {"error": "Invalid Content-Length."}, close=True)
+                    return
+                if length > MAX_BODY_BYTES:
+                    await self._write(writer, 413, {"error": "Request body too large."}, close=True)
+                    return
+                body = await reader.readexactly(length) if length else b""
+
+                close = (headers.get("connection", "").lower() == "close"
+                         or version == "HTTP/1.0" and headers.get("connection", "").lower() != "keep-alive")
+                status, data = await self.respond(method.upper(), target, body)
+                await self._write(writer, status, data, close=close)
+                if close:
+                    return
+        finally:
+            writer.close()
+
+    async def _write(self, writer, status, data, close=False):
+        if isinstance(data, RawResponse):
+            payload, content_type = data.body, data.content_type
+        else:
+            payload, content_type = encode_json(data), "application/json; charset=utf-8"
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n".encode("latin-1") + payload
+        )
+        await writer.drain()
+
+    # --- Other terminals' changes ---
+
+    async def follow_changes(self):
+        """
+        Keeps the cache and availability index current with writes made
+        elsewhere. A failure is logged and retried on the next poll: were
+        this task to end, the index would go stale for good.
+        """
+        rooms_day = date.today()
+        while True:
+            if rooms_day != date.today():
+                rooms_day = date.today()
+                self.cache.invalidate("rooms")  # reservations starting today are now occupied
+            try:
+                if self.change_feed is None:
+                    await self._load_indexes()
+                else:
+                    await self._apply_changes()
+            except db.Error as e:
+                print(f"Change feed poll failed: {e}")
+            except Exception:
+                print("Change feed poll failed:")
+                traceback.print_exc()
+                self.change_feed = None  # changes may be half applied: reload the indexes
+            await asyncio.sleep(CHANGE_POLL_SECONDS)
+
+    async def _load_indexes(self):
+        # The feed position is read first, so nothing committed while the indexes load is missed
+        since = await self.call(changefeed.fetch_current_seq)
+        self.availability = await self.call(availability.load_index)
+        self.guests = await self.call(guest_index.load_index)
+        self.change_feed = ChangeFeed(since=since)
+
+    async def _apply_changes(self):
+        result = await self.call(changefeed.fetch_changes, self.change_feed.since)
+        fresh = self.change_feed.advance(result["changes"])
+        entities = {c['entity'] for c in fresh}
+        if 'room' in entities:
+            self.cache.patch("rooms", "room_id", result["room_ids"], result["rooms"],
+                             sort_key=lambda r: r['room_number'])
+        if 'table' in entities:
+            self.cache.patch("tables", "table_id", result["table_ids"], result["tables"],
+                             sort_key=lambda t: t['table_number'])
+        if 'booking' in entities:
+            self.availability.apply(result["bookings"])
+        if 'guest' in entities:
+            self.guests.apply(result["guests"])
+
+    # --- Lifecycle ---
+
+    async def start(self, host="127.0.0.1", port=8080):
+        self._server = await asyncio.start_server(self.handle_connection, host, port, limit=MAX_HEADER_BYTES)
+        self._tasks.append(asyncio.create_task(self.follow_changes()))
+        return self._server
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.workers.shutdown(wait=True)
+
+
+async def serve(host, port):
+    pool = db.create_pool()
+    server = ApiServer(pool)
+    listener = await server.start(host, port)
+    print(f"Rest & Relish API on {', '.join(str(s.getsockname()) for s in listener.sockets)} ({pool.backend.name})")
+    try:
+        await listener.serve_forever()
+    finally:
+        await server.stop()
+        pool.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rest & Relish HTTP/JSON API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
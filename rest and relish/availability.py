@@ -0,0 +1,124 @@
+"""
+Date-range room availability.
+
+Every room gets a bitmap of its booked nights, held as a Python int: bit i
+is set when the night starting on `start + i days` is taken. A stay from
+check-in to check-out occupies the nights [check_in, check_out), so the
+guest checking out on the 15th and the one checking in on the 15th don't
+clash. "Is room R free from the 12th to the 15th" is then a single AND
+against a mask, and a search over hundreds of rooms for a year-long
+horizon takes well under a millisecond.
+
+The index is built once from the active bookings (load_index) and kept up
+to date from the change feed. It only answers searches; the database is
+still the authority, and queries.check_in_guest re-checks for an
+overlapping booking inside its transaction.
+"""
+from datetime import date
+
+
+def fetch_booked_ranges(conn, since):
+    """Active bookings that still hold at least one night on or after `since`."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT booking_id, room_id, check_in_date, check_out_date
+            FROM bookings
+            WHERE is_active = 1 AND check_out_date > %s
+        """, (since,))
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def fetch_booking_ranges(conn, booking_ids):
+    """Current (booking_id, room_id, check_in, check_out, is_active) of the given bookings."""
+    booking_ids = list(booking_ids)
+    if not booking_ids:
+        return []
+    cursor = conn.cursor()
+    try:
+        placeholders = ", ".join(["%s"] * len(booking_ids))
+        cursor.execute(f"""
+            SELECT booking_id, room_id, check_in_date, check_out_date, is_active
+            FROM bookings
+            WHERE booking_id IN ({placeholders})
+        """, booking_ids)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def load_index(conn, start=None):
+    """Runs on a worker thread. Builds an AvailabilityIndex from today onwards."""
+    index = AvailabilityIndex(start or date.today())
+    for booking_id, room_id, check_in, check_out in fetch_booked_ranges(conn, index.start):
+        index.set_booking(booking_id, room_id, check_in, check_out)
+    return index
+
+
+def _as_date(value):
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+
+class AvailabilityIndex:
+    def __init__(self, start):
+        self.start = start
+        self._nights = {}     # room_id -> bitmap of booked nights
+        self._bookings = {}   # booking_id -> room_id
+        self._masks = {}      # room_id -> {booking_id: mask}
+
+    def _mask(self, check_in, check_out):
+        # Nights before `start` are in the past and never searched for
+        first = max((_as_date(check_in) - self.start).days, 0)
+        last = (_as_date(check_out) - self.start).days
+        if last <= first:
+            return 0
+        return ((1 << (last - first)) - 1) << first
+
+    def set_booking(self, booking_id, room_id, check_in, check_out):
+        """Adds a booking, or moves it if it was already indexed."""
+        self.drop_booking(booking_id)
+        mask = self._mask(check_in, check_out)
+        if mask:
+            self._bookings[booking_id] = room_id
+            self._masks.setdefault(room_id, {})[booking_id] = mask
+            self._nights[room_id] = self._nights.get(room_id, 0) | mask
+
+    def drop_booking(self, booking_id):
+        """Forgets a checked-out or cancelled booking."""
+        room_id = self._bookings.pop(booking_id, None)
+        if room_id is None:
+            return
+        masks = self._masks[room_id]
+        del masks[booking_id]
+        # Rebuilt rather than cleared, in case older data has overlapping stays
+        bitmap = 0
+        for mask in masks.values():
+            bitmap |= mask
+        self._nights[room_id] = bitmap
+
+    def apply(self, ranges):
+        """Applies fetch_booking_ranges() rows, e.g. from the change feed."""
+        for booking_id, room_id, check_in, check_out, is_active in ranges:
+            if is_active:
+                self.set_booking(booking_id, room_id, check_in, check_out)
+            else:
+                self.drop_booking(booking_id)
+
+    def is_free(self, room_id, check_in, check_out):
+        return not self._nights.get(room_id, 0) & self._mask(check_in, check_out)
+
+    def free_rooms(self, rooms, check_in, check_out, key='room_id'):
+        """Filters `rooms` (rows with a `key` column) down to those free for the whole stay."""
+        mask = self._mask(check_in, check_out)
+        nights = self._nights
+        return [room for room in rooms if not nights.get(room[key], 0) & mask]
+
+    def occupancy(self, night):
+        """Number of rooms booked for the night starting on `night`."""
+        offset = (_as_date(night) - self.start).days
+        if offset < 0:
+            return 0
+        bit = 1 << offset
+        return sum(1 for bitmap in self._nights.values() if bitmap & bit)
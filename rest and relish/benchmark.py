@@ -0,0 +1,417 @@
+"""
+Benchmarks for every query path the windows use.
+
+Generates (or reuses) a synthetic database with datagen.py, then times each
+operation behind the GUI - the same functions the Tk windows submit to the
+executor - and writes the timings as JSON so runs can be compared across
+releases. The embedded SQLite backend is the default, so it runs offline.
+
+    python benchmark.py                                  # small profile, scratch file
+    python benchmark.py --profile large --db bench.db    # generated once, reused after
+    python benchmark.py --output results/1.4.json --repeat 200
+
+Each result records count, min, mean, p50, p95, p99 and max in
+milliseconds, next to the data sizes, backend, Python/SQLite versions and
+git revision of the run.
+
+The contention section then has CONTENTION_THREADS terminals (threads,
+each with its own pooled connection) check in at the same instant - into
+distinct rooms and all into one room, as reservations and as walk-ins -
+and check out again, reporting throughput, latency, conflicts, retries and
+any double booking (there must be none):
+
+    python benchmark.py --contention 20 --rounds 10
+    python benchmark.py --contention 0                   # skip it
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import analytics
+import availability
+import changefeed
+import datagen
+import db
+import queries
+import services
+
+DEFAULT_REPEAT = 50
+CONTENTION_THREADS = 20
+CONTENTION_ROUNDS = 5
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(int(round(pct / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def summarize(samples):
+    ms = sorted(s * 1000 for s in samples)
+    return {
+        "count": len(ms),
+        "min_ms": round(ms[0], 4),
+        "mean_ms": round(sum(ms) / len(ms), 4),
+        "p50_ms": round(percentile(ms, 50), 4),
+        "p95_ms": round(percentile(ms, 95), 4),
+        "p99_ms": round(percentile(ms, 99), 4),
+        "max_ms": round(ms[-1], 4),
+    }
+
+
+def time_op(fn, repeat, warmup=1):
+    """Calls fn(i) warmup + repeat times and returns the timed samples (seconds)."""
+    for i in range(warmup):
+        fn(-1 - i)
+    samples = []
+    for i in range(repeat):
+        started = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def _count(conn, table):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        return cursor.fetchone()[0]
+    finally:
+        cursor.close()
+
+
+def _ids(conn, sql, params=()):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+# --- Operations ---
+# name (after the GUI method it stands for) -> fn(conn, fixture, i); reads first, writes last
+
+def operations():
+    def room_dashboard(conn, fx, i):
+        queries.fetch_rooms(conn)
+
+    def active_bookings(conn, fx, i):
+        page = queries.fetch_active_bookings_page(conn, "after", None, 50)
+        if page:
+            queries.fetch_active_bookings_page(conn, "after", (page[-1]['room_number'], page[-1]['booking_id']), 50)
+
+    def booking_folio(conn, fx, i):
+        services.booking_folio(conn, fx.rng.choice(fx.active))
+
+    def booking_from_room(conn, fx, i):
+        services.find_booking(conn, fx.rng.choice(fx.occupied_rooms))
+
+    def active_folios(conn, fx, i):
+        queries.fetch_active_folios(conn)
+
+    def free_rooms_sql(conn, fx, i):
+        start = date.today() + timedelta(days=fx.rng.randint(0, 300))
+        queries.fetch_free_rooms(conn, start, start + timedelta(days=3))
+
+    def free_rooms_index(conn, fx, i):
+        start = date.today() + timedelta(days=fx.rng.randint(0, 300))
+        fx.index.free_rooms(fx.rooms, start, start + timedelta(days=3))
+
+    def menu(conn, fx, i):
+        queries.fetch_menu(conn)
+
+    def tables(conn, fx, i):
+        queries.fetch_tables(conn)
+
+    def order_history(conn, fx, i):
+        page = queries.fetch_orders_page(conn, "after", None, 50)
+        if page:
+            queries.fetch_orders_page(conn, "after", page[-1]['order_id'], 50)
+            queries.fetch_order_items(conn, page[0]['order_id'])
+
+    def change_feed(conn, fx, i):
+        changefeed.fetch_changes(conn, fx.seq)
+
+    def revenue_dashboard(conn, fx, i):
+        analytics.dashboard(conn)
+
+    def order_paid(conn, fx, i):
+        items, _ = services.price_items(conn, fx.order_lines())
+        services.place_order(conn, fx.rng.choice(fx.table_ids), items)
+
+    def order_to_room(conn, fx, i):
+        items, _ = services.price_items(conn, fx.order_lines())
+        services.place_order(conn, fx.rng.choice(fx.table_ids), items, fx.rng.choice(fx.occupied_rooms))
+
+    def check_in_out(conn, fx, i):
+        # A reservation far in the future, cancelled straight away
+        start = date.today() + timedelta(days=1000 + 3 * (i + 10))
+        booking = services.check_in(conn, "Bench", "Guest", None, None, fx.rng.choice(fx.room_ids),
+                                    start, start + timedelta(days=2))
+        services.check_out(conn, booking['booking_id'])
+
+    return {
+        "refresh_room_dashboard": room_dashboard,
+        "load_active_bookings": active_bookings,
+        "get_booking_folio": booking_folio,
+        "get_booking_id_from_room": booking_from_room,
+        "active_folios": active_folios,
+        "available_rooms_sql": free_rooms_sql,
+        "available_rooms_index": free_rooms_index,
+        "load_menu": menu,
+        "refresh_table_dashboard": tables,
+        "order_history_page": order_history,
+        "poll_changes": change_feed,
+        "analytics_dashboard": revenue_dashboard,
+        "create_order_paid": order_paid,
+        "create_order_charged_to_room": order_to_room,
+        "check_in_and_out": check_in_out,
+    }
+
+
+class Fixture:
+    """Ids the operations pick from, loaded once before timing starts."""
+
+    def __init__(self, conn, seed):
+        self.rng = random.Random(seed)
+        self.active = _ids(conn, "SELECT booking_id FROM bookings WHERE is_active = 1")
+        self.occupied_rooms = _ids(conn, """
+            SELECT r.room_number FROM rooms r JOIN bookings b ON b.room_id = r.room_id
+            WHERE b.is_active = 1 AND b.check_in_date <= %s
+        """, (date.today(),))
+        self.room_ids = _ids(conn, "SELECT room_id FROM rooms")
+        self.table_ids = _ids(conn, "SELECT table_id FROM tables")
+        self.item_ids = _ids(conn, "SELECT item_id FROM menu_items")
+        self.rooms = queries.fetch_rooms(conn)
+        self.index = availability.load_index(conn)
+        self.seq = changefeed.fetch_current_seq(conn)
+        if not (self.active and self.occupied_rooms and self.table_ids and self.item_ids):
+            raise SystemExit("The database needs rooms in use, tables and menu items; generate data first.")
+
+    def order_lines(self):
+        return [{"item_id": item_id, "quantity": self.rng.randint(1, 3)}
+                for item_id in self.rng.sample(self.item_ids, min(3, len(self.item_ids)))]
+
+
+# --- Contention ---
+
+def _contend(pool, rooms, start, rounds):
+    """
+    `rounds` times, len(rooms) threads check in at once (thread t into
+    rooms[t]) for two nights from `start`, then check out - which frees the
+    rooms for the next round - at once. Returns the scenario's summary.
+    """
+    threads = len(rooms)
+    stats = {"check_in": [], "check_out": [], "conflicts": 0, "errors": [], "double_bookings": 0}
+    wall = {"check_in": 0.0, "check_out": 0.0}
+    lock = threading.Lock()
+    retries_before = sum(pool.metrics.snapshot()["retries"].values())
+
+    for _ in range(rounds):
+        barrier = threading.Barrier(threads + 1)
+        booked = [None] * threads
+
+        def terminal(t):
+            with pool.connection() as conn:
+                barrier.wait()
+                started = time.perf_counter()
+                try:
+                    with pool.metrics.operation("check_in"):
+                        booked[t] = services.check_in(conn, "Bench", f"Desk{t}", None, None, rooms[t],
+                                                      start, start + timedelta(days=2))['booking_id']
+                except services.Conflict:
+                    with lock:
+                        stats["conflicts"] += 1
+                except Exception as e:
+                    with lock:
+                        stats["errors"].append(str(e))
+                elapsed = time.perf_counter() - started
+                barrier.wait()  # every check-in done
+                barrier.wait()  # go
+                started_out = time.perf_counter()
+                if booked[t]:
+                    try:
+                        with pool.metrics.operation("check_out"):
+                            services.check_out(conn, booked[t])
+                    except Exception as e:
+                        with lock:
+                            stats["errors"].append(str(e))
+                with lock:
+                    stats["check_in"].append(elapsed)
+                    if booked[t]:
+                        stats["check_out"].append(time.perf_counter() - started_out)
+
+        workers = [threading.Thread(target=terminal, args=(t,)) for t in range(threads)]
+        for w in workers:
+            w.start()
+        barrier.wait()
+        started = time.perf_counter()
+        barrier.wait()
+        wall["check_in"] += time.perf_counter() - started
+        started = time.perf_counter()
+        barrier.wait()
+        for w in workers:
+            w.join()
+        wall["check_out"] += time.perf_counter() - started
+
+        per_room = {}
+        for t, booking_id in enumerate(booked):
+            if booking_id:
+                per_room[rooms[t]] = per_room.get(rooms[t], 0) + 1
+        stats["double_bookings"] += sum(n - 1 for n in per_room.values())
+
+    checked_in = len(stats["check_out"])
+    return {
+        "threads": threads,
+        "rounds": rounds,
+        "check_ins": checked_in,
+        "conflicts": stats["conflicts"],
+        "double_bookings": stats["double_bookings"],
+        "retries": sum(pool.metrics.snapshot()["retries"].values()) - retries_before,
+        "errors": stats["errors"][:5],
+        "error_count": len(stats["errors"]),
+        "attempts_per_second": round(threads * rounds / wall["check_in"], 1),
+        "check_ins_per_second": round(checked_in / wall["check_in"], 1),
+        "check_outs_per_second": round(checked_in / wall["check_out"], 1) if checked_in else None,
+        "check_in": summarize(stats["check_in"]),
+        "check_out": summarize(stats["check_out"]) if stats["check_out"] else None,
+    }
+
+
+def run_contention(backend, threads=CONTENTION_THREADS, rounds=CONTENTION_ROUNDS, seed=42, progress=None):
+    pool = db.create_pool(backend, size=threads, migrate=False)
+    try:
+        with pool.connection() as conn:
+            room_ids = _ids(conn, "SELECT room_id FROM rooms ORDER BY room_id")
+            # Walk-ins need rooms nobody is in and nobody has booked for the next two nights
+            today = date.today()
+            empty = {room['room_id'] for room in queries.fetch_rooms(conn) if not room['occupied']}
+            vacant = [r['room_id'] for r in queries.fetch_free_rooms(conn, today, today + timedelta(days=2))
+                      if r['room_id'] in empty]
+        rng = random.Random(seed)
+        # Far-future reservations, clear of the check_in_and_out operation's dates
+        future = today + timedelta(days=5000)
+        scenarios = {
+            "reserve_distinct_rooms": (rng.sample(room_ids, min(threads, len(room_ids))), future),
+            "reserve_same_room": ([rng.choice(room_ids)] * threads, future),
+        }
+        if len(vacant) >= threads:
+            scenarios["walk_in_distinct_rooms"] = (rng.sample(vacant, threads), today)
+        if vacant:
+            scenarios["walk_in_same_room"] = ([rng.choice(vacant)] * threads, today)
+        results = {}
+        for name, (rooms, start) in scenarios.items():
+            results[name] = _contend(pool, rooms, start, rounds)
+            if progress:
+                progress(name, results[name])
+        return results
+    finally:
+        pool.close()
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(conn, backend_name, repeat, only=None, seed=42, progress=None):
+    fixture = Fixture(conn, seed)
+    sizes = {table: _count(conn, table) for table in
+             ("rooms", "tables", "menu_items", "guests", "bookings", "orders", "order_items")}
+    ops = operations()
+    results = {}
+    for name, op in ops.items():
+        if only and name not in only:
+            continue
+        samples = time_op(lambda i: op(conn, fixture, i), repeat)
+        results[name] = summarize(samples)
+        if progress:
+            progress(name, results[name])
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": _git_revision(),
+            "backend": backend_name,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version if backend_name == "sqlite" else None,
+            "repeat": repeat,
+            "sizes": sizes,
+        },
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark every Rest & Relish query path")
+    parser.add_argument("--backend", choices=["sqlite", "mysql"], default="sqlite")
+    parser.add_argument("--db", help="SQLite file; generated on first use, reused afterwards (default: scratch file)")
+    parser.add_argument("--database", help="scratch MySQL database (with --backend mysql)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--only", nargs="+", metavar="OPERATION", help="run just these operations")
+    parser.add_argument("--contention", type=int, default=CONTENTION_THREADS, metavar="THREADS",
+                        help=f"simultaneous check-ins (default: {CONTENTION_THREADS}; 0 skips the contention runs)")
+    parser.add_argument("--rounds", type=int, default=CONTENTION_ROUNDS, help="contention rounds per scenario")
+    parser.add_argument("--output", help="write the JSON results here (default: stdout)")
+    datagen.add_size_arguments(parser)
+    args = parser.parse_args(argv)
+
+    scratch = None
+    if args.backend == "sqlite" and not args.db:
+        fd, scratch = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        args.db = scratch
+
+    def log(message):
+        print(message, file=sys.stderr)
+
+    try:
+        backend = datagen.open_backend(args)
+        pool = db.create_pool(backend, size=1)
+        with pool.connection() as conn:
+            if _count(conn, "bookings") == 0:
+                sizes = datagen.sizes_from_args(args)
+                log(f"Generating {sizes}...")
+                started = time.perf_counter()
+                datagen.generate(conn, seed=args.seed, progress=lambda m: log(f"  {m}"), **sizes)
+                datagen.analyze(conn, backend.name)
+                log(f"  done in {time.perf_counter() - started:.1f}s")
+            report = run(conn, backend.name, args.repeat, only=args.only, seed=args.seed,
+                         progress=lambda name, r: log(f"{name:32s} p50 {r['p50_ms']:9.3f} ms   p95 {r['p95_ms']:9.3f} ms"))
+        pool.close()
+        if args.contention > 0:
+            report["contention"] = run_contention(
+                backend, args.contention, args.rounds, seed=args.seed,
+                progress=lambda name, r: log(f"{name:32s} {r['attempts_per_second']:9.1f} attempts/s   "
+                                             f"{r['conflicts']} conflicts   {r['retries']} retries   "
+                                             f"{r['error_count']} errors   {r['double_bookings']} double bookings"))
+    finally:
+        if scratch:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(scratch + suffix):
+                    os.remove(scratch + suffix)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+        log(f"Results written to {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Versioned in-memory cache for reference data (menu_items, rooms, tables).
+
+Each named entry carries a version number. Writers call invalidate(name)
+after changing the underlying table, which bumps the version so the next
+lookup misses and reloads. A loader that started before an invalidation
+can't overwrite the newer version with stale rows.
+
+A reload that returns exactly the same rows keeps the existing CacheEntry
+object. Widgets remember the entry they last rendered, so a cache hit (or a
+reload of unchanged data) costs zero Treeview rebuilds.
+"""
+import threading
+import time
+
+
+class CacheEntry:
+    __slots__ = ("name", "version", "rows", "loaded_at")
+
+    def __init__(self, name, version, rows):
+        self.name = name
+        self.version = version
+        self.rows = rows
+        self.loaded_at = time.monotonic()
+
+
+class ReferenceCache:
+    def __init__(self, max_age=None):
+        # max_age: {name: seconds} after which an entry is reloaded even if
+        # nobody invalidated it (for tables edited outside this terminal)
+        self.max_age = dict(max_age or {})
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._versions = {}
+        self._hits = {}
+        self._misses = {}
+
+    def version(self, name):
+        with self._lock:
+            return self._versions.get(name, 0)
+
+    def lookup(self, name):
+        """Returns the cached CacheEntry for `name`, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry.version == self._versions.get(name, 0):
+                max_age = self.max_age.get(name)
+                if max_age is None or time.monotonic() - entry.loaded_at < max_age:
+                    self._hits[name] = self._hits.get(name, 0) + 1
+                    return entry
+            self._misses[name] = self._misses.get(name, 0) + 1
+            return None
+
+    def store(self, name, version, rows):
+        """
+        Caches rows loaded while the entry was at `version` and returns the
+        new CacheEntry. If the entry was invalidated while loading, the rows
+        are still returned but not cached.
+        """
+        with self._lock:
+            old = self._entries.get(name)
+            if old is not None and old.rows == rows:
+                entry = old  # data didn't really change, keep the rendered entry
+                entry.loaded_at = time.monotonic()
+            else:
+                entry = CacheEntry(name, version, rows)
+            if self._versions.get(name, 0) == version:
+                entry.version = version
+                self._entries[name] = entry
+        return entry
+
+    def patch(self, name, key, ids, rows, sort_key=None):
+        """
+        Applies a delta to a cached entry without reloading it: `rows` are the
+        current versions of the records whose `key` is in `ids` (ids missing
+        from `rows` were deleted). Returns the patched CacheEntry, or None if
+        nothing is cached (the next lookup will do a full load anyway).
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or entry.version != self._versions.get(name, 0):
+                return None
+            changed = {row[key]: row for row in rows}
+            merged = []
+            for row in entry.rows:
+                if row[key] not in ids:
+                    merged.append(row)
+                elif row[key] in changed:
+                    merged.append(changed.pop(row[key]))
+            if changed:
+                merged.extend(changed.values())
+                if sort_key is not None:
+                    merged.sort(key=sort_key)
+            if merged == entry.rows:
+                return entry
+            patched = CacheEntry(name, entry.version, merged)
+            patched.loaded_at = entry.loaded_at
+            self._entries[name] = patched
+            return patched
+
+    def invalidate(self, name):
+        # The old entry stays around so an unchanged reload can reuse it
+        with self._lock:
+            self._versions[name] = self._versions.get(name, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            names = sorted(set(self._hits) | set(self._misses) | set(self._versions))
+            return {
+                name: {
+                    "hits": self._hits.get(name, 0),
+                    "misses": self._misses.get(name, 0),
+                    "version": self._versions.get(name, 0),
+                }
+                for name in names
+            }
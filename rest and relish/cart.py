@@ -0,0 +1,76 @@
+"""
+In-memory model of the order being taken at a table.
+
+Lines are indexed by item_id and prices stay Decimal from the menu row to
+the orders table, so adding, incrementing and removing an item are O(1)
+and the total is kept up to date as lines change instead of being re-added
+from the Treeview's "₹..." strings at payment time.
+"""
+from decimal import Decimal
+
+ZERO = Decimal("0.00")
+
+
+class CartLine:
+    __slots__ = ("item_id", "name", "unit_price", "quantity")
+
+    def __init__(self, item_id, name, unit_price, quantity=0):
+        self.item_id = item_id
+        self.name = name
+        self.unit_price = unit_price
+        self.quantity = quantity
+
+    @property
+    def sub_total(self):
+        return self.unit_price * self.quantity
+
+
+class OrderCart:
+    def __init__(self):
+        self._lines = {}  # item_id -> CartLine, in the order items were first added
+        self.total = ZERO
+
+    def add(self, item_id, name, unit_price, quantity=1):
+        """Adds `quantity` of an item (a new line or one more of an existing one). Returns the line."""
+        line = self._lines.get(item_id)
+        if line is None:
+            line = self._lines[item_id] = CartLine(item_id, name, Decimal(unit_price))
+        line.quantity += quantity
+        self.total += line.unit_price * quantity
+        return line
+
+    def remove(self, item_id, quantity=1):
+        """
+        Takes `quantity` (None = all) of an item off the order. Returns the
+        line, whose quantity is 0 once it has left the cart, or None if the
+        item wasn't in it.
+        """
+        line = self._lines.get(item_id)
+        if line is None:
+            return None
+        if quantity is None or quantity >= line.quantity:
+            quantity = line.quantity
+            del self._lines[item_id]
+        line.quantity -= quantity
+        self.total -= line.unit_price * quantity
+        return line
+
+    def clear(self):
+        self._lines.clear()
+        self.total = ZERO
+
+    def get(self, item_id):
+        return self._lines.get(item_id)
+
+    def __iter__(self):
+        return iter(self._lines.values())
+
+    def __len__(self):
+        return len(self._lines)
+
+    def items(self):
+        """Line dicts in the shape queries.create_order() expects."""
+        return [
+            {"item_id": line.item_id, "quantity": line.quantity, "sub_total": line.sub_total}
+            for line in self._lines.values()
+        ]
@@ -0,0 +1,89 @@
+"""
+Change feed between terminals.
+
+Every check-in, check-out and order transaction appends (entity, entity_id)
+rows to the `changes` table before it commits. Each terminal remembers the
+highest sequence number it has applied and periodically asks for
+"changes since N" - a primary-key range scan - then re-reads only the rooms
+and tables that were touched.
+
+AUTO_INCREMENT values are handed out when a row is inserted, not when its
+transaction commits, so a slow transaction can make seq 41 visible after
+seq 42. ChangeFeed therefore only advances its watermark over contiguous
+sequence numbers; a gap is re-checked on the next polls and given up on
+after GAP_TIMEOUT seconds (the transaction that owned it rolled back).
+"""
+import time
+
+import availability
+import guest_index
+import queries
+
+BATCH_SIZE = 500
+GAP_TIMEOUT = 30  # seconds
+
+
+def fetch_current_seq(conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM changes")
+        return cursor.fetchone()[0]
+    finally:
+        cursor.close()
+
+
+def fetch_changes(conn, since, limit=BATCH_SIZE):
+    """
+    Runs on a worker thread. Returns the change rows after `since` together
+    with fresh copies of the rooms, tables, booking date ranges and guests they touched.
+    """
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            "SELECT seq, entity, entity_id FROM changes WHERE seq > %s ORDER BY seq LIMIT %s",
+            (since, limit)
+        )
+        changes = cursor.fetchall()
+    finally:
+        cursor.close()
+
+    room_ids = {c['entity_id'] for c in changes if c['entity'] == 'room'}
+    table_ids = {c['entity_id'] for c in changes if c['entity'] == 'table'}
+    booking_ids = {c['entity_id'] for c in changes if c['entity'] == 'booking'}
+    guest_ids = {c['entity_id'] for c in changes if c['entity'] == 'guest'}
+    return {
+        "changes": changes,
+        "room_ids": room_ids,
+        "rooms": queries.fetch_rooms_by_id(conn, room_ids),
+        "table_ids": table_ids,
+        "tables": queries.fetch_tables_by_id(conn, table_ids),
+        "bookings": availability.fetch_booking_ranges(conn, booking_ids),
+        "guests": guest_index.fetch_guests_by_id(conn, guest_ids),
+    }
+
+
+class ChangeFeed:
+    """Tracks which changes this terminal has already applied."""
+
+    def __init__(self, since=0):
+        self.since = since      # every seq <= since has been applied
+        self._seen = set()      # applied seqs above the watermark
+        self._gaps = {}         # missing seq -> when we first noticed it
+
+    def advance(self, changes):
+        """Records a batch from fetch_changes() and returns only the new changes."""
+        fresh = [c for c in changes if c['seq'] > self.since and c['seq'] not in self._seen]
+        self._seen.update(c['seq'] for c in fresh)
+
+        now = time.monotonic()
+        while self._seen:
+            nxt = self.since + 1
+            if nxt in self._seen:
+                self._seen.discard(nxt)
+                self._gaps.pop(nxt, None)
+            elif now - self._gaps.setdefault(nxt, now) > GAP_TIMEOUT:
+                del self._gaps[nxt]  # never committed
+            else:
+                break
+            self.since = nxt
+        return fresh
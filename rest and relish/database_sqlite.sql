@@ -0,0 +1,156 @@
+-- Rest & Relish schema for the embedded SQLite backend.
+--
+-- Mirrors database.sql (the MySQL dump) table for table and column for
+-- column, so the application can run against either backend unchanged.
+-- Applied automatically by db.SQLiteBackend when a database file is opened.
+
+PRAGMA foreign_keys = ON;
+
+--
+-- Table structure for table `rooms`
+--
+
+CREATE TABLE IF NOT EXISTS `rooms` (
+  `room_id` INTEGER PRIMARY KEY AUTOINCREMENT,
+  `room_number` varchar(10) NOT NULL UNIQUE,
+  `room_type` varchar(50) NOT NULL,
+  `price_per_night` decimal(10,2) NOT NULL,
+  `is_occupied` tinyint(1) DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS `rooms_occupied` ON `rooms` (`is_occupied`);
+
+--
+-- Table structure for table `tables`
+--
+
+CREATE TABLE IF NOT EXISTS `tables` (
+  `table_id` INTEGER PRIMARY KEY AUTOINCREMENT,
+  `table_number` varchar(10) NOT NULL UNIQUE,
+  `capacity` int NOT NULL,
+  `status` varchar(20) DEFAULT 'available'
+);
+
+--
+-- Table structure for table `guests`
+--
+
+CREATE TABLE IF NOT EXISTS `guests` (
+  `guest_id` INTEGER PRIMARY KEY AUTOINCREMENT,
+  `first_name` varchar(100) NOT NULL,
+  `last_name` varchar(100) NOT NULL,
+  `email` varchar(100) DEFAULT NULL UNIQUE,
+  `phone` varchar(20) DEFAULT NULL
+);
+CREATE INDEX IF NOT EXISTS `guests_name` ON `guests` (`last_name` COLLATE NOCASE, `first_name` COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS `guests_first_name` ON `guests` (`first_name` COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS `guests_phone` ON `guests` (`phone` COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS `guests_email` ON `guests` (`email` COLLATE NOCASE);
+
+--
+-- Table structure for table `menu_items`
+--
+
+CREATE TABLE IF NOT EXISTS `menu_items` (
+  `item_id` INTEGER PRIMARY KEY AUTOINCREMENT,
+  `name` varchar(255) NOT NULL,
+  `description` text,
+  `price` decimal(10,2) NOT NULL,
+  `category` varchar(50) DEFAULT NULL
+);
+
+--
+-- Table structure for table `bookings`
+--
+
+CREATE TABLE IF NOT EXISTS `bookings` (
+  `booking_id` INTEGER PRIMARY KEY AUTOINCREMENT,
+  `guest_id` int NOT NULL REFERENCES `guests` (`guest_id`),
+  `room_id` int NOT NULL REFERENCES `rooms` (`room_id`),
+  `check_in_date` date NOT NULL,
+  `check_out_date` date NOT NULL,
+  `total_room_cost` decimal(10,2) DEFAULT NULL,
+  `is_active` tinyint(1) DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS `bookings_guest_id` ON `bookings` (`guest_id`);
+CREATE INDEX IF NOT EXISTS `bookings_room_id` ON `bookings` (`room_id`);
+CREATE INDEX IF NOT EXISTS `bookings_room_active` ON `bookings` (`room_id`, `is_active`);
+CREATE INDEX IF NOT EXISTS `bookings_active` ON `bookings` (`is_active`);
+CREATE INDEX IF NOT EXISTS `bookings_check_out` ON `bookings` (`check_out_date`, `check_in_date`);
+
+--
+-- Table structure for table `orders`
+--
+
+CREATE TABLE IF NOT EXISTS `orders` (
+  `order_id` INTEGER PRIMARY KEY AUTOINCREMENT,
+  `table_id` int DEFAULT NULL REFERENCES `tables` (`table_id`),
+  `booking_id` int DEFAULT NULL REFERENCES `bookings` (`booking_id`),
+  `order_status` varchar(20) NOT NULL,
+  `order_total` decimal(10,2) DEFAULT 0.00,
+  `order_timestamp` timestamp NULL DEFAULT CURRENT_TIMESTAMP,
+  `journal_ref` char(32) DEFAULT NULL
+);
+CREATE INDEX IF NOT EXISTS `orders_table_id` ON `orders` (`table_id`);
+CREATE INDEX IF NOT EXISTS `orders_booking_id` ON `orders` (`booking_id`);
+CREATE INDEX IF NOT EXISTS `orders_booking_status` ON `orders` (`booking_id`, `order_status`);
+CREATE INDEX IF NOT EXISTS `orders_timestamp` ON `orders` (`order_timestamp`);
+CREATE INDEX IF NOT EXISTS `orders_table_status` ON `orders` (`table_id`, `order_status`);
+-- `orders_journal_ref` is created by migration 6: this script also runs on
+-- databases whose orders table predates the journal_ref column.
+
+--
+-- Table structure for table `order_items`
+--
+
+CREATE TABLE IF NOT EXISTS `order_items` (
+  `order_item_id` INTEGER PRIMARY KEY AUTOINCREMENT,
+  `order_id` int NOT NULL REFERENCES `orders` (`order_id`),
+  `item_id` int NOT NULL REFERENCES `menu_items` (`item_id`),
+  `quantity` int NOT NULL,
+  `sub_total` decimal(10,2) NOT NULL
+);
+CREATE INDEX IF NOT EXISTS `order_items_order_id` ON `order_items` (`order_id`);
+CREATE INDEX IF NOT EXISTS `order_items_item_id` ON `order_items` (`item_id`);
+
+--
+-- Table structure for table `changes`
+-- (append-only change feed: one row per room/table/booking/order touched by a
+-- transaction, polled by other terminals with "WHERE seq > N")
+--
+
+CREATE TABLE IF NOT EXISTS `changes` (
+  `seq` INTEGER PRIMARY KEY AUTOINCREMENT,
+  `entity` varchar(20) NOT NULL,
+  `entity_id` int NOT NULL,
+  `changed_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+--
+-- Table structure for table `booking_folios`
+-- (per-booking folio ledger, updated in the same transaction as each
+-- charged_to_room order so a folio total is a single primary-key lookup)
+--
+
+CREATE TABLE IF NOT EXISTS `booking_folios` (
+  `booking_id` INTEGER PRIMARY KEY REFERENCES `bookings` (`booking_id`),
+  `room_total` decimal(10,2) NOT NULL DEFAULT 0.00,
+  `restaurant_total` decimal(10,2) NOT NULL DEFAULT 0.00,
+  `order_count` int NOT NULL DEFAULT 0,
+  `updated_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+--
+-- Table structure for table `revenue_rollups`
+-- (paid orders and revenue per day by category, table, room type and
+-- status, added to in the same transaction as each order; see analytics.py)
+--
+
+CREATE TABLE IF NOT EXISTS `revenue_rollups` (
+  `dimension` varchar(20) NOT NULL,
+  `day` date NOT NULL,
+  `member` varchar(50) NOT NULL,
+  `orders` int NOT NULL DEFAULT 0,
+  `items` int NOT NULL DEFAULT 0,
+  `revenue` decimal(12,2) NOT NULL DEFAULT 0.00,
+  PRIMARY KEY (`dimension`, `day`, `member`)
+);
@@ -0,0 +1,247 @@
+"""
+Synthetic data generator for the Rest & Relish schema.
+
+Fills rooms, tables, menu_items, guests, bookings, orders, order_items,
+booking_folios and revenue_rollups at a chosen size, for benchmarks
+(benchmark.py) and the query-plan check (query_plans.py). Every room gets
+a history of back-to-back stays ending around today, the latest stay of
+most rooms is still in house, and a third of the orders are charged to a
+stay, so the data looks like a hotel that has been running for a while. Stays never
+overlap, matching what check-in enforces.
+
+    python datagen.py --profile large --db bench.db
+    python datagen.py --rooms 2000 --bookings 500000 --order-items 5000000 --db bench.db
+
+Rows are inserted with explicit ids after the current maximum, in batches
+of executemany() inside one transaction per batch, so existing data is
+left alone.
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import db
+import queries
+
+PROFILES = {
+    "small": dict(rooms=80, tables=20, menu_items=150, bookings=3000, order_items=18000),
+    "medium": dict(rooms=500, tables=60, menu_items=300, bookings=50000, order_items=500000),
+    "large": dict(rooms=2000, tables=150, menu_items=500, bookings=500000, order_items=5000000),
+}
+ITEMS_PER_ORDER = 3
+BATCH_SIZE = 5000
+
+ROOM_TYPES = [("Standard", Decimal("2500.00")), ("Deluxe", Decimal("4000.00")), ("Suite", Decimal("7500.00"))]
+CATEGORIES = ["Starters", "Soups", "Main Course", "Breads", "Rice", "Desserts", "Beverages", "Specials"]
+FIRST_NAMES = ["Aarav", "Priya", "Rohan", "Ananya", "Vikram", "Meera", "Arjun", "Kavya", "Rahul", "Isha"]
+LAST_NAMES = ["Sharma", "Patel", "Iyer", "Reddy", "Singh", "Gupta", "Nair", "Das", "Khan", "Mehta"]
+
+
+def _next_id(cursor, table, column):
+    cursor.execute(f"SELECT COALESCE(MAX({column}), 0) FROM {table}")
+    return cursor.fetchone()[0] + 1
+
+
+def _insert(conn, sql, rows):
+    """executemany() in batches, each in its own transaction."""
+    cursor = conn.cursor()
+    try:
+        for start in range(0, len(rows), BATCH_SIZE):
+            conn.start_transaction()
+            try:
+                cursor.executemany(sql, rows[start:start + BATCH_SIZE])
+                conn.commit()
+            except db.Error:
+                conn.rollback()
+                raise
+    finally:
+        cursor.close()
+
+
+def generate(conn, rooms, tables, menu_items, bookings, order_items, seed=42, today=None, progress=None):
+    """
+    Adds the given numbers of rows. Returns a dict with the ids created
+    (room_ids, table_ids, item_ids, booking_ids, active_booking_ids, order_ids).
+    """
+    rng = random.Random(seed)
+    today = today or date.today()
+    say = progress or (lambda message: None)
+    cursor = conn.cursor()
+    try:
+        first_room = _next_id(cursor, "rooms", "room_id")
+        first_table = _next_id(cursor, "tables", "table_id")
+        first_item = _next_id(cursor, "menu_items", "item_id")
+        first_guest = _next_id(cursor, "guests", "guest_id")
+        first_booking = _next_id(cursor, "bookings", "booking_id")
+        first_order = _next_id(cursor, "orders", "order_id")
+        first_order_item = _next_id(cursor, "order_items", "order_item_id")
+    finally:
+        cursor.close()
+    tag = f"{first_room:x}"  # keeps room/table numbers unique when run twice
+
+    # --- Reference data ---
+    room_ids = list(range(first_room, first_room + rooms))
+    room_rows, prices = [], {}
+    for n, room_id in enumerate(room_ids):
+        room_type, price = ROOM_TYPES[n % len(ROOM_TYPES)]
+        prices[room_id] = price
+        room_rows.append((room_id, f"{tag}-{n + 1:04d}", room_type, price))
+    say(f"rooms: {rooms}")
+    _insert(conn, "INSERT INTO rooms (room_id, room_number, room_type, price_per_night, is_occupied) VALUES (%s, %s, %s, %s, 0)", room_rows)
+
+    table_ids = list(range(first_table, first_table + tables))
+    say(f"tables: {tables}")
+    _insert(conn, "INSERT INTO tables (table_id, table_number, capacity, status) VALUES (%s, %s, %s, 'available')",
+            [(table_id, f"{tag}-T{n + 1}", rng.choice((2, 4, 6))) for n, table_id in enumerate(table_ids)])
+
+    item_ids = list(range(first_item, first_item + menu_items))
+    menu_prices = {item_id: Decimal(rng.randrange(60, 900)) + Decimal("0.00") for item_id in item_ids}
+    say(f"menu_items: {menu_items}")
+    _insert(conn, "INSERT INTO menu_items (item_id, name, description, price, category) VALUES (%s, %s, '', %s, %s)",
+            [(item_id, f"Dish {item_id}", menu_prices[item_id], CATEGORIES[n % len(CATEGORIES)])
+             for n, item_id in enumerate(item_ids)])
+
+    # --- Guests and bookings: back-to-back stays per room, newest ending around today ---
+    booking_ids = list(range(first_booking, first_booking + bookings))
+    guest_rows, booking_rows, active, occupied = [], [], [], set()
+    per_room = [bookings // rooms + (1 if r < bookings % rooms else 0) for r in range(rooms)]
+    booking_id = first_booking
+    for r, room_id in enumerate(room_ids):
+        in_house = rng.random() < 0.7
+        # The latest stay started up to 3 nights ago (in house) or ended recently
+        end = today + timedelta(days=rng.randint(1, 4)) if in_house else today - timedelta(days=rng.randint(0, 3))
+        for k in range(per_room[r]):
+            nights = rng.randint(1, 5)
+            start = end - timedelta(days=nights)
+            is_active = 1 if (k == 0 and in_house) else 0
+            guest_id = first_guest + (booking_id - first_booking)
+            guest_rows.append((guest_id, rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES),
+                               f"guest{guest_id}@example.com", f"9{guest_id:09d}"))
+            booking_rows.append((booking_id, guest_id, room_id, start, end, prices[room_id] * nights, is_active))
+            if is_active:
+                active.append(booking_id)
+                occupied.add(room_id)
+            booking_id += 1
+            end = start - timedelta(days=rng.randint(0, 2))  # a gap between guests now and then
+    say(f"guests/bookings: {bookings}")
+    _insert(conn, "INSERT INTO guests (guest_id, first_name, last_name, email, phone) VALUES (%s, %s, %s, %s, %s)", guest_rows)
+    del guest_rows
+    _insert(conn, """
+        INSERT INTO bookings (booking_id, guest_id, room_id, check_in_date, check_out_date, total_room_cost, is_active)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+    """, booking_rows)
+    stays = {row[0]: (row[3], row[4]) for row in booking_rows}
+    del booking_rows
+    if occupied:
+        _insert(conn, "UPDATE rooms SET is_occupied = 1 WHERE room_id = %s", [(room_id,) for room_id in occupied])
+
+    # --- Orders: a third charged to a stay (timestamped during it), the rest paid ---
+    orders = max(order_items // ITEMS_PER_ORDER, 1) if order_items else 0
+    order_ids = list(range(first_order, first_order + orders))
+    order_rows, item_rows = [], []
+    order_item_id = first_order_item
+    start_of_history = min((s for s, _ in stays.values()), default=today)
+    history_days = max((today - start_of_history).days, 1)
+    for n, order_id in enumerate(order_ids):
+        count = ITEMS_PER_ORDER if n < orders - 1 else max(order_items - ITEMS_PER_ORDER * (orders - 1), 1)
+        total = Decimal("0.00")
+        for item_id in rng.sample(item_ids, min(count, len(item_ids))):
+            quantity = rng.randint(1, 3)
+            sub_total = menu_prices[item_id] * quantity
+            total += sub_total
+            item_rows.append((order_item_id, order_id, item_id, quantity, sub_total))
+            order_item_id += 1
+        if booking_ids and n % 3 == 0:
+            booking_id = rng.choice(booking_ids)
+            stay_start, stay_end = stays[booking_id]
+            day = stay_start + timedelta(days=rng.randrange(max((stay_end - stay_start).days, 1)))
+            status = 'charged_to_room'
+        else:
+            booking_id, status = None, 'paid'
+            day = start_of_history + timedelta(days=rng.randrange(history_days))
+        stamp = datetime(day.year, day.month, day.day, rng.randint(7, 22), rng.randint(0, 59))
+        order_rows.append((order_id, rng.choice(table_ids), booking_id, status, total, stamp))
+
+        if len(item_rows) >= BATCH_SIZE * 4:
+            _flush_orders(conn, order_rows, item_rows)
+            say(f"orders: {n + 1}/{orders}")
+            order_rows, item_rows = [], []
+    _flush_orders(conn, order_rows, item_rows)
+
+    say("booking_folios")
+    queries.backfill_folios(conn)
+    say("revenue_rollups")
+    queries.backfill_rollups(conn)
+    return {"room_ids": room_ids, "table_ids": table_ids, "item_ids": item_ids,
+            "booking_ids": booking_ids, "active_booking_ids": active, "order_ids": order_ids}
+
+
+def _flush_orders(conn, order_rows, item_rows):
+    _insert(conn, """
+        INSERT INTO orders (order_id, table_id, booking_id, order_status, order_total, order_timestamp)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """, order_rows)
+    _insert(conn, "INSERT INTO order_items (order_item_id, order_id, item_id, quantity, sub_total) VALUES (%s, %s, %s, %s, %s)",
+            item_rows)
+
+
+def analyze(conn, dialect):
+    """Refreshes optimizer statistics, as a long-running database would have."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("ANALYZE" if dialect == "sqlite" else
+                       "ANALYZE TABLE rooms, tables, menu_items, guests, bookings, orders, order_items, booking_folios, revenue_rollups")
+        if cursor.description:
+            cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def add_size_arguments(parser, default_profile="small"):
+    parser.add_argument("--profile", choices=sorted(PROFILES), default=default_profile)
+    for name in PROFILES["small"]:
+        parser.add_argument("--" + name.replace("_", "-"), type=int, help=f"override the profile's {name}")
+    parser.add_argument("--seed", type=int, default=42)
+
+
+def sizes_from_args(args):
+    sizes = dict(PROFILES[args.profile])
+    for name in sizes:
+        value = getattr(args, name)
+        if value is not None:
+            sizes[name] = value
+    return sizes
+
+
+def open_backend(args):
+    if args.backend == "sqlite":
+        return db.SQLiteBackend(args.db)
+    if not args.database:
+        raise SystemExit("--backend mysql needs --database pointing at a scratch copy")
+    return db.MySQLBackend(**dict(db.MYSQL_CONFIG, database=args.database))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fill a Rest & Relish database with synthetic data")
+    parser.add_argument("--backend", choices=["sqlite", "mysql"], default="sqlite")
+    parser.add_argument("--db", default="rest_relish_synthetic.db", help="SQLite file to fill")
+    parser.add_argument("--database", help="scratch MySQL database (with --backend mysql)")
+    add_size_arguments(parser)
+    args = parser.parse_args(argv)
+
+    sizes = sizes_from_args(args)
+    backend = open_backend(args)
+    pool = db.create_pool(backend, size=1)
+    started = time.perf_counter()
+    with pool.connection() as conn:
+        generate(conn, seed=args.seed, progress=lambda m: print(f"  {m}", file=sys.stderr), **sizes)
+        analyze(conn, backend.name)
+    pool.close()
+    print(f"Generated {sizes} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,548 @@
+"""
+Storage layer for Rest & Relish.
+
+Every window used to share one MySQL connection opened in App.__init__.
+Connections are now handed out by a bounded ConnectionPool, so concurrent
+operations each check out their own connection instead of queuing behind a
+single socket.
+
+Two backends are available:
+  * MySQLBackend  - the production database (see database.sql)
+  * SQLiteBackend - an embedded database implementing the same schema
+                    (see database_sqlite.sql), for running the system and
+                    its tools on a machine with no MySQL server.
+
+The backend is picked with the RR_DB_BACKEND environment variable
+("mysql" or "sqlite").
+
+Hot, fixed-shape reads go through query(): the statement is prepared once
+per connection and its cursor kept for reuse (a server-side prepared
+statement on MySQL; SQLite keeps its own compiled-statement cache), and
+rows come back as row_type() tuples rather than a dict per row.
+"""
+import operator
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+
+import metrics
+
+try:
+    import mysql.connector
+    from mysql.connector import Error
+    from mysql.connector.constants import ClientFlag
+except ImportError:  # SQLite-only installs don't need the MySQL connector
+    mysql = None
+
+    class Error(Exception):
+        """Stand-in for mysql.connector.Error when the connector is missing."""
+
+
+# --- Configuration ---
+MYSQL_CONFIG = {
+    "host": "localhost",
+    "user": "root",
+    "password": "Your_Mysql_Password",  # <-- YOUR MYSQL PASSWORD
+    "database": "rest_relish_db",
+}
+
+DB_BACKEND = os.environ.get("RR_DB_BACKEND", "mysql")
+SQLITE_PATH = os.environ.get("RR_SQLITE_PATH", "rest_relish.db")
+POOL_SIZE = int(os.environ.get("RR_POOL_SIZE", "5"))
+POOL_TIMEOUT = 10        # seconds to wait for a free connection
+POOL_RECYCLE = 300       # re-check idle connections older than this (seconds)
+PREPARED_PER_CONNECTION = 64  # prepared statements kept open per connection
+
+SQLITE_SCHEMA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "database_sqlite.sql")
+
+
+# MySQL: lock wait timeout, deadlock. The whole transaction was (or must be) rolled back.
+CONTENTION_ERRNOS = {1205, 1213}
+
+
+def is_contention(error):
+    """True if `error` means a transaction lost a lock race and is worth retrying."""
+    if getattr(error, "errno", None) in CONTENTION_ERRNOS:
+        return True
+    message = str(error)
+    return "database is locked" in message or "database is busy" in message  # SQLite
+
+
+def is_duplicate(error):
+    """True if `error` is a duplicate primary/unique key; the transaction itself is still usable."""
+    return getattr(error, "errno", None) == 1062 or "UNIQUE constraint failed" in str(error)
+
+
+# --- MySQL Backend ---
+class MySQLBackend:
+    name = "mysql"
+
+    def __init__(self, **config):
+        self.config = config
+
+    def connect(self):
+        if mysql is None:
+            raise Error("mysql-connector-python is not installed (pip install -r requirements.txt)")
+        # autocommit=True: reads never leave a transaction open, writes call start_transaction().
+        # FOUND_ROWS: an UPDATE's rowcount is the rows it matched, as on SQLite, not the rows it
+        # changed - the room claims in queries.py count "SET is_occupied = is_occupied" as a match
+        flags = list(self.config.get("client_flags", [])) + [ClientFlag.FOUND_ROWS]
+        return mysql.connector.connect(autocommit=True, **dict(self.config, client_flags=flags))
+
+    def ensure_schema(self, conn):
+        # The MySQL schema is imported from database.sql by the administrator
+        pass
+
+
+# --- SQLite Backend ---
+# SQLite hands back plain strings/floats, the MySQL connector hands back
+# date/datetime/Decimal objects. Register converters so both look the same.
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_adapter(date, lambda d: d.isoformat())
+sqlite3.register_adapter(datetime, lambda dt: dt.isoformat(" ", "seconds"))
+sqlite3.register_converter("DECIMAL", lambda b: Decimal(b.decode()))
+sqlite3.register_converter("DATE", lambda b: date.fromisoformat(b.decode()))
+sqlite3.register_converter("TIMESTAMP", lambda b: datetime.fromisoformat(b.decode()))
+
+
+def _sql_now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _sql_concat(*args):
+    if any(a is None for a in args):
+        return None
+    return "".join(str(a) for a in args)
+
+
+@lru_cache(maxsize=256)
+def _translate(sql):
+    """Rewrites MySQL-flavoured SQL (%s placeholders) for sqlite3."""
+    return sql.replace("%s", "?")
+
+
+class SQLiteCursor:
+    """Wraps sqlite3.Cursor with the parts of the mysql.connector cursor API we use."""
+
+    def __init__(self, cursor, dictionary=False):
+        self._cursor = cursor
+        self._dictionary = dictionary
+        self._lastrowid = None
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return dict(zip((d[0] for d in self._cursor.description), row))
+
+    def execute(self, sql, params=()):
+        try:
+            self._cursor.execute(_translate(sql), params or ())
+        except sqlite3.Error as e:
+            raise Error(str(e)) from e
+        # mysql.connector reports the id of the *first* row of a multi-row
+        # INSERT, sqlite3 the last; the rows of one statement get consecutive ids
+        self._lastrowid = self._cursor.lastrowid
+        if self._lastrowid and self._cursor.rowcount > 1 and sql.lstrip()[:6].upper() == "INSERT":
+            self._lastrowid -= self._cursor.rowcount - 1
+
+    def executemany(self, sql, seq_of_params):
+        try:
+            self._cursor.executemany(_translate(sql), seq_of_params)
+        except sqlite3.Error as e:
+            raise Error(str(e)) from e
+        self._lastrowid = self._cursor.lastrowid
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchmany(self, size=1):
+        return [self._row(r) for r in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._row(r) for r in self._cursor.fetchall()]
+
+    def __iter__(self):
+        for row in self._cursor:
+            yield self._row(row)
+
+    @property
+    def lastrowid(self):
+        return self._lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """Wraps sqlite3.Connection with the parts of the mysql.connector API we use."""
+
+    def __init__(self, raw):
+        self._raw = raw
+        self._closed = False
+
+    def cursor(self, dictionary=False, **kwargs):
+        return SQLiteCursor(self._raw.cursor(), dictionary=dictionary)
+
+    def start_transaction(self):
+        try:
+            # IMMEDIATE takes the write lock up front, so two writers can't
+            # deadlock trying to upgrade from a shared lock
+            self._raw.execute("BEGIN IMMEDIATE")
+        except sqlite3.Error as e:
+            raise Error(str(e)) from e
+
+    @property
+    def in_transaction(self):
+        return self._raw.in_transaction
+
+    def commit(self):
+        if self._raw.in_transaction:
+            try:
+                self._raw.execute("COMMIT")
+            except sqlite3.Error as e:
+                raise Error(str(e)) from e
+
+    def rollback(self):
+        if self._raw.in_transaction:
+            self._raw.execute("ROLLBACK")
+
+    def is_connected(self):
+        return not self._closed
+
+    def close(self):
+        self._closed = True
+        self._raw.close()
+
+
+class SQLiteBackend:
+    name = "sqlite"
+
+    def __init__(self, path):
+        self.path = path
+
+    def connect(self):
+        try:
+            raw = sqlite3.connect(
+                self.path,
+                detect_types=sqlite3.PARSE_DECLTYPES,
+                isolation_level=None,       # autocommit, like the MySQL connection
+                check_same_thread=False,    # pooled connections move between threads
+                timeout=POOL_TIMEOUT,
+                uri=self.path.startswith("file:"),
+                cached_statements=4 * PREPARED_PER_CONNECTION,
+            )
+            raw.execute("PRAGMA foreign_keys = ON")
+            if self.path != ":memory:" and "mode=memory" not in self.path:
+                raw.execute("PRAGMA journal_mode = WAL")
+            raw.create_function("NOW", 0, _sql_now)
+            raw.create_function("CONCAT", -1, _sql_concat)
+        except sqlite3.Error as e:
+            raise Error(str(e)) from e
+        return SQLiteConnection(raw)
+
+    def ensure_schema(self, conn):
+        with open(SQLITE_SCHEMA_FILE, encoding="utf-8") as f:
+            script = f.read()
+        try:
+            conn._raw.executescript(script)
+        except sqlite3.Error as e:
+            raise Error(str(e)) from e
+
+
+# --- Connection Pool ---
+class PooledConnection:
+    """
+    A connection checked out of a ConnectionPool. Behaves like the underlying
+    connection; close() hands it back to the pool instead of closing it.
+    Cursors, commits and rollbacks are timed into the pool's metrics registry.
+    """
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    @property
+    def metrics(self):
+        return self._pool.metrics
+
+    def cursor(self, *args, **kwargs):
+        return metrics.InstrumentedCursor(self._conn.cursor(*args, **kwargs), self._pool.metrics)
+
+    def prepared(self, sql):
+        """
+        A cursor with `sql` prepared on this connection, reused by every later
+        call with the same text. Don't close it; consume its results before
+        the connection runs anything else.
+        """
+        return metrics.InstrumentedCursor(self._pool._prepared(self._conn, sql), self._pool.metrics)
+
+    def forget_prepared(self, sql):
+        self._pool._forget_prepared(self._conn, sql)
+
+    def commit(self):
+        started = time.perf_counter()
+        try:
+            self._conn.commit()
+        finally:
+            self._pool.metrics.statement("COMMIT", None, time.perf_counter() - started)
+
+    def rollback(self):
+        started = time.perf_counter()
+        try:
+            self._conn.rollback()
+        finally:
+            self._pool.metrics.statement("ROLLBACK", None, time.perf_counter() - started)
+
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool._release(conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ConnectionPool:
+    """
+    Bounded pool of database connections.
+
+    At most `size` connections exist at once. get_connection() blocks for up
+    to `timeout` seconds when they are all checked out, then raises Error.
+    """
+
+    def __init__(self, backend, size=POOL_SIZE, timeout=POOL_TIMEOUT, registry=None):
+        self.backend = backend
+        self.size = size
+        self.timeout = timeout
+        self.metrics = registry or metrics.REGISTRY
+        self._idle = queue.LifoQueue()   # most recently used first (warmest connection)
+        self._slots = threading.BoundedSemaphore(size)
+        self._closed = False
+        self._statements = {}  # connection -> OrderedDict(sql -> prepared cursor), oldest first
+        self._statements_lock = threading.Lock()
+
+    def get_connection(self):
+        if self._closed:
+            raise Error("Connection pool is closed.")
+        if not self._slots.acquire(timeout=self.timeout):
+            raise Error(f"Timed out waiting for a free database connection (pool size {self.size}).")
+        try:
+            conn = self._take_idle()
+            if conn is None:
+                conn = self.backend.connect()
+        except Exception:
+            self._slots.release()
+            raise
+        return PooledConnection(self, conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.get_connection()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _take_idle(self):
+        while True:
+            try:
+                conn, released_at = self._idle.get_nowait()
+            except queue.Empty:
+                return None
+            if time.monotonic() - released_at < POOL_RECYCLE or conn.is_connected():
+                return conn
+            self._discard(conn)
+
+    def _release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()  # never hand out a connection with someone else's open transaction
+            if self._closed:
+                self._discard(conn)
+            else:
+                self._idle.put((conn, time.monotonic()))
+        except Error:
+            self._discard(conn)
+        finally:
+            self._slots.release()
+
+    def _prepared(self, conn, sql):
+        # Only the thread holding `conn` uses its statements; the lock guards the dict
+        with self._statements_lock:
+            statements = self._statements.setdefault(conn, OrderedDict())
+        cursor = statements.get(sql)
+        if cursor is not None:
+            statements.move_to_end(sql)
+            return cursor
+        cursor = statements[sql] = conn.cursor(prepared=True)
+        if len(statements) > PREPARED_PER_CONNECTION:
+            _, oldest = statements.popitem(last=False)
+            _close_quietly(oldest)
+        return cursor
+
+    def _forget_prepared(self, conn, sql):
+        statements = self._statements.get(conn)
+        cursor = statements.pop(sql, None) if statements else None
+        if cursor is not None:
+            _close_quietly(cursor)
+
+    def _discard(self, conn):
+        with self._statements_lock:
+            statements = self._statements.pop(conn, {})
+        for cursor in statements.values():
+            _close_quietly(cursor)
+        try:
+            conn.close()
+        except Error:
+            pass
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+
+def _close_quietly(cursor):
+    try:
+        cursor.close()
+    except Exception:
+        pass  # the connection is going away anyway
+
+
+# --- Rows and prepared reads ---
+
+class Row(tuple):
+    """
+    Base of the row_type() classes: a plain tuple whose values can also be
+    read by column name, as an attribute or with row['column'].
+    """
+    __slots__ = ()
+    _fields = ()
+    _index = {}
+
+    def __getitem__(self, key):
+        if key.__class__ is str:
+            return tuple.__getitem__(self, self._index[key])
+        return tuple.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        i = self._index.get(key)
+        return default if i is None else tuple.__getitem__(self, i)
+
+    def keys(self):
+        return self._fields
+
+    def _asdict(self):
+        return dict(zip(self._fields, self))
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{k}={v!r}' for k, v in zip(self._fields, self))})"
+
+
+def row_type(name, columns):
+    """A Row subclass for `columns` ("a, b, c" or a list). RowType(values) builds one."""
+    if isinstance(columns, str):
+        columns = [c.strip() for c in columns.split(",")]
+    namespace = {"__slots__": (), "_fields": tuple(columns), "_index": {c: i for i, c in enumerate(columns)}}
+    for i, column in enumerate(columns):
+        namespace[column] = property(operator.itemgetter(i))
+    return type(name, (Row,), namespace)
+
+
+def query(conn, sql, params=(), row=None):
+    """
+    Runs a read through the connection's prepared statements (see
+    PooledConnection.prepared) and returns its rows as tuples, or as `row`
+    objects (a row_type()). Meant for fixed statements run over and over;
+    SQL built per call (IN lists of varying length) should use a cursor.
+    """
+    prepared = getattr(conn, "prepared", None)
+    if prepared is None:  # not a pooled connection
+        cursor = conn.cursor()
+        try:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+    else:
+        cursor = prepared(sql)
+        try:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        except Error:
+            conn.forget_prepared(sql)  # re-prepared next time, in case the statement went stale
+            raise
+    return rows if row is None else [row(r) for r in rows]
+
+
+STREAM_BATCH = 5000
+
+
+def stream(conn, sql, params=(), dictionary=False, batch_size=STREAM_BATCH):
+    """
+    Yields the rows of a query a batch at a time, in constant memory. On
+    MySQL the cursor is unbuffered (rows are read off the socket as they
+    are fetched), so the generator must be exhausted or closed before the
+    connection runs another statement.
+    """
+    cursor = conn.cursor(dictionary=dictionary, buffered=False)
+    try:
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        cursor.close()
+
+
+def create_backend(name=None):
+    name = name or DB_BACKEND
+    if name == "mysql":
+        return MySQLBackend(**MYSQL_CONFIG)
+    if name == "sqlite":
+        return SQLiteBackend(SQLITE_PATH)
+    raise ValueError(f"Unknown database backend: {name!r}")
+
+
+def create_pool(backend=None, size=POOL_SIZE, migrate=True):
+    """
+    Builds the connection pool for `backend` (default: RR_DB_BACKEND),
+    checks that the database is reachable and applies pending schema
+    migrations. Raises Error if the database can't be reached.
+    """
+    if backend is None or isinstance(backend, str):
+        backend = create_backend(backend)
+    pool = ConnectionPool(backend, size=size)
+    with pool.connection() as conn:
+        backend.ensure_schema(conn)
+        if migrate:
+            import migrations  # migrations imports this module
+            migrations.migrate(conn, backend.name)
+    return pool
@@ -0,0 +1,192 @@
+"""
+Background query executor.
+
+Tkinter isn't thread-safe and every database round-trip used to run on the
+Tk thread, freezing the whole UI while it waited. QueryExecutor runs query
+functions on worker threads, each with its own pooled connection, and hands
+the results back to the Tk thread through after() callbacks.
+
+  * Jobs submitted with a `key` replace any older job with the same key:
+    a stale job that hasn't started is cancelled, and a stale job that is
+    already running has its result dropped.
+  * `on_loading(True/False)` is called if a job is still pending after
+    LOADING_DELAY_MS, so fast queries don't flash a loading state.
+  * Results for a `widget` that has since been destroyed are dropped.
+  * The pool can be created in the background with connect(), so the
+    window comes up before the database answers; jobs submitted meanwhile
+    wait for the connection.
+"""
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from db import Error
+from metrics import operation_name
+
+POLL_MS = 20
+LOADING_DELAY_MS = 150
+
+
+class Job:
+    __slots__ = ("fn", "args", "key", "widget", "on_success", "on_error", "on_loading",
+                 "future", "cancelled", "loading_shown")
+
+    def __init__(self, fn, args, key, widget, on_success, on_error, on_loading):
+        self.fn = fn
+        self.args = args
+        self.key = key
+        self.widget = widget
+        self.on_success = on_success
+        self.on_error = on_error
+        self.on_loading = on_loading
+        self.future = None
+        self.cancelled = False
+        self.loading_shown = False
+
+    def cancel(self):
+        self.cancelled = True
+        if self.future is not None:
+            self.future.cancel()  # only succeeds if the job hasn't started yet
+
+
+class QueryExecutor:
+    def __init__(self, root, db_pool=None, workers=None, error_handler=None):
+        """Without a `db_pool`, call connect() before jobs can run (and pass `workers`)."""
+        self.root = root
+        self.db_pool = db_pool
+        self.error_handler = error_handler
+        self._workers = ThreadPoolExecutor(max_workers=workers or db_pool.size, thread_name_prefix="db-worker")
+        self._connected = threading.Event() # set once connect() has succeeded or failed
+        if db_pool is not None:
+            self._connected.set()
+        self._results = queue.SimpleQueue()
+        self._latest = {}       # key -> newest Job for that key
+        self._pending = set()   # jobs submitted but not yet delivered
+        self._lock = threading.Lock()
+        self._drain_scheduled = False
+
+    def submit(self, fn, *args, key=None, widget=None, on_success=None, on_error=None, on_loading=None):
+        """
+        Runs fn(conn, *args) on a worker thread with a pooled connection.
+        Must be called from the Tk thread; callbacks also run on the Tk thread.
+        """
+        job = Job(fn, args, key, widget, on_success, on_error, on_loading)
+        if key is not None:
+            stale = self._latest.get(key)
+            if stale is not None:
+                self._finish(stale, cancelled=True)
+            self._latest[key] = job
+
+        with self._lock:
+            self._pending.add(job)
+        job.future = self._workers.submit(self._run, job)
+
+        if on_loading is not None:
+            self.root.after(LOADING_DELAY_MS, lambda: self._show_loading(job))
+        self._schedule_drain()
+        return job
+
+    def connect(self, create_pool, on_success=None, on_error=None):
+        """
+        Runs create_pool() on a worker thread and uses the pool it returns;
+        on_success(pool) or on_error(e) follow on the Tk thread. Jobs run
+        once it is done (and fail if it failed). Can be called again to retry.
+        """
+        self._connected.clear()
+        job = Job(create_pool, (), None, None, on_success, on_error, None)
+        with self._lock:
+            self._pending.add(job)
+        job.future = self._workers.submit(self._connect, job)
+        self._schedule_drain()
+        return job
+
+    def _connect(self, job):
+        # Runs on a worker thread
+        try:
+            self.db_pool = job.fn()
+            self._results.put((job, self.db_pool, None))
+        except Exception as e:
+            self._results.put((job, None, e))
+        finally:
+            self._connected.set()
+
+    def cancel(self, key):
+        job = self._latest.get(key)
+        if job is not None:
+            self._finish(job, cancelled=True)
+
+    def _run(self, job):
+        # Runs on a worker thread
+        if job.cancelled:
+            return
+        self._connected.wait()
+        try:
+            if self.db_pool is None:
+                raise Error("Not connected to the database.")
+            with self.db_pool.metrics.operation(operation_name(job.fn)), self.db_pool.connection() as conn:
+                result = job.fn(conn, *job.args)
+            self._results.put((job, result, None))
+        except Exception as e:
+            self._results.put((job, None, e))
+
+    def _show_loading(self, job):
+        if job in self._pending and not job.cancelled and self._alive(job):
+            job.loading_shown = True
+            job.on_loading(True)
+
+    def _schedule_drain(self):
+        if not self._drain_scheduled:
+            self._drain_scheduled = True
+            self.root.after(POLL_MS, self._drain)
+
+    def _drain(self):
+        # Runs on the Tk thread
+        self._drain_scheduled = False
+        while True:
+            try:
+                job, result, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if job.cancelled:
+                continue
+            self._finish(job)
+            if not self._alive(job):
+                continue
+            if error is None:
+                if job.on_success:
+                    job.on_success(result)
+            elif job.on_error:
+                job.on_error(error)
+            elif self.error_handler:
+                self.error_handler(error)
+            else:
+                raise error
+
+        with self._lock:
+            still_pending = bool(self._pending)
+        if still_pending:
+            self._schedule_drain()
+
+    def _finish(self, job, cancelled=False):
+        if cancelled:
+            job.cancel()
+        with self._lock:
+            self._pending.discard(job)
+        if job.key is not None and self._latest.get(job.key) is job:
+            del self._latest[job.key]
+        if job.loading_shown and self._alive(job):
+            job.loading_shown = False
+            job.on_loading(False)
+
+    def _alive(self, job):
+        if job.widget is None:
+            return True
+        try:
+            return bool(job.widget.winfo_exists())
+        except Exception:
+            return False
+
+    def shutdown(self, wait=True):
+        for job in list(self._latest.values()):
+            job.cancel()  # pending reads are pointless once the app is closing
+        self._workers.shutdown(wait=wait)
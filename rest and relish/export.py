@@ -0,0 +1,262 @@
+"""
+Exports for accounting.
+
+Two datasets, one row per line:
+  * orders   - order lines: orders joined with order_items and menu_items
+  * bookings - bookings joined with guests and rooms
+
+Rows flow through a pipeline of generators - an unbuffered cursor read in
+fetchmany() batches (db.stream), a record builder that tracks the
+watermark, then a CSV or JSONL encoder writing to a plain or gzip file - so
+memory stays flat however large the export is.
+
+    python export.py orders --format csv --gzip --state export_state.json
+    python export.py bookings --format jsonl --output bookings.jsonl
+    python export.py orders --watermark order_timestamp --since "2024-03-01 00:00:00"
+
+With --state, each run exports only the rows after the watermark saved by
+the previous run (order_id, or order_timestamp with --watermark
+order_timestamp; booking_id for bookings) and saves the new one once the
+file is complete. Orders from the last SETTLE_SECONDS are left for the
+next run: ids are handed out at INSERT, not at COMMIT, so a slow
+transaction's order could otherwise land behind the watermark unseen.
+Open tabs (see open_tabs.py) are not exported until they are paid; with the
+order_id watermark a run also stops short of the oldest open tab, whose
+id was handed out when it was opened.
+"""
+import argparse
+import csv
+import gzip
+import json
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import db
+
+SETTLE_SECONDS = 60
+GZIP_LEVEL = 6  # zlib's default trade-off; 9 is much slower for a few % smaller files
+
+ORDER_COLUMNS = ["order_id", "order_timestamp", "order_status", "table_id", "booking_id", "order_total",
+                 "order_item_id", "item_id", "item_name", "category", "quantity", "sub_total"]
+BOOKING_COLUMNS = ["booking_id", "room_number", "room_type", "check_in_date", "check_out_date", "total_room_cost",
+                   "is_active", "guest_id", "first_name", "last_name", "email", "phone"]
+
+WATERMARKS = {"orders": ("order_id", "order_timestamp"), "bookings": ("booking_id",)}
+
+
+# --- Sources: generators of row tuples (in *_COLUMNS order), oldest first ---
+
+def _oldest_open_order(conn):
+    # Per table, so each lookup is a range on orders_table_status
+    rows = db.query(conn, """
+        SELECT MIN(o.order_id) FROM tables t
+        JOIN orders o ON o.table_id = t.table_id AND o.order_status = 'open'
+    """)
+    return rows[0][0] if rows else None
+
+
+def order_lines(conn, watermark="order_id", since=None, until=None):
+    """Order lines after `since` (an order_id, or an (order_timestamp, order_id) pair)."""
+    where = ["o.order_timestamp < %s", "o.order_status <> 'open'"]
+    params = [until or datetime.now() - timedelta(seconds=SETTLE_SECONDS)]
+    if watermark == "order_id":
+        order = "o.order_id"
+        if since is not None:
+            where.append("o.order_id > %s")
+            params.append(since)
+        oldest_open = _oldest_open_order(conn)
+        if oldest_open is not None:
+            where.append("o.order_id < %s")
+            params.append(oldest_open)
+    else:
+        order = "o.order_timestamp, o.order_id"
+        if since is not None:
+            stamp, order_id = since
+            where.append("(o.order_timestamp > %s OR (o.order_timestamp = %s AND o.order_id > %s))")
+            params += [stamp, stamp, order_id]
+    return db.stream(conn, f"""
+        SELECT o.order_id, o.order_timestamp, o.order_status, o.table_id, o.booking_id, o.order_total,
+               oi.order_item_id, oi.item_id, m.name AS item_name, m.category, oi.quantity, oi.sub_total
+        FROM orders o
+        JOIN order_items oi ON oi.order_id = o.order_id
+        LEFT JOIN menu_items m ON m.item_id = oi.item_id
+        WHERE {" AND ".join(where)}
+        ORDER BY {order}
+    """, params)
+
+
+def bookings(conn, watermark="booking_id", since=None, until=None):
+    """Bookings after booking_id `since`, with their guest and room."""
+    where, params = "", []
+    if since is not None:
+        where, params = "WHERE b.booking_id > %s", [since]
+    return db.stream(conn, f"""
+        SELECT b.booking_id, r.room_number, r.room_type, b.check_in_date, b.check_out_date, b.total_room_cost,
+               b.is_active, g.guest_id, g.first_name, g.last_name, g.email, g.phone
+        FROM bookings b
+        JOIN guests g ON g.guest_id = b.guest_id
+        JOIN rooms r ON r.room_id = b.room_id
+        {where}
+        ORDER BY b.booking_id
+    """, params)
+
+
+DATASETS = {
+    "orders": (order_lines, ORDER_COLUMNS),
+    "bookings": (bookings, BOOKING_COLUMNS),
+}
+
+
+# --- Pipeline stages ---
+
+class Watermark:
+    """Passes rows through and remembers the watermark of the last one."""
+
+    def __init__(self, dataset, column):
+        self.column = column
+        self.value = None
+        self.rows = 0
+
+    def track(self, rows):
+        # Both datasets start with their id; orders have order_timestamp next
+        row = None
+        for row in rows:
+            self.rows += 1
+            yield row
+        if row is not None:
+            self.value = (row[1], row[0]) if self.column == "order_timestamp" else row[0]
+
+
+def _plain(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat(" ", "seconds")
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def write_csv(rows, columns, f):
+    writer = csv.writer(f)
+    writer.writerow(columns)
+    # csv writes None as "" and everything else with str(), which already
+    # gives "1250.00" for a Decimal and "2024-03-14 19:05:00" for a datetime
+    writer.writerows(rows)
+
+
+def write_jsonl(rows, columns, f):
+    for row in rows:
+        f.write(json.dumps(dict(zip(columns, map(_plain, row))), ensure_ascii=False))
+        f.write("\n")
+
+
+WRITERS = {"csv": write_csv, "jsonl": write_jsonl}
+
+
+def _open(path, compress):
+    if compress:
+        return gzip.open(path, "wt", compresslevel=GZIP_LEVEL, encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="")
+
+
+def export(conn, dataset, path, fmt="csv", compress=False, watermark=None, since=None):
+    """
+    Writes `dataset` rows after `since` to `path` and returns (rows, new
+    watermark or None if nothing was exported). The file appears under its
+    final name only once it is complete.
+    """
+    source, columns = DATASETS[dataset]
+    watermark = watermark or WATERMARKS[dataset][0]
+    tracker = Watermark(dataset, watermark)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with _open(tmp, compress) as f:
+            WRITERS[fmt](tracker.track(source(conn, watermark, since)), columns, f)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return tracker.rows, tracker.value
+
+
+# --- Watermark state ---
+
+def load_state(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_state(path, state):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+def _encode_mark(value):
+    if isinstance(value, tuple):
+        return [_plain(value[0]), value[1]]
+    return value
+
+
+def _decode_mark(value, watermark):
+    if value is None:
+        return None
+    if watermark == "order_timestamp":
+        if isinstance(value, list):
+            return datetime.fromisoformat(value[0]), value[1]
+        return datetime.fromisoformat(value), 0  # --since "YYYY-MM-DD HH:MM:SS"
+    return int(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export Rest & Relish orders or bookings for accounting")
+    parser.add_argument("dataset", choices=sorted(DATASETS))
+    parser.add_argument("--format", choices=sorted(WRITERS), default="csv")
+    parser.add_argument("--gzip", action="store_true", help="gzip the output")
+    parser.add_argument("--output", help="file to write (default: <dataset>-<timestamp>.<format>[.gz])")
+    parser.add_argument("--watermark", choices=["order_id", "order_timestamp", "booking_id"],
+                        help="column that marks how far an export got (default: the dataset's id)")
+    parser.add_argument("--state", help="JSON file holding the last watermark per dataset; only newer rows are exported")
+    parser.add_argument("--since", help="export rows after this id or timestamp, instead of the saved watermark")
+    args = parser.parse_args(argv)
+
+    watermark = args.watermark or WATERMARKS[args.dataset][0]
+    if watermark not in WATERMARKS[args.dataset]:
+        parser.error(f"--watermark {watermark} does not apply to {args.dataset}")
+    state = load_state(args.state) if args.state else {}
+    key = f"{args.dataset}.{watermark}"
+    try:
+        since = _decode_mark(args.since if args.since is not None else state.get(key), watermark)
+    except ValueError as e:
+        parser.error(f"--since: {e}")
+
+    output = args.output or "{}-{}.{}{}".format(args.dataset, datetime.now().strftime("%Y%m%d-%H%M%S"),
+                                                args.format, ".gz" if args.gzip else "")
+    try:
+        pool = db.create_pool(size=1)
+    except db.Error as e:
+        raise SystemExit(f"Cannot connect to the database: {e}")
+    started = time.perf_counter()
+    try:
+        with pool.metrics.operation("export"), pool.connection() as conn:
+            rows, mark = export(conn, args.dataset, output, args.format, args.gzip, watermark, since)
+    finally:
+        pool.close()
+
+    if args.state and mark is not None:
+        state[key] = _encode_mark(mark)
+        save_state(args.state, state)
+    print(f"Exported {rows} {args.dataset} rows to {output} in {time.perf_counter() - started:.1f}s"
+          + (f" (watermark {_encode_mark(mark)})" if mark is not None else ""), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
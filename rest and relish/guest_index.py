@@ -0,0 +1,161 @@
+"""
+Type-ahead guest search.
+
+Every guest's words - first and last name, email and phone digits - go
+into one sorted list of distinct lowercase tokens, each with the ids of the
+guests it belongs to. A prefix is then a bisect into that list followed by
+a walk over the tokens that start with it, so a keystroke costs
+O(log n + results) even with hundreds of thousands of guests. Several
+words ("ann sm") narrow the search: the longest one drives the walk and
+the others must each start some word of the same guest.
+
+The index is built once in the background (load_index) and kept up to date
+from the change feed, like availability.AvailabilityIndex. While it is
+loading, queries.search_guests() answers the same question from the guests
+indexes.
+"""
+import re
+import sys
+from bisect import bisect_left, insort
+
+import db
+
+MAX_SCANNED = 5000  # candidates examined per search before giving up on more matches
+
+_SPLIT = re.compile(r"[\s,;]+")
+_PHONE_CHARS = re.compile(r"[\s()+.-]")
+
+
+def normalize(term):
+    """Lowercase; phone-number-looking terms lose their punctuation."""
+    term = term.strip().lower()
+    digits = _PHONE_CHARS.sub("", term)
+    return digits if digits.isdigit() else term
+
+
+def search_terms(text):
+    return [t for t in (normalize(w) for w in _SPLIT.split(text or "")) if t]
+
+
+def guest_tokens(first_name, last_name, email, phone):
+    tokens = set()
+    for name in (first_name, last_name):
+        tokens.update(w for w in _SPLIT.split((name or "").lower()) if w)
+    if email:
+        tokens.add(email.strip().lower())
+    if phone:
+        digits = re.sub(r"\D", "", phone)
+        if digits:
+            tokens.add(digits)
+    return tokens
+
+
+GUEST_COLUMNS = "guest_id, first_name, last_name, email, phone"
+
+
+def fetch_guests(conn):
+    """Yields (guest_id, first_name, last_name, email, phone) for every guest, streamed in batches."""
+    return db.stream(conn, f"SELECT {GUEST_COLUMNS} FROM guests")
+
+
+def fetch_guests_by_id(conn, guest_ids):
+    guest_ids = list(guest_ids)
+    if not guest_ids:
+        return []
+    cursor = conn.cursor()
+    try:
+        placeholders = ", ".join(["%s"] * len(guest_ids))
+        cursor.execute(f"SELECT {GUEST_COLUMNS} FROM guests WHERE guest_id IN ({placeholders})", guest_ids)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def load_index(conn):
+    """Runs on a worker thread. Builds a GuestIndex of every guest."""
+    index = GuestIndex()
+    index.apply(fetch_guests(conn), bulk=True)
+    return index
+
+
+class GuestIndex:
+    def __init__(self):
+        self._guests = {}    # guest_id -> (first_name, last_name, email, phone)
+        self._postings = {}  # token -> [guest_id, ...]
+        self._tokens = []    # sorted distinct tokens
+
+    def __len__(self):
+        return len(self._guests)
+
+    def get(self, guest_id):
+        row = self._guests.get(guest_id)
+        return _as_dict(guest_id, row) if row else None
+
+    def add(self, guest_id, first_name, last_name, email, phone, bulk=False):
+        """Adds or replaces a guest. bulk=True defers sorting the token list to the caller."""
+        if guest_id in self._guests:
+            self.remove(guest_id)
+        # Names repeat a lot across guests; share one copy of each
+        self._guests[guest_id] = (sys.intern(first_name or ""), sys.intern(last_name or ""), email, phone)
+        for token in guest_tokens(first_name, last_name, email, phone):
+            ids = self._postings.get(token)
+            if ids is None:
+                self._postings[token] = [guest_id]
+                if not bulk:
+                    insort(self._tokens, token)
+            else:
+                ids.append(guest_id)
+
+    def remove(self, guest_id):
+        row = self._guests.pop(guest_id, None)
+        if row is None:
+            return
+        for token in guest_tokens(*row):
+            ids = self._postings.get(token)
+            if ids and guest_id in ids:
+                ids.remove(guest_id)
+            # An emptied token stays in the sorted list; search skips it
+
+    def apply(self, rows, bulk=False):
+        """Adds (guest_id, first_name, last_name, email, phone) rows, e.g. from the change feed."""
+        for row in rows:
+            self.add(*row, bulk=bulk)
+        if bulk:
+            self._tokens = sorted(self._postings)
+
+    def search(self, text, limit=20):
+        """Guests matching every word of `text` as a prefix, ordered by name."""
+        terms = search_terms(text)
+        if not terms:
+            return []
+        longest = max(range(len(terms)), key=lambda i: len(terms[i]))
+        driver, others = terms[longest], terms[:longest] + terms[longest + 1:]
+
+        found, seen, scanned = [], set(), 0
+        i = bisect_left(self._tokens, driver)
+        while i < len(self._tokens) and len(found) < limit and scanned < MAX_SCANNED:
+            token = self._tokens[i]
+            if not token.startswith(driver):
+                break
+            for guest_id in self._postings.get(token, ()):
+                if guest_id in seen:
+                    continue
+                seen.add(guest_id)
+                scanned += 1
+                row = self._guests[guest_id]
+                if others and not _matches(guest_tokens(*row), others):
+                    continue
+                found.append(_as_dict(guest_id, row))
+                if len(found) >= limit:
+                    break
+            i += 1
+        found.sort(key=lambda g: (g['last_name'].lower(), g['first_name'].lower(), g['guest_id']))
+        return found
+
+
+def _matches(tokens, terms):
+    return all(any(token.startswith(term) for token in tokens) for term in terms)
+
+
+def _as_dict(guest_id, row):
+    return {"guest_id": guest_id, "first_name": row[0], "last_name": row[1], "email": row[2], "phone": row[3]}
@@ -0,0 +1,223 @@
+"""
+Payment journal.
+
+A payment or room charge taken at the till is appended to a local file and
+fsync'd - a millisecond or two - and the cashier moves on. flush(), run on
+a worker thread every few seconds (and straight after each sale), replays
+the journal to the database in batches with queries.replay_orders(). If
+the database is down the orders wait in the file, across restarts if need
+be, and go in once it is back; no sale is lost to a "Transaction Failed".
+
+The file is append-only JSON lines:
+    {"type": "order", "ref": ..., "at": ..., "table_id": ..., ...}
+    {"type": "done", "ref": ..., "order_id": ...}
+    {"type": "failed", "ref": ..., "error": ...}
+Every order carries a random `ref` that is stored in orders.journal_ref
+(unique), so an order written just before a crash, whose "done" line
+never made it to disk, is recognised and not written twice. An order the
+database rejects while it is otherwise reachable (a menu item deleted in
+the meantime, say) is marked "failed" and kept in the file for a manager
+to settle by hand. Losing lock races to other terminals (a deadlock, a
+lock wait timeout) is not a rejection: replay_orders retries it, and if it
+still fails the order waits for the next flush. Once the file grows past COMPACT_BYTES it is rewritten
+with only the entries still open.
+"""
+import json
+import os
+import threading
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+import db
+import queries
+from db import Error
+
+JOURNAL_FILE = os.environ.get("RR_JOURNAL_PATH", "payments.journal")
+FLUSH_BATCH = 50            # orders per replay transaction
+COMPACT_BYTES = 1 << 20     # rewrite the file once it is this big
+
+
+def _line(record):
+    return json.dumps(record, separators=(",", ":")) + "\n"
+
+
+def _as_order(record):
+    """A journal "order" record as queries.replay_orders() takes it."""
+    return {
+        "journal_ref": record["ref"],
+        "table_id": record["table_id"],
+        "booking_id": record["booking_id"],
+        "order_status": record["order_status"],
+        "order_total": Decimal(record["order_total"]),
+        "order_timestamp": datetime.fromisoformat(record["at"]),
+        "items": [{"item_id": item["item_id"], "quantity": item["quantity"], "sub_total": Decimal(item["sub_total"])}
+                  for item in record["items"]],
+    }
+
+
+def _reachable(conn):
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1")
+        cursor.fetchall()
+        return True
+    except Error:
+        return False
+    finally:
+        if cursor is not None:
+            cursor.close()
+
+
+class PaymentJournal:
+    def __init__(self, path=JOURNAL_FILE):
+        self.path = path
+        self._lock = threading.Lock()      # the file and the dicts below
+        self._flushing = threading.Lock()  # one flush at a time
+        self._pending = {}  # ref -> order record, oldest first
+        self._failed = {}   # ref -> (order record, error)
+        self._load()
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def _load(self):
+        try:
+            f = open(self.path, encoding="utf-8")
+        except FileNotFoundError:
+            return
+        torn = False
+        with f:
+            for line in f:
+                torn = not line.endswith("\n")
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # cut short by a crash before its fsync: never acknowledged
+                ref = record.get("ref")
+                if record.get("type") == "order":
+                    self._pending[ref] = record
+                elif record.get("type") == "done":
+                    self._pending.pop(ref, None)
+                elif record.get("type") == "failed" and ref in self._pending:
+                    self._failed[ref] = (self._pending.pop(ref), record.get("error"))
+        if torn:
+            # Start the next record on a line of its own
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n")
+
+    def _append(self, records):
+        """Writes and fsyncs `records`; the caller holds self._lock."""
+        self._file.write("".join(_line(record) for record in records))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def pending_count(self):
+        return len(self._pending)
+
+    def failed(self):
+        """[(order record, error)] for orders the database refused."""
+        with self._lock:
+            return list(self._failed.values())
+
+    def record_order(self, table_id, booking_id, order_status, items, ref=None):
+        """
+        Journals an order (items as priced by services.price_items() or an
+        OrderCart) and returns its ref once it is safely on disk. `ref` is
+        that of the open tab being paid, if any (see open_tabs.py). Raises
+        OSError if the journal can't be written.
+        """
+        total = sum((item['sub_total'] for item in items), Decimal("0.00"))
+        record = {
+            "type": "order",
+            "ref": ref or uuid.uuid4().hex,
+            "at": datetime.now().isoformat(" ", "seconds"),
+            "table_id": table_id,
+            "booking_id": booking_id,
+            "order_status": order_status,
+            "order_total": str(total),
+            "items": [{"item_id": item['item_id'], "quantity": item['quantity'], "sub_total": str(item['sub_total'])}
+                      for item in items],
+        }
+        with self._lock:
+            self._append([record])
+            self._pending[record["ref"]] = record
+        return record["ref"]
+
+    # --- Flushing ---
+
+    def flush(self, conn, batch_size=FLUSH_BATCH):
+        """
+        Runs on a worker thread. Writes pending orders to the database and
+        returns (written {ref: order_id}, failed [(ref, error)]). Raises
+        Error if the database can't be reached or keeps losing lock races;
+        what was written before that stays written, the rest stays pending.
+        """
+        if not self._flushing.acquire(blocking=False):
+            return {}, []  # another flush is already at it
+        try:
+            written, failed = {}, []
+            while True:
+                with self._lock:
+                    batch = list(self._pending.values())[:batch_size]
+                if not batch:
+                    break
+                orders = [_as_order(record) for record in batch]
+                try:
+                    done, bad = queries.replay_orders(conn, orders), []
+                except Error as e:
+                    if db.is_contention(e):
+                        raise  # transient, even after replay_orders' own retries
+                    # One bad order fails the whole batch: find it
+                    done, bad = self._replay_singly(conn, orders)
+                self._settle(done, bad)
+                written.update(done)
+                failed += bad
+            self._compact()
+            return written, failed
+        finally:
+            self._flushing.release()
+
+    def _replay_singly(self, conn, orders):
+        done, bad = {}, []
+        for order in orders:
+            try:
+                done.update(queries.replay_orders(conn, [order]))
+            except Error as e:
+                if db.is_contention(e) or not _reachable(conn):
+                    self._settle(done, bad)
+                    raise
+                bad.append((order["journal_ref"], str(e)))
+        return done, bad
+
+    def _settle(self, done, bad):
+        records = [{"type": "done", "ref": ref, "order_id": order_id} for ref, order_id in done.items()]
+        records += [{"type": "failed", "ref": ref, "error": error} for ref, error in bad]
+        if not records:
+            return
+        with self._lock:
+            self._append(records)
+            for ref in done:
+                self._pending.pop(ref, None)
+            for ref, error in bad:
+                self._failed[ref] = (self._pending.pop(ref), error)
+
+    def _compact(self):
+        with self._lock:
+            if self._file.tell() < COMPACT_BYTES:
+                return
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                for record, error in self._failed.values():
+                    f.write(_line(record))
+                    f.write(_line({"type": "failed", "ref": record["ref"], "error": error}))
+                for record in self._pending.values():
+                    f.write(_line(record))
+                f.flush()
+                os.fsync(f.fileno())
+            self._file.close()
+            os.replace(tmp, self.path)
+            self._file = open(self.path, "a", encoding="utf-8")
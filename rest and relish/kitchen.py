@@ -0,0 +1,207 @@
+"""
+Kitchen tickets.
+
+A line added to (or taken off) a tab goes to the kitchen at once, not when
+the bill is paid. The till is the producer: TicketQueue.put() only appends
+to a queue and never waits on the network. A sender thread is the
+consumer: it takes every ticket waiting, writes them in one go as JSON
+lines over TCP to the kitchen display and, while the display is down,
+reconnects with backoff - tickets queued meanwhile go out once it is back.
+Past MAX_QUEUED waiting tickets the oldest are dropped.
+
+A blank line ends each batch and the display answers it with "ok" once
+the batch is shown. A batch is only done when that answer arrives: a
+write to a display that has restarted can still land in the socket
+buffer, so without it the batch would be silently lost. Unanswered
+batches are sent again on a new connection, and the display skips ticket
+ids it has already shown.
+
+The display is this module run as its own process, listening on
+RR_KITCHEN_ADDR (host:port, default 127.0.0.1:8765; set it empty on a
+terminal to send nothing):
+
+    python kitchen.py                          # prints tickets as they arrive
+    python kitchen.py --listen 0.0.0.0:8765 --json
+"""
+import argparse
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import sys
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+KITCHEN_ADDR = os.environ.get("RR_KITCHEN_ADDR", "127.0.0.1:8765")
+MAX_QUEUED = 1000
+CONNECT_TIMEOUT = 2  # seconds
+ACK_TIMEOUT = 5      # seconds to wait for the display's "ok"
+RETRY_MAX = 30       # seconds between reconnects, at most
+RECENT_IDS = 10000   # ticket ids the display remembers, to skip resent ones
+
+log = logging.getLogger("kitchen")
+
+
+def parse_address(text):
+    host, _, port = text.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def ticket(table_number, ref, item_id, name, quantity):
+    """`quantity` more of a menu item for a table's tab; negative when taken off."""
+    return {"id": uuid.uuid4().hex, "at": datetime.now().isoformat(" ", "seconds"), "table": table_number,
+            "tab": ref, "item_id": item_id, "name": name, "quantity": quantity}
+
+
+# --- Sending (the till) ---
+
+class TicketQueue:
+    def __init__(self, address=KITCHEN_ADDR, max_queued=MAX_QUEUED):
+        self.address = parse_address(address) if address else None
+        self.max_queued = max_queued
+        self.sent = 0
+        self.dropped = 0
+        self._queue = queue.Queue()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.address is None:
+            return
+        self._thread = threading.Thread(target=self._run, name="kitchen-tickets", daemon=True)
+        self._thread.start()
+
+    def put(self, ticket):
+        if self._thread is None:
+            return
+        self._queue.put(ticket)
+        while self._queue.qsize() > self.max_queued:
+            try:
+                self._queue.get_nowait()
+                self.dropped += 1
+            except queue.Empty:
+                break
+
+    def close(self, timeout=2):
+        """Stops the sender after one last try at what is still queued."""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _take(self, batch):
+        """
+        Adds every ticket waiting to `batch`, after waiting for one if it is
+        empty. A batch held back while the display is down keeps growing, so
+        it is trimmed to the newest max_queued tickets like the queue is.
+        """
+        if not batch:
+            batch.append(self._queue.get())
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        batch = [t for t in batch if t is not None]
+        if len(batch) > self.max_queued:
+            self.dropped += len(batch) - self.max_queued
+            batch = batch[-self.max_queued:]
+        return batch
+
+    def _run(self):
+        sock, replies, batch, delay, down = None, None, [], 0.5, False
+        while True:
+            batch = self._take(batch)
+            if batch:
+                try:
+                    if sock is None:
+                        sock = socket.create_connection(self.address, timeout=CONNECT_TIMEOUT)
+                        sock.settimeout(ACK_TIMEOUT)
+                        replies = sock.makefile("rb")
+                    sock.sendall(("".join(json.dumps(t, separators=(",", ":")) + "\n" for t in batch) + "\n").encode("utf-8"))
+                    if replies.readline().strip() != b"ok":
+                        raise ConnectionError("the kitchen display did not acknowledge the tickets")
+                    self.sent += len(batch)
+                    batch, delay = [], 0.5
+                    if down:
+                        log.info("Kitchen display reachable again; queued tickets sent.")
+                        down = False
+                except OSError as e:
+                    if sock is not None:
+                        replies.close()
+                        sock.close()
+                        sock, replies = None, None
+                    if not down:
+                        log.warning("Kitchen display %s:%s unreachable, tickets are queued: %s", *self.address, e)
+                        down = True
+            if self._stopping.is_set():
+                break
+            if batch:
+                self._stopping.wait(delay)
+                delay = min(delay * 2, RETRY_MAX)
+        if sock is not None:
+            replies.close()
+            sock.close()
+
+
+# --- Display (the kitchen) ---
+
+def format_ticket(t):
+    quantity = t.get("quantity", 0)
+    what = f"{quantity} x {t.get('name')}" if quantity > 0 else f"VOID {-quantity} x {t.get('name')}"
+    return f"{str(t.get('at', ''))[11:]}  Table {t.get('table')!s:<5} {what}"
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                self.wfile.write(b"ok\n")  # end of a batch: all of it is shown
+                continue
+            try:
+                t = json.loads(line)
+            except ValueError:
+                continue
+            with self.server.output_lock:
+                recent = self.server.recent
+                if t.get("id") is not None:
+                    if t["id"] in recent:
+                        continue  # resent after its "ok" was lost
+                    recent[t["id"]] = True
+                    if len(recent) > RECENT_IDS:
+                        recent.popitem(last=False)
+                print(json.dumps(t) if self.server.raw else format_ticket(t), flush=True)
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True  # one per till
+
+
+def serve(address, raw=False):
+    with _Server(address, _Handler) as server:
+        server.raw = raw
+        server.output_lock = threading.Lock()
+        server.recent = OrderedDict()  # ticket ids shown, oldest first
+        print(f"Kitchen display listening on {address[0]}:{address[1]}", file=sys.stderr)
+        server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rest & Relish kitchen display")
+    parser.add_argument("--listen", default=KITCHEN_ADDR or "127.0.0.1:8765", help="host:port (default: RR_KITCHEN_ADDR)")
+    parser.add_argument("--json", action="store_true", help="print tickets as JSON lines")
+    args = parser.parse_args(argv)
+    try:
+        serve(parse_address(args.listen), raw=args.json)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
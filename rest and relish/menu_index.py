@@ -0,0 +1,68 @@
+"""
+Menu search.
+
+MenuIndex is built once from the cached menu rows: every prefix of every
+word in an item's name and category maps to the items it matches, and
+every category to its items. A keystroke in the restaurant tab's search
+box is then a few dict lookups and a set intersection - no query - and
+the list is rebuilt from the result.
+
+Items ordered most over the last POPULAR_DAYS (queries.fetch_item_popularity)
+are pinned to the top of whatever the filter leaves, so the dishes servers
+look for all day are a click away.
+"""
+import re
+
+PINNED = 5          # most-ordered matches shown above the rest
+POPULAR_DAYS = 14   # how far back order counts go
+
+_WORDS = re.compile(r"\w+")
+
+
+def words(text):
+    return _WORDS.findall((text or "").lower())
+
+
+class MenuIndex:
+    def __init__(self, items, popularity=None):
+        self.items = {item['item_id']: item for item in items}
+        self.popularity = dict(popularity or {})   # item_id -> quantity ordered lately
+        self._prefixes = {}   # word prefix -> set of item_ids
+        self._categories = {} # category -> set of item_ids
+        for item in items:
+            item_id = item['item_id']
+            self._categories.setdefault(item['category'] or "", set()).add(item_id)
+            for word in set(words(item['name']) + words(item['category'])):
+                for end in range(1, len(word) + 1):
+                    self._prefixes.setdefault(word[:end], set()).add(item_id)
+        # Display order without a filter: category, then name
+        self._order = sorted(self.items, key=lambda i: ((self.items[i]['category'] or ""),
+                                                         self.items[i]['name'].lower(), i))
+
+    def categories(self):
+        return sorted(c for c in self._categories if c)
+
+    def record_order(self, items):
+        """Counts an order just placed on this terminal towards the pinned items."""
+        for item in items:
+            self.popularity[item['item_id']] = self.popularity.get(item['item_id'], 0) + item['quantity']
+
+    def search(self, text="", category=None):
+        """
+        Returns (pinned, rest): menu rows matching every word of `text` as a
+        prefix, within `category` if given. `pinned` are the most ordered
+        matches, most ordered first; `rest` the others in menu order.
+        """
+        matches = None
+        if category:
+            matches = set(self._categories.get(category, ()))
+        for word in words(text):
+            found = self._prefixes.get(word, set())
+            matches = set(found) if matches is None else matches & found
+            if not matches:
+                return [], []
+
+        ordered = self._order if matches is None else [i for i in self._order if i in matches]
+        popular = sorted((i for i in ordered if self.popularity.get(i)), key=lambda i: -self.popularity[i])[:PINNED]
+        pinned = set(popular)
+        return [self.items[i] for i in popular], [self.items[i] for i in ordered if i not in pinned]
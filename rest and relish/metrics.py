@@ -0,0 +1,369 @@
+"""
+Query instrumentation.
+
+Every pooled connection (db.PooledConnection) reports its execute,
+executemany, fetch, commit and rollback calls here. Statements are
+attributed to the operation running on their thread - the executor and
+the API server wrap each job in operation() - so the numbers answer "which
+part of the system is slow":
+
+  * rr_operation_seconds   histogram per operation (check_in, folio, ...)
+  * rr_statement_seconds   histogram per operation and statement type
+  * rr_rows_total          rows fetched or changed per operation
+  * rr_slow_queries_total  statements slower than the slow-query threshold
+  * rr_retries_total       transactions re-run after losing a lock race
+
+Slow statements are also kept in a short in-memory log and, when
+RR_SLOW_QUERY_LOG is set, appended to that file. Everything can be
+exported as Prometheus text (write_prometheus(), for a node_exporter
+textfile collector - the app rewrites RR_METRICS_FILE every
+METRICS_EXPORT_SECONDS when it is set - or GET /metrics on api.py) or as a
+JSON snapshot().
+
+StartupTimer breaks the desktop client's startup into phases (imports,
+window and tab build, connect, first data) and prints them once the first
+tab has its data; with RR_STARTUP_LOG set each report is also appended to
+that file as a JSON line, so regressions show up run over run.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+SLOW_QUERY_MS = float(os.environ.get("RR_SLOW_QUERY_MS", "200"))
+SLOW_QUERY_LOG = os.environ.get("RR_SLOW_QUERY_LOG")  # file to append slow statements to
+SLOW_LOG_SIZE = 200
+METRICS_FILE = os.environ.get("RR_METRICS_FILE")  # Prometheus text file the app keeps up to date
+METRICS_EXPORT_SECONDS = 15
+STARTUP_LOG = os.environ.get("RR_STARTUP_LOG")  # file to append startup timing reports to
+
+# Upper bounds in seconds; the last bucket is +Inf
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Job function name -> operation name shown in the metrics
+OPERATION_NAMES = {
+    "check_in": "check_in",
+    "check_out": "check_out",
+    "booking_folio": "folio",
+    "place_order": "payment",
+    "fetch_rooms": "refresh_rooms",
+    "fetch_tables": "refresh_tables",
+    "fetch_menu": "refresh_menu",
+    "fetch_changes": "change_feed",
+}
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        i = 0
+        while i < len(BUCKETS) and seconds > BUCKETS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q):
+        """Estimated from the buckets: the upper bound of the bucket holding the q-th observation."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return BUCKETS[i] if i < len(BUCKETS) else float("inf")
+        return float("inf")
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "sum_seconds": round(self.sum, 6),
+            "mean_ms": round(self.sum / self.count * 1000, 3) if self.count else None,
+            "p50_ms": _ms(self.quantile(0.5)),
+            "p95_ms": _ms(self.quantile(0.95)),
+            "p99_ms": _ms(self.quantile(0.99)),
+            "buckets": {("+Inf" if i == len(BUCKETS) else str(BUCKETS[i])): n for i, n in enumerate(self.counts)},
+        }
+
+
+def _ms(seconds):
+    if seconds is None:
+        return None
+    return "inf" if seconds == float("inf") else seconds * 1000
+
+
+def operation_name(fn):
+    name = getattr(fn, "__name__", str(fn))
+    return OPERATION_NAMES.get(name, name)
+
+
+class Metrics:
+    def __init__(self, slow_query_ms=SLOW_QUERY_MS, slow_log_path=SLOW_QUERY_LOG):
+        self.slow_query_ms = slow_query_ms
+        self.slow_log_path = slow_log_path
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._operations = {}   # operation -> Histogram
+        self._statements = {}   # (operation, statement type) -> Histogram
+        self._rows = {}         # operation -> rows fetched/changed
+        self._slow_count = {}   # operation -> slow statements
+        self._retries = {}      # operation -> transactions retried after a deadlock/lock timeout
+        self._slow_log = deque(maxlen=SLOW_LOG_SIZE)
+        self.started_at = time.time()
+
+    # --- Recording ---
+
+    def current_operation(self):
+        return getattr(self._local, "operation", None) or "other"
+
+    @contextmanager
+    def operation(self, name):
+        """Attributes the statements run inside the block to `name` and times the block."""
+        outer = getattr(self._local, "operation", None)
+        self._local.operation = name
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self._local.operation = outer
+            with self._lock:
+                self._operations.setdefault(name, Histogram()).observe(elapsed)
+
+    def statement(self, kind, sql, seconds, rows=0):
+        operation = self.current_operation()
+        slow = seconds * 1000 >= self.slow_query_ms
+        with self._lock:
+            self._statements.setdefault((operation, kind), Histogram()).observe(seconds)
+            if rows > 0:
+                self._rows[operation] = self._rows.get(operation, 0) + rows
+            if slow:
+                self._slow_count[operation] = self._slow_count.get(operation, 0) + 1
+                entry = {
+                    "at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                    "operation": operation,
+                    "ms": round(seconds * 1000, 2),
+                    "sql": " ".join(sql.split()) if sql else kind,
+                }
+                self._slow_log.append(entry)
+        if slow and self.slow_log_path:
+            try:
+                with open(self.slow_log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry) + "\n")
+            except OSError:
+                pass  # the in-memory log still has it
+
+    def retried(self):
+        with self._lock:
+            operation = self.current_operation()
+            self._retries[operation] = self._retries.get(operation, 0) + 1
+
+    def rows(self, count):
+        if count > 0:
+            with self._lock:
+                operation = self.current_operation()
+                self._rows[operation] = self._rows.get(operation, 0) + count
+
+    def reset(self):
+        with self._lock:
+            self._operations.clear()
+            self._statements.clear()
+            self._rows.clear()
+            self._slow_count.clear()
+            self._retries.clear()
+            self._slow_log.clear()
+            self.started_at = time.time()
+
+    # --- Export ---
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "started_at": self.started_at,
+                "slow_query_ms": self.slow_query_ms,
+                "operations": {name: h.summary() for name, h in sorted(self._operations.items())},
+                "statements": {f"{op}/{kind}": h.summary() for (op, kind), h in sorted(self._statements.items())},
+                "rows": dict(sorted(self._rows.items())),
+                "slow_queries": dict(sorted(self._slow_count.items())),
+                "retries": dict(sorted(self._retries.items())),
+                "slow_log": list(self._slow_log),
+            }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self):
+        lines = []
+        with self._lock:
+            lines.append("# HELP rr_operation_seconds Time spent in each operation (check_in, folio, payment, ...).")
+            lines.append("# TYPE rr_operation_seconds histogram")
+            for name, h in sorted(self._operations.items()):
+                lines.extend(_prometheus_histogram("rr_operation_seconds", {"operation": name}, h))
+            lines.append("# HELP rr_statement_seconds Time spent in database calls, per operation and statement type.")
+            lines.append("# TYPE rr_statement_seconds histogram")
+            for (op, kind), h in sorted(self._statements.items()):
+                lines.extend(_prometheus_histogram("rr_statement_seconds", {"operation": op, "statement": kind}, h))
+            lines.append("# HELP rr_rows_total Rows fetched or changed, per operation.")
+            lines.append("# TYPE rr_rows_total counter")
+            for op, n in sorted(self._rows.items()):
+                lines.append(f'rr_rows_total{{operation="{op}"}} {n}')
+            lines.append(f"# HELP rr_slow_queries_total Statements slower than {self.slow_query_ms:g} ms, per operation.")
+            lines.append("# TYPE rr_slow_queries_total counter")
+            for op, n in sorted(self._slow_count.items()):
+                lines.append(f'rr_slow_queries_total{{operation="{op}"}} {n}')
+            lines.append("# HELP rr_retries_total Transactions re-run after a deadlock or lock wait timeout, per operation.")
+            lines.append("# TYPE rr_retries_total counter")
+            for op, n in sorted(self._retries.items()):
+                lines.append(f'rr_retries_total{{operation="{op}"}} {n}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Writes the Prometheus text atomically (textfile collectors may read it at any moment)."""
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp, path)
+
+    def write_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_json())
+
+
+class StartupTimer:
+    """
+    Startup phases, in seconds. Phases are timed blocks (phase()) or spans
+    between two calls (begin()/end(), e.g. a connect on another thread);
+    marks are times since `started` (window shown, first data).
+    """
+
+    def __init__(self, started=None):
+        self.started = started if started is not None else time.perf_counter()
+        self.phases = {}  # name -> seconds, in the order they finished
+        self.marks = {}   # name -> seconds since started
+        self._open = {}   # name -> perf_counter() at begin()
+        self.reported = False
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - started
+
+    def record(self, name, seconds):
+        self.phases[name] = seconds
+
+    def begin(self, name):
+        self._open[name] = time.perf_counter()
+
+    def end(self, name):
+        started = self._open.pop(name, None)
+        if started is not None:
+            self.phases[name] = time.perf_counter() - started
+
+    def mark(self, name):
+        """Records the first time `name` happens; later calls are ignored."""
+        self.marks.setdefault(name, time.perf_counter() - self.started)
+
+    def snapshot(self):
+        return {
+            "at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "phases_ms": {name: round(s * 1000, 1) for name, s in self.phases.items()},
+            "marks_ms": {name: round(s * 1000, 1) for name, s in self.marks.items()},
+        }
+
+    def report(self):
+        lines = ["Startup timing:"]
+        lines += [f"  {name:<24}{s * 1000:>9.1f} ms" for name, s in self.phases.items()]
+        lines += [f"  {name:<24}{s * 1000:>9.1f} ms after start" for name, s in self.marks.items()]
+        return "\n".join(lines)
+
+    def publish(self, log_path=STARTUP_LOG):
+        """Prints the report (once) and appends it to `log_path` if set."""
+        if self.reported:
+            return
+        self.reported = True
+        print(self.report())
+        if log_path:
+            try:
+                with open(log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(self.snapshot()) + "\n")
+            except OSError:
+                pass
+
+
+def _prometheus_histogram(metric, labels, h):
+    label_text = ",".join(f'{k}="{v}"' for k, v in labels.items())
+    cumulative = 0
+    for i, n in enumerate(h.counts):
+        cumulative += n
+        le = "+Inf" if i == len(BUCKETS) else f"{BUCKETS[i]:g}"
+        yield f'{metric}_bucket{{{label_text},le="{le}"}} {cumulative}'
+    yield f"{metric}_sum{{{label_text}}} {h.sum:.6f}"
+    yield f"{metric}_count{{{label_text}}} {h.count}"
+
+
+def statement_kind(sql):
+    words = sql.split(None, 1) if sql else ()
+    return words[0].upper() if words else "OTHER"
+
+
+class InstrumentedCursor:
+    """Wraps a DB-API cursor and reports each call's latency and rows to a Metrics registry."""
+
+    def __init__(self, cursor, registry):
+        self._cursor = cursor
+        self._metrics = registry
+
+    def execute(self, sql, params=()):
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(sql, params)
+        finally:
+            kind = statement_kind(sql)
+            changed = self._cursor.rowcount if kind in ("INSERT", "UPDATE", "DELETE") else 0
+            self._metrics.statement(kind, sql, time.perf_counter() - started, max(changed or 0, 0))
+
+    def executemany(self, sql, seq_of_params):
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(sql, seq_of_params)
+        finally:
+            changed = self._cursor.rowcount
+            self._metrics.statement(statement_kind(sql), sql, time.perf_counter() - started, max(changed or 0, 0))
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        self._metrics.rows(1 if row is not None else 0)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._cursor.fetchmany(size) if size is not None else self._cursor.fetchmany()
+        self._metrics.rows(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._metrics.rows(len(rows))
+        return rows
+
+    def __iter__(self):
+        for row in self._cursor:
+            self._metrics.rows(1)
+            yield row
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+REGISTRY = Metrics()
@@ -0,0 +1,240 @@
+"""
+Versioned schema migrations.
+
+database.sql / database_sqlite.sql describe a fresh install. Databases
+created from an older dump are brought up to date on startup by
+migrate(), which db.create_pool() runs after connecting. Applied versions
+are recorded in `schema_migrations`.
+
+Every step is idempotent (CREATE ... IF NOT EXISTS, or an existence check
+first), so two terminals starting at the same moment, or a migration that
+was interrupted half way, are both safe to re-run.
+"""
+import queries
+from db import Error
+
+
+# --- Step helpers ---
+
+def create_table(mysql_sql, sqlite_sql):
+    def step(cursor, dialect):
+        cursor.execute(mysql_sql if dialect == "mysql" else sqlite_sql)
+    return step
+
+
+def create_index(table, name, columns, nocase=False, unique=False, dialects=("mysql", "sqlite")):
+    """
+    nocase=True builds the SQLite index with COLLATE NOCASE, which SQLite
+    needs to serve `LIKE 'prefix%'` from it (MySQL's _ci collations
+    already compare case-insensitively).
+    """
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+
+    def step(cursor, dialect):
+        if dialect not in dialects:
+            return
+        cols = ", ".join(f"`{c}`" for c in columns)
+        if dialect == "sqlite":
+            if nocase:
+                cols = ", ".join(f"`{c}` COLLATE NOCASE" for c in columns)
+            cursor.execute(f"CREATE {kind} IF NOT EXISTS `{name}` ON `{table}` ({cols})")
+            return
+        # MySQL 8.0 has no CREATE INDEX IF NOT EXISTS
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+        """, (table, name))
+        if cursor.fetchone()[0] == 0:
+            cursor.execute(f"CREATE {kind} `{name}` ON `{table}` ({cols})")
+    return step
+
+
+def add_column(table, name, definition):
+    def step(cursor, dialect):
+        if dialect == "sqlite":
+            cursor.execute(f"PRAGMA table_info(`{table}`)")
+            exists = any(row[1] == name for row in cursor.fetchall())
+        else:
+            cursor.execute("""
+                SELECT COUNT(*) FROM information_schema.columns
+                WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+            """, (table, name))
+            exists = cursor.fetchone()[0] > 0
+        if not exists:
+            cursor.execute(f"ALTER TABLE `{table}` ADD COLUMN `{name}` {definition}")
+    return step
+
+
+def run_sql(sql):
+    def step(cursor, dialect):
+        cursor.execute(sql)
+    return step
+
+
+def backfill(fn):
+    """
+    fn(cursor) fills a new table from existing rows; it must be safe to run
+    twice. It runs in a transaction of its own, so orders written meanwhile
+    by terminals already running wait for it rather than interleave with it.
+    """
+    def step(cursor, dialect):
+        fn(cursor)
+    step.transaction = True
+    return step
+
+
+# --- Migrations ---
+# (version, description, [steps]) - append only, never edit a released entry
+
+MIGRATIONS = [
+    (1, "change feed table", [
+        create_table("""
+            CREATE TABLE IF NOT EXISTS `changes` (
+              `seq` bigint NOT NULL AUTO_INCREMENT,
+              `entity` varchar(20) NOT NULL,
+              `entity_id` int NOT NULL,
+              `changed_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP,
+              PRIMARY KEY (`seq`)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci
+        """, """
+            CREATE TABLE IF NOT EXISTS `changes` (
+              `seq` INTEGER PRIMARY KEY AUTOINCREMENT,
+              `entity` varchar(20) NOT NULL,
+              `entity_id` int NOT NULL,
+              `changed_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """),
+    ]),
+    (2, "booking folio ledger", [
+        create_table("""
+            CREATE TABLE IF NOT EXISTS `booking_folios` (
+              `booking_id` int NOT NULL,
+              `room_total` decimal(10,2) NOT NULL DEFAULT '0.00',
+              `restaurant_total` decimal(10,2) NOT NULL DEFAULT '0.00',
+              `order_count` int NOT NULL DEFAULT '0',
+              `updated_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP,
+              PRIMARY KEY (`booking_id`),
+              CONSTRAINT `booking_folios_ibfk_1` FOREIGN KEY (`booking_id`) REFERENCES `bookings` (`booking_id`)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci
+        """, """
+            CREATE TABLE IF NOT EXISTS `booking_folios` (
+              `booking_id` INTEGER PRIMARY KEY REFERENCES `bookings` (`booking_id`),
+              `room_total` decimal(10,2) NOT NULL DEFAULT 0.00,
+              `restaurant_total` decimal(10,2) NOT NULL DEFAULT 0.00,
+              `order_count` int NOT NULL DEFAULT 0,
+              `updated_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """),
+        run_sql(queries.FOLIO_BACKFILL_QUERY.format(extra="")),  # bookings made before the ledger
+    ]),
+    (3, "hot-path indexes", [
+        create_index("orders", "orders_booking_status", ["booking_id", "order_status"]),
+        create_index("bookings", "bookings_room_active", ["room_id", "is_active"]),
+        create_index("bookings", "bookings_active", ["is_active"]),
+        create_index("rooms", "rooms_occupied", ["is_occupied"]),
+    ]),
+    (4, "guest search indexes", [
+        create_index("guests", "guests_name", ["last_name", "first_name"], nocase=True),
+        create_index("guests", "guests_first_name", ["first_name"], nocase=True),
+        create_index("guests", "guests_phone", ["phone"], nocase=True),
+        # MySQL searches emails with the UNIQUE KEY `email`
+        create_index("guests", "guests_email", ["email"], nocase=True, dialects=("sqlite",)),
+    ]),
+    (5, "night audit indexes", [
+        create_index("orders", "orders_timestamp", ["order_timestamp"]),
+        create_index("bookings", "bookings_check_out", ["check_out_date", "check_in_date"]),
+    ]),
+    (6, "order journal references", [
+        # Set on orders replayed from a terminal's payment journal, so a
+        # replay after a crash can't insert the same sale twice
+        add_column("orders", "journal_ref", "char(32) DEFAULT NULL"),
+        create_index("orders", "orders_journal_ref", ["journal_ref"], unique=True),
+    ]),
+    (7, "open tabs", [
+        # Finds a table's 'open' order (open_tabs.py) when the table is selected
+        create_index("orders", "orders_table_status", ["table_id", "order_status"]),
+    ]),
+    (8, "revenue rollups", [
+        create_table("""
+            CREATE TABLE IF NOT EXISTS `revenue_rollups` (
+              `dimension` varchar(20) NOT NULL,
+              `day` date NOT NULL,
+              `member` varchar(50) NOT NULL,
+              `orders` int NOT NULL DEFAULT '0',
+              `items` int NOT NULL DEFAULT '0',
+              `revenue` decimal(12,2) NOT NULL DEFAULT '0.00',
+              PRIMARY KEY (`dimension`, `day`, `member`)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci
+        """, """
+            CREATE TABLE IF NOT EXISTS `revenue_rollups` (
+              `dimension` varchar(20) NOT NULL,
+              `day` date NOT NULL,
+              `member` varchar(50) NOT NULL,
+              `orders` int NOT NULL DEFAULT 0,
+              `items` int NOT NULL DEFAULT 0,
+              `revenue` decimal(12,2) NOT NULL DEFAULT 0.00,
+              PRIMARY KEY (`dimension`, `day`, `member`)
+            )
+        """),
+        backfill(queries.rebuild_rollups),  # orders paid before the rollups existed
+    ]),
+]
+
+
+# --- Runner ---
+
+def _ensure_version_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+          version int NOT NULL PRIMARY KEY,
+          description varchar(100) NOT NULL,
+          applied_at timestamp NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def applied_versions(conn):
+    cursor = conn.cursor()
+    try:
+        _ensure_version_table(cursor)
+        cursor.execute("SELECT version FROM schema_migrations")
+        return {row[0] for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+
+
+def migrate(conn, dialect):
+    """Applies every pending migration in order. Returns the versions applied."""
+    done = applied_versions(conn)
+    applied = []
+    cursor = conn.cursor()
+    try:
+        for version, description, steps in MIGRATIONS:
+            if version in done:
+                continue
+            # No transaction around DDL: MySQL commits it implicitly, which
+            # is why every step must be safe to run twice. Backfills get one.
+            for step in steps:
+                if not getattr(step, "transaction", False):
+                    step(cursor, dialect)
+                    continue
+                conn.start_transaction()
+                try:
+                    step(cursor, dialect)
+                    conn.commit()
+                except Error:
+                    conn.rollback()
+                    raise
+            try:
+                cursor.execute(
+                    "INSERT INTO schema_migrations (version, description, applied_at) VALUES (%s, %s, NOW())",
+                    (version, description)
+                )
+            except Error:
+                # Another terminal recorded it first
+                if version not in applied_versions(conn):
+                    raise
+            applied.append(version)
+    finally:
+        cursor.close()
+    return applied
@@ -0,0 +1,230 @@
+"""
+Night audit: the end-of-day report.
+
+Streams the day's orders and order lines and the stays covering the night
+through unbuffered cursors (db.stream) and totals them as they go, so
+memory stays flat however many orders there are. Every query is a range
+scan on an index (orders_timestamp, bookings_check_out), so only the
+day's rows are read from a multi-million-row orders table.
+
+    python night_audit.py                          # today, text report to stdout
+    python night_audit.py --date 2024-03-14 --format json --output audit.json
+
+The report covers:
+  * restaurant revenue by status (paid / charged_to_room), table, room and
+    menu category
+  * occupancy: rooms sold for the night, occupancy %, room revenue, ADR
+    and RevPAR
+  * unpaid room charges: restaurant orders charged to rooms of guests
+    still in house, and their open folio balances
+
+Stays count whether or not the guest has checked out since, so a past
+night can be audited again later. The schema can't tell a reservation
+cancelled before it began from a finished stay (check-out clears
+is_active for both), so such a reservation is counted too unless another
+booking had the room that night. Tables' open tabs are not revenue until
+they are paid, and are left out.
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import db
+
+ZERO = Decimal("0.00")
+
+
+def _day_bounds(day):
+    start = datetime(day.year, day.month, day.day)
+    return start, start + timedelta(days=1)
+
+
+def _bucket(totals, key, amount):
+    entry = totals.get(key)
+    if entry is None:
+        entry = totals[key] = {"orders": 0, "revenue": ZERO}
+    entry["orders"] += 1
+    entry["revenue"] += amount
+
+
+# --- Streams (each is exhausted before the next starts: the cursors are unbuffered) ---
+
+def audit_orders(conn, day):
+    """Revenue by status, table and room from the day's orders."""
+    start, end = _day_bounds(day)
+    by_status, by_table, by_room = {}, {}, {}
+    count, revenue = 0, ZERO
+    for status, table_number, room_number, total in db.stream(conn, """
+        SELECT o.order_status, t.table_number, r.room_number, o.order_total
+        FROM orders o
+        LEFT JOIN tables t ON t.table_id = o.table_id
+        LEFT JOIN bookings b ON b.booking_id = o.booking_id
+        LEFT JOIN rooms r ON r.room_id = b.room_id
+        WHERE o.order_timestamp >= %s AND o.order_timestamp < %s AND o.order_status <> 'open'
+    """, (start, end)):
+        total = total or ZERO
+        count += 1
+        revenue += total
+        _bucket(by_status, status, total)
+        _bucket(by_table, table_number or "(none)", total)
+        if room_number is not None:
+            _bucket(by_room, room_number, total)
+    return {"orders": count, "revenue": revenue,
+            "by_status": by_status, "by_table": by_table, "by_room": by_room}
+
+
+def audit_categories(conn, day):
+    """Items sold and revenue per menu category from the day's order lines."""
+    start, end = _day_bounds(day)
+    by_category = {}
+    for category, quantity, sub_total in db.stream(conn, """
+        SELECT m.category, oi.quantity, oi.sub_total
+        FROM orders o
+        JOIN order_items oi ON oi.order_id = o.order_id
+        JOIN menu_items m ON m.item_id = oi.item_id
+        WHERE o.order_timestamp >= %s AND o.order_timestamp < %s AND o.order_status <> 'open'
+    """, (start, end)):
+        entry = by_category.setdefault(category or "(none)", {"items": 0, "revenue": ZERO})
+        entry["items"] += quantity
+        entry["revenue"] += sub_total or ZERO
+    return by_category
+
+
+def audit_occupancy(conn, day):
+    """Rooms sold for the night starting on `day` and what they earned."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT COUNT(*) FROM rooms")
+        rooms = cursor.fetchone()[0]
+    finally:
+        cursor.close()
+
+    sold, room_revenue, by_type = set(), ZERO, {}
+    # check_out_date > day is the selective side: it skips the whole history
+    for room_id, room_type, check_in, check_out, cost in db.stream(conn, """
+        SELECT b.room_id, r.room_type, b.check_in_date, b.check_out_date, b.total_room_cost
+        FROM bookings b
+        JOIN rooms r ON r.room_id = b.room_id
+        WHERE b.check_out_date > %s AND b.check_in_date <= %s
+    """, (day, day)):
+        if room_id in sold:
+            continue  # a cancelled reservation next to the stay that replaced it
+        sold.add(room_id)
+        nightly = (cost or ZERO) / max((check_out - check_in).days, 1)
+        room_revenue += nightly
+        entry = by_type.setdefault(room_type, {"rooms": 0, "revenue": ZERO})
+        entry["rooms"] += 1
+        entry["revenue"] += nightly
+    occupied = len(sold)
+    return {
+        "rooms": rooms,
+        "occupied": occupied,
+        "occupancy_pct": round(occupied * 100 / rooms, 1) if rooms else 0.0,
+        "room_revenue": room_revenue.quantize(ZERO),
+        "adr": (room_revenue / occupied).quantize(ZERO) if occupied else ZERO,
+        "revpar": (room_revenue / rooms).quantize(ZERO) if rooms else ZERO,
+        "by_room_type": {k: {"rooms": v["rooms"], "revenue": v["revenue"].quantize(ZERO)} for k, v in by_type.items()},
+    }
+
+
+def audit_unpaid(conn):
+    """Folios of the guests in house: restaurant charges not yet settled at check-out."""
+    count, room_total, restaurant_total, charged_orders = 0, ZERO, ZERO, 0
+    for room, restaurant, orders in db.stream(conn, """
+        SELECT f.room_total, f.restaurant_total, f.order_count
+        FROM bookings b
+        JOIN booking_folios f ON f.booking_id = b.booking_id
+        WHERE b.is_active = 1
+    """):
+        count += 1
+        room_total += room or ZERO
+        restaurant_total += restaurant or ZERO
+        charged_orders += orders or 0
+    return {"open_folios": count, "charged_orders": charged_orders, "restaurant_charges": restaurant_total,
+            "room_charges": room_total, "balance": room_total + restaurant_total}
+
+
+def run_audit(conn, day):
+    started = time.perf_counter()
+    report = {"date": day.isoformat(), "generated_at": datetime.now().isoformat(timespec="seconds")}
+    report["restaurant"] = audit_orders(conn, day)
+    report["restaurant"]["by_category"] = audit_categories(conn, day)
+    report["occupancy"] = audit_occupancy(conn, day)
+    report["unpaid"] = audit_unpaid(conn)
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    return report
+
+
+# --- Output ---
+
+def _money(value):
+    return f"{value:,.2f}"
+
+
+def format_text(report):
+    r, occ, unpaid = report["restaurant"], report["occupancy"], report["unpaid"]
+    lines = [f"NIGHT AUDIT - {report['date']}", f"Generated {report['generated_at']}", ""]
+    lines += ["OCCUPANCY",
+              f"  Rooms sold          {occ['occupied']} of {occ['rooms']} ({occ['occupancy_pct']}%)",
+              f"  Room revenue        {_money(occ['room_revenue'])}",
+              f"  ADR                 {_money(occ['adr'])}",
+              f"  RevPAR              {_money(occ['revpar'])}"]
+    for room_type, v in sorted(occ["by_room_type"].items()):
+        lines.append(f"    {room_type:<18}{v['rooms']:>5} rooms {_money(v['revenue']):>14}")
+
+    lines += ["", "RESTAURANT",
+              f"  Orders              {r['orders']}",
+              f"  Revenue             {_money(r['revenue'])}"]
+    for title, key in (("By status", "by_status"), ("By table", "by_table"), ("By room", "by_room")):
+        lines.append(f"  {title}:")
+        for name, v in sorted(r[key].items(), key=lambda kv: str(kv[0])):
+            lines.append(f"    {str(name):<18}{v['orders']:>5} orders {_money(v['revenue']):>14}")
+    lines.append("  By category:")
+    for name, v in sorted(r["by_category"].items()):
+        lines.append(f"    {name:<18}{v['items']:>5} items  {_money(v['revenue']):>14}")
+
+    lines += ["", "UNPAID (guests in house)",
+              f"  Open folios         {unpaid['open_folios']}",
+              f"  Orders charged      {unpaid['charged_orders']}",
+              f"  Restaurant charges  {_money(unpaid['restaurant_charges'])}",
+              f"  Room charges        {_money(unpaid['room_charges'])}",
+              f"  Balance due         {_money(unpaid['balance'])}",
+              "", f"Audit ran in {report['seconds']:.2f}s"]
+    return "\n".join(lines) + "\n"
+
+
+def format_json(report):
+    return json.dumps(report, indent=2, default=str) + "\n"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rest & Relish night audit")
+    parser.add_argument("--date", type=date.fromisoformat, default=date.today(), help="day to audit (default: today)")
+    parser.add_argument("--format", choices=["text", "json"], default="text")
+    parser.add_argument("--output", help="write the report here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    try:
+        pool = db.create_pool(size=1)
+    except db.Error as e:
+        raise SystemExit(f"Cannot connect to the database: {e}")
+    try:
+        with pool.metrics.operation("night_audit"), pool.connection() as conn:
+            report = run_audit(conn, args.date)
+    finally:
+        pool.close()
+
+    output = (format_json if args.format == "json" else format_text)(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+        print(f"Night audit for {report['date']} written to {args.output} ({report['seconds']:.2f}s)", file=sys.stderr)
+    else:
+        sys.stdout.write(output)
+
+
+if __name__ == "__main__":
+    main()
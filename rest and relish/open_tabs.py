@@ -0,0 +1,149 @@
+"""
+Open tabs.
+
+A table's order is saved as it is taken, not only once it is paid: it is
+an `orders` row with order_status 'open' (and the table 'occupied') whose
+order_items are written as lines are added. Edits are coalesced per line
+in memory - three clicks on a dish before the next flush are one row, not
+three - and flush(), run on a worker thread every few hundred
+milliseconds, writes the changes of every tab in one transaction with
+multi-row INSERTs (queries.save_open_lines). A tab survives the app
+closing: select the table again, here or on another terminal, and it is
+read back (queries.fetch_open_order).
+
+Every tab has a random `ref`, stored in orders.journal_ref. Paying a tab
+goes through the payment journal like any sale, under the same ref, and
+the replay turns the open order into the paid one (queries.replay_orders).
+A table has one open tab at a time: a terminal that starts one on a table
+that already has a tab elsewhere adopts that tab instead (see flush()).
+"""
+import threading
+import uuid
+from decimal import Decimal
+
+import queries
+from cart import OrderCart
+from db import Error
+
+FLUSH_BATCH = 50  # tabs per save transaction
+
+
+class Tab:
+    def __init__(self, table_id, ref=None):
+        self.table_id = table_id
+        self.ref = ref or uuid.uuid4().hex
+        self.cart = OrderCart()
+        self.saved = False  # True once its orders row exists
+
+
+class OpenTabs:
+    def __init__(self):
+        self._lock = threading.Lock()      # the dicts below
+        self._flushing = threading.Lock()  # one flush at a time
+        self._tabs = {}     # table_id -> Tab
+        self._pending = {}  # ref -> (table_id, {item_id: (quantity, sub_total)}) not yet saved
+
+    def get(self, table_id):
+        """The table's tab; a new, empty one if this terminal has none."""
+        with self._lock:
+            tab = self._tabs.get(table_id)
+            if tab is None:
+                tab = self._tabs[table_id] = Tab(table_id)
+            return tab
+
+    def adopt(self, table_id, ref, lines):
+        """
+        Takes the table's tab as read back from the database, `lines` being
+        (item_id, name, quantity, sub_total) rows, and returns it. Unsaved
+        edits made here to the same tab are kept as they are; lines added
+        here before the tab had been read back go on top of it.
+        """
+        with self._lock:
+            tab = self._tabs.get(table_id)
+            if tab is not None and (tab.ref in self._pending if tab.ref == ref else tab.saved):
+                return tab
+            fresh = Tab(table_id, ref)
+            fresh.saved = True
+            for item_id, name, quantity, sub_total in lines:
+                fresh.cart.add(item_id, name, (sub_total / quantity).quantize(Decimal("0.01")), quantity)
+            if tab is not None and tab.ref != ref:
+                self._pending.pop(tab.ref, None)
+                for line in tab.cart:
+                    merged = fresh.cart.add(line.item_id, line.name, line.unit_price, line.quantity)
+                    self._pending.setdefault(ref, (table_id, {}))[1][line.item_id] = (merged.quantity, merged.sub_total)
+            self._tabs[table_id] = fresh
+            return fresh
+
+    def set_line(self, tab, line):
+        """Records a cart line's new quantity (0 once it has left the cart) for the next flush."""
+        with self._lock:
+            self._pending.setdefault(tab.ref, (tab.table_id, {}))[1][line.item_id] = (line.quantity, line.sub_total)
+
+    def close(self, table_id):
+        """
+        Forgets the table's tab once it is paid. Edits not yet saved are
+        dropped: the payment carries every line.
+        """
+        with self._lock:
+            tab = self._tabs.pop(table_id, None)
+            if tab is not None:
+                self._pending.pop(tab.ref, None)
+            return tab
+
+    def pending_count(self):
+        return len(self._pending)
+
+    def flush(self, conn, batch_size=FLUSH_BATCH):
+        """
+        Runs on a worker thread. Saves the pending edits and returns (saved
+        {ref: order_id}, elsewhere {table_id: (ref, lines)}). A tab this
+        terminal started on a table that meanwhile got a tab on another
+        terminal is not saved; that tab is read back into `elsewhere`, for
+        the caller to adopt() - which puts this terminal's lines on top of
+        it. Raises Error if the database can't be reached; the edits are
+        then kept for the next flush.
+        """
+        if not self._flushing.acquire(blocking=False):
+            return {}, {}  # another flush is already at it
+        try:
+            saved, elsewhere, unclaimed = {}, {}, []
+            while True:
+                with self._lock:
+                    batch = list(self._pending.items())[:batch_size]
+                    # Edits made while these are saved start a new entry
+                    for ref, _ in batch:
+                        del self._pending[ref]
+                if not batch:
+                    break
+                try:
+                    written = queries.save_open_lines(
+                        conn, [{"ref": ref, "table_id": table_id, "lines": lines} for ref, (table_id, lines) in batch])
+                    for ref, (table_id, lines) in batch:
+                        if ref not in written:
+                            found = queries.fetch_open_order(conn, table_id)
+                            if found is None:
+                                unclaimed.append((ref, (table_id, lines)))  # paid meanwhile: try again
+                            else:
+                                elsewhere[table_id] = found
+                except Error:
+                    self._restore(batch + unclaimed)
+                    raise
+                with self._lock:
+                    for tab in self._tabs.values():
+                        if tab.ref in written:
+                            tab.saved = True
+                saved.update(written)
+            self._restore(unclaimed)
+            return saved, elsewhere
+        finally:
+            self._flushing.release()
+
+    def _restore(self, batch):
+        with self._lock:
+            open_refs = {tab.ref for tab in self._tabs.values()}
+            for ref, (table_id, lines) in batch:
+                if ref not in open_refs:
+                    continue  # paid meanwhile
+                newer = self._pending.setdefault(ref, (table_id, {}))[1]
+                for item_id, line in lines.items():
+                    newer.setdefault(item_id, line)
@@ -0,0 +1,975 @@
+"""
+Database queries used by the Rest & Relish windows.
+
+Every function takes a connection as its first argument and never touches a
+widget, so it can be run on a worker thread by executor.QueryExecutor.
+Results come back as plain lists/dicts for the GUI to render; the reference
+data and the hot lookups (rooms, tables, menu, the booking for a room)
+run as prepared statements (db.query) and return tuple rows that can also
+be read by column name (RoomRow, TableRow, ...).
+"""
+import functools
+import random
+import time
+from datetime import date
+from decimal import Decimal
+
+import db
+from db import Error
+
+RETRY_ATTEMPTS = 5        # tries of a transaction that keeps losing lock races
+RETRY_BACKOFF = 0.02      # seconds before the first retry; doubles each time, with jitter
+
+
+class BookingConflict(Error):
+    """The room already has a booking for some of the requested nights."""
+
+
+class TableConflict(Error):
+    """The table has an open tab, which is paid from the till holding it (see open_tabs.py)."""
+
+
+def _retry_on_contention(fn):
+    """
+    Re-runs a transaction function (which rolls back on error) when it lost
+    a lock race to another terminal: a deadlock or lock wait timeout on
+    MySQL, a busy database on SQLite. Other errors propagate at once.
+    """
+    @functools.wraps(fn)
+    def wrapper(conn, *args, **kwargs):
+        for attempt in range(1, RETRY_ATTEMPTS + 1):
+            try:
+                return fn(conn, *args, **kwargs)
+            except Error as e:
+                if attempt == RETRY_ATTEMPTS or not db.is_contention(e):
+                    raise
+                registry = getattr(conn, "metrics", None)
+                if registry is not None:
+                    registry.retried()
+                time.sleep(RETRY_BACKOFF * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+    return wrapper
+
+
+def _in_list(ids):
+    return ", ".join(["%s"] * len(ids))
+
+
+# --- CHANGE FEED ---
+
+def record_changes(cursor, changes):
+    """
+    Appends (entity, entity_id) pairs to the `changes` table. Call inside
+    the writing transaction so the feed entry commits (or rolls back) with it.
+    """
+    cursor.executemany(
+        "INSERT INTO changes (entity, entity_id, changed_at) VALUES (%s, %s, NOW())",
+        [(entity, entity_id) for entity, entity_id in changes if entity_id is not None]
+    )
+
+
+# --- HOTEL (REST) QUERIES ---
+
+# A room is occupied while a stay that has begun is still active (not yet
+# checked out) - a reservation counts from its check-in date, an overstay
+# until it is checked out. rooms.is_occupied is only kept up to date for
+# older clients; it is never set when a reservation's day comes.
+IN_HOUSE = """EXISTS (
+    SELECT 1 FROM bookings b
+    WHERE b.room_id = rooms.room_id AND b.is_active = 1 AND b.check_in_date <= %s
+)"""
+
+ROOM_COLUMNS = "room_id, room_number, room_type, price_per_night, is_occupied, occupied"
+ROOM_SELECT = f"SELECT room_id, room_number, room_type, price_per_night, is_occupied, {IN_HOUSE} AS occupied FROM rooms"
+RoomRow = db.row_type("RoomRow", ROOM_COLUMNS)
+
+
+def fetch_rooms(conn):
+    """Every room, `occupied` as of today (re-read when the date changes)."""
+    return db.query(conn, f"{ROOM_SELECT} ORDER BY room_number", (date.today(),), row=RoomRow)
+
+
+def fetch_rooms_by_id(conn, room_ids):
+    room_ids = list(room_ids)
+    if not room_ids:
+        return []
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"{ROOM_SELECT} WHERE room_id IN ({_in_list(room_ids)})", [date.today()] + room_ids)
+        return [RoomRow(row) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def fetch_free_rooms(conn, check_in, check_out):
+    """
+    Rooms with no active booking overlapping [check_in, check_out). The
+    check-in window normally answers this from availability.AvailabilityIndex;
+    this is the fallback while the index is still loading.
+    """
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("""
+            SELECT r.room_id, r.room_number, r.room_type, r.price_per_night
+            FROM rooms r
+            WHERE NOT EXISTS (
+                SELECT 1 FROM bookings b
+                WHERE b.room_id = r.room_id AND b.is_active = 1
+                  AND b.check_in_date < %s AND b.check_out_date > %s
+            )
+            ORDER BY r.room_number
+        """, (check_out, check_in))
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def _find_overlapping_booking(cursor, room_id, check_in, check_out):
+    # Stays are the nights [check_in, check_out): checking out and checking
+    # in on the same day don't overlap
+    cursor.execute("""
+        SELECT booking_id, check_in_date, check_out_date
+        FROM bookings
+        WHERE room_id = %s AND is_active = 1 AND check_in_date < %s AND check_out_date > %s
+        LIMIT 1
+    """, (room_id, check_out, check_in))
+    return cursor.fetchone()
+
+
+# --- GUESTS ---
+
+def _like_prefix(term):
+    return term.replace("!", "!!").replace("%", "!%").replace("_", "!_") + "%"
+
+
+def search_guests(conn, terms, limit=20):
+    """
+    Guests with a name, email or phone starting with the first of `terms`
+    (normalized as by guest_index.search_terms) and some word starting with
+    each of the others. Every branch is a range scan on a guests index that
+    stops at `limit`; guest_index.GuestIndex answers the same from memory.
+    """
+    if not terms:
+        return []
+    first, others = terms[0], terms[1:]
+    columns = ["last_name", "first_name", "email"] + (["phone"] if first.isdigit() else [])
+    branches, params = [], []
+    for n, column in enumerate(columns):
+        branches.append(f"""
+            SELECT * FROM (
+                SELECT guest_id, first_name, last_name, email, phone FROM guests
+                WHERE {column} LIKE %s ESCAPE '!' LIMIT %s
+            ) g{n}
+        """)
+        params += [_like_prefix(first), limit * 5 if others else limit]
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(" UNION ".join(branches), params)
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+
+    def words(guest):
+        found = f"{guest['first_name']} {guest['last_name']} {guest['email'] or ''}".lower().split()
+        return found + ["".join(c for c in guest['phone'] or "" if c.isdigit())]
+
+    rows = [g for g in rows if all(any(w.startswith(t) for w in words(g)) for t in others)]
+    rows.sort(key=lambda g: (g['last_name'].lower(), g['first_name'].lower(), g['guest_id']))
+    return rows[:limit]
+
+
+GuestRow = db.row_type("GuestRow", "guest_id, first_name, last_name, email, phone")
+
+
+def fetch_guest(conn, guest_id):
+    rows = db.query(conn, "SELECT guest_id, first_name, last_name, email, phone FROM guests WHERE guest_id = %s",
+                    (guest_id,), row=GuestRow)
+    return rows[0] if rows else None
+
+
+def _find_guests_by_email(cursor, emails):
+    """{email: guest_id} of the guests already registered under these emails."""
+    emails = [e for e in emails if e]
+    if not emails:
+        return {}
+    cursor.execute(f"SELECT email, guest_id FROM guests WHERE email IN ({_in_list(emails)})", emails)
+    return {email.lower(): guest_id for email, guest_id in cursor.fetchall()}
+
+
+def fetch_active_bookings_page(conn, direction, key, limit):
+    """
+    One keyset page of active bookings ordered by (room_number, booking_id).
+    direction "after" returns rows following `key` (None = from the start),
+    "before" the rows preceding it; both come back in display order.
+    """
+    query = """
+        SELECT b.booking_id, r.room_number, CONCAT(g.first_name, ' ', g.last_name) AS guest_name, b.check_in_date, b.check_out_date
+        FROM bookings b
+        JOIN guests g ON b.guest_id = g.guest_id
+        JOIN rooms r ON b.room_id = r.room_id
+        WHERE b.is_active = 1
+    """
+    params = []
+    if key is not None:
+        op = ">" if direction == "after" else "<"
+        query += f" AND (r.room_number {op} %s OR (r.room_number = %s AND b.booking_id {op} %s))"
+        params = [key[0], key[0], key[1]]
+    order = "ASC" if direction == "after" else "DESC"
+    query += f" ORDER BY r.room_number {order}, b.booking_id {order} LIMIT %s"
+    params.append(limit)
+
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    if direction != "after":
+        rows.reverse()
+    return rows
+
+
+# --- FOLIO LEDGER ---
+# booking_folios keeps one running-total row per booking. It is created at
+# check-in and bumped by every charged_to_room order in the same transaction,
+# so a folio total never needs to re-read the booking's orders.
+
+FOLIO_BACKFILL_QUERY = """
+    INSERT INTO booking_folios (booking_id, room_total, restaurant_total, order_count, updated_at)
+    SELECT b.booking_id, COALESCE(b.total_room_cost, 0), COALESCE(SUM(o.order_total), 0), COUNT(o.order_id), NOW()
+    FROM bookings b
+    LEFT JOIN orders o ON o.booking_id = b.booking_id AND o.order_status = 'charged_to_room'
+    LEFT JOIN booking_folios f ON f.booking_id = b.booking_id
+    WHERE f.booking_id IS NULL {extra}
+    GROUP BY b.booking_id, b.total_room_cost
+"""
+
+
+def backfill_folios(conn, booking_id=None):
+    """
+    Creates ledger rows for bookings that don't have one yet (bookings made
+    before the ledger existed). Returns the number of rows created.
+    """
+    cursor = conn.cursor()
+    try:
+        if booking_id is None:
+            cursor.execute(FOLIO_BACKFILL_QUERY.format(extra=""))
+        else:
+            cursor.execute(FOLIO_BACKFILL_QUERY.format(extra="AND b.booking_id = %s"), (booking_id,))
+        return cursor.rowcount
+    finally:
+        cursor.close()
+
+
+def _post_room_charge(cursor, booking_id, amount):
+    cursor.execute("""
+        UPDATE booking_folios
+        SET restaurant_total = restaurant_total + %s, order_count = order_count + 1, updated_at = NOW()
+        WHERE booking_id = %s
+    """, (amount, booking_id))
+    if cursor.rowcount == 0:
+        # Booking predates the ledger: build its row from the orders,
+        # including the one just inserted in this transaction
+        cursor.execute(FOLIO_BACKFILL_QUERY.format(extra="AND b.booking_id = %s"), (booking_id,))
+
+
+def fetch_booking_folio(conn, booking_id):
+    """Returns (folio_details, grand_total), or (None, None) if the booking doesn't exist."""
+    cursor = conn.cursor(dictionary=True)
+    try:
+        # 1. Totals come from the ledger: one primary-key lookup
+        cursor.execute("SELECT room_total, restaurant_total, order_count FROM booking_folios WHERE booking_id = %s", (booking_id,))
+        folio = cursor.fetchone()
+
+        if not folio:
+            # No ledger row yet; create it unless the booking doesn't exist
+            if not backfill_folios(conn, booking_id):
+                return None, None
+            cursor.execute("SELECT room_total, restaurant_total, order_count FROM booking_folios WHERE booking_id = %s", (booking_id,))
+            folio = cursor.fetchone()
+
+        room_cost = folio['room_total']
+        grand_total = room_cost + folio['restaurant_total']
+        lines = [f"Room Charges: ₹{room_cost:.2f}", "", "Restaurant Charges:"]
+
+        # 2. The itemised lines are only read if there is something to list
+        if folio['order_count'] == 0:
+            lines.append("  (None)")
+        else:
+            cursor.execute("""
+                SELECT order_timestamp, order_total
+                FROM orders
+                WHERE booking_id = %s AND order_status = 'charged_to_room'
+                ORDER BY order_id
+            """, (booking_id,))
+            for order in cursor.fetchall():
+                lines.append(f"  - {order['order_timestamp'].strftime('%Y-%m-%d %H:%M')}: ₹{order['order_total']:.2f}")
+
+        return "\n".join(lines) + "\n", grand_total
+    finally:
+        cursor.close()
+
+
+def fetch_active_folios(conn):
+    """
+    Batch mode for the morning checkout rush: folio totals for every active
+    booking in a single query.
+    """
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("""
+            SELECT b.booking_id, r.room_number, CONCAT(g.first_name, ' ', g.last_name) AS guest_name,
+                   b.total_room_cost, f.room_total, f.restaurant_total
+            FROM bookings b
+            JOIN rooms r ON b.room_id = r.room_id
+            JOIN guests g ON b.guest_id = g.guest_id
+            LEFT JOIN booking_folios f ON f.booking_id = b.booking_id
+            WHERE b.is_active = 1
+            ORDER BY r.room_number
+        """)
+        folios = cursor.fetchall()
+    finally:
+        cursor.close()
+
+    for folio in folios:
+        # Only bookings from before the ledger existed (not yet backfilled) lack a row
+        if folio['room_total'] is None:
+            folio['room_total'] = folio['total_room_cost'] or Decimal("0.00")
+            folio['restaurant_total'] = Decimal("0.00")
+        folio['grand_total'] = folio['room_total'] + folio['restaurant_total']
+    return folios
+
+
+@_retry_on_contention
+def check_in_guest(conn, first_name, last_name, email, phone, room_id, check_in_str, check_out_str, total_room_cost,
+                   guest_id=None):
+    """
+    Books the room for a guest and returns the booking_id. A returning guest
+    - `guest_id` picked from a guest search, or an email already on file -
+    keeps their guests row instead of getting a new one. Raises
+    BookingConflict if another terminal got the room first.
+    """
+    cursor = conn.cursor()
+    try:
+        # This function needs a transaction, so we start one.
+        conn.start_transaction()
+
+        # Claim the room row first, conditionally: on MySQL its row lock
+        # serialises two terminals booking the same room, and only the one
+        # that finds nobody in house (or, for a reservation, the room present) goes on
+        starts_today = date.fromisoformat(str(check_in_str)) <= date.today()
+        if starts_today:
+            cursor.execute(f"UPDATE rooms SET is_occupied = 1 WHERE room_id = %s AND NOT {IN_HOUSE}",
+                           (room_id, date.today()))
+        else:
+            cursor.execute("UPDATE rooms SET is_occupied = is_occupied WHERE room_id = %s", (room_id,)) # future reservation
+        if cursor.rowcount == 0:
+            raise BookingConflict("Room is occupied; check the current guest out first." if starts_today
+                                  else "Room no longer exists.")
+
+        clash = _find_overlapping_booking(cursor, room_id, check_in_str, check_out_str)
+        if clash:
+            raise BookingConflict(f"Room is already booked from {clash[1]} to {clash[2]} (booking {clash[0]}).")
+
+        changes = [("room", room_id)]
+        if guest_id is None and email:
+            guest_id = _find_guests_by_email(cursor, [email]).get(email.lower())
+        if guest_id is None:
+            guest_query = "INSERT INTO guests (first_name, last_name, email, phone) VALUES (%s, %s, %s, %s)"
+            cursor.execute(guest_query, (first_name, last_name, email, phone))
+            guest_id = cursor.lastrowid
+            changes.append(("guest", guest_id))
+
+        booking_query = """
+        INSERT INTO bookings (guest_id, room_id, check_in_date, check_out_date, total_room_cost, is_active)
+        VALUES (%s, %s, %s, %s, %s, 1)
+        """
+        cursor.execute(booking_query, (guest_id, room_id, check_in_str, check_out_str, total_room_cost))
+        booking_id = cursor.lastrowid
+
+        cursor.execute(
+            "INSERT INTO booking_folios (booking_id, room_total, restaurant_total, order_count, updated_at) VALUES (%s, %s, 0, 0, NOW())",
+            (booking_id, total_room_cost)
+        )
+
+        record_changes(cursor, changes + [("booking", booking_id)])
+
+        conn.commit() # Manually commit this transaction
+        return booking_id
+    except Error:
+        conn.rollback() # Manually roll back
+        raise
+    finally:
+        cursor.close()
+
+
+# --- GROUP CHECK-IN ---
+# A tour group is checked in with a handful of set-based statements in one
+# transaction instead of a check_in_guest() round-trip per guest.
+
+GROUP_INSERT_ROWS = 100  # rows per multi-row INSERT (keeps SQLite under its bound-parameter limit)
+
+
+def _insert_rows(cursor, insert_sql, placeholders, rows):
+    """
+    Multi-row INSERT of `rows` ("INSERT ... VALUES (...), (...), ..."), in
+    chunks of GROUP_INSERT_ROWS. Returns the new auto-increment ids in row
+    order: each statement's rows get consecutive ids starting at lastrowid.
+    """
+    ids = []
+    for start in range(0, len(rows), GROUP_INSERT_ROWS):
+        chunk = rows[start:start + GROUP_INSERT_ROWS]
+        cursor.execute(f"{insert_sql} VALUES " + ", ".join([placeholders] * len(chunk)),
+                       [value for row in chunk for value in row])
+        ids.extend(range(cursor.lastrowid, cursor.lastrowid + len(chunk)))
+    return ids
+
+
+@_retry_on_contention
+def group_check_in(conn, stays, check_in_str, check_out_str):
+    """
+    Checks in (or reserves) a whole group for the same dates. `stays` are
+    dicts with first_name, last_name, email, phone, room_id and
+    total_room_cost, one room each, and optionally the guest_id of a
+    returning guest; guests whose email is already on file are reused too.
+    Either every guest is booked or, on a clash with an existing booking,
+    none is. Returns the booking ids in the order of `stays`.
+    """
+    room_ids = [stay['room_id'] for stay in stays]
+    if len(set(room_ids)) != len(room_ids):
+        raise BookingConflict("The same room was assigned to more than one guest.")
+    cursor = conn.cursor()
+    try:
+        conn.start_transaction()
+
+        # One set-based UPDATE claims (and, on MySQL, locks) every room of the
+        # group; if any is taken - or, for a stay starting today, occupied - none is booked
+        starts_today = date.fromisoformat(str(check_in_str)) <= date.today()
+        if starts_today:
+            cursor.execute(f"UPDATE rooms SET is_occupied = 1 WHERE room_id IN ({_in_list(room_ids)}) AND NOT {IN_HOUSE}",
+                           room_ids + [date.today()])
+        else:
+            cursor.execute(f"UPDATE rooms SET is_occupied = is_occupied WHERE room_id IN ({_in_list(room_ids)})", room_ids)
+        if cursor.rowcount != len(room_ids):
+            cursor.execute(f"SELECT room_number FROM rooms WHERE room_id IN ({_in_list(room_ids)}) AND {IN_HOUSE} "
+                           "ORDER BY room_number", room_ids + [date.today()])
+            occupied = [row[0] for row in cursor.fetchall()]
+            raise BookingConflict("Occupied; check the current guests out first: " + ", ".join(f"Room {n}" for n in occupied)
+                                  if occupied else "Some of these rooms no longer exist.")
+
+        cursor.execute(f"""
+            SELECT r.room_number, b.check_in_date, b.check_out_date
+            FROM bookings b
+            JOIN rooms r ON r.room_id = b.room_id
+            WHERE b.room_id IN ({_in_list(room_ids)}) AND b.is_active = 1
+              AND b.check_in_date < %s AND b.check_out_date > %s
+            ORDER BY r.room_number
+        """, room_ids + [check_out_str, check_in_str])
+        clashes = cursor.fetchall()
+        if clashes:
+            raise BookingConflict("Already booked for some of these nights: " +
+                                  ", ".join(f"Room {c[0]} ({c[1]} to {c[2]})" for c in clashes))
+
+        # Returning guests keep their row; the rest are inserted together
+        # (two roster lines with the same email share one new guest)
+        known = _find_guests_by_email(cursor, [s['email'] for s in stays if not s.get('guest_id')])
+        new_guests = {}
+        for n, stay in enumerate(stays):
+            key = (stay['email'] or "").lower() or n
+            if not stay.get('guest_id') and key not in known:
+                new_guests.setdefault(key, stay)
+        new_ids = _insert_rows(
+            cursor, "INSERT INTO guests (first_name, last_name, email, phone)", "(%s, %s, %s, %s)",
+            [(s['first_name'], s['last_name'], s['email'], s['phone']) for s in new_guests.values()])
+        known.update(zip(new_guests, new_ids))
+        guest_ids = [stay.get('guest_id') or known[(stay['email'] or "").lower() or n] for n, stay in enumerate(stays)]
+        booking_ids = _insert_rows(
+            cursor, "INSERT INTO bookings (guest_id, room_id, check_in_date, check_out_date, total_room_cost, is_active)",
+            "(%s, %s, %s, %s, %s, 1)",
+            [(guest_id, s['room_id'], check_in_str, check_out_str, s['total_room_cost'])
+             for guest_id, s in zip(guest_ids, stays)])
+        _insert_rows(
+            cursor, "INSERT INTO booking_folios (booking_id, room_total, restaurant_total, order_count, updated_at)",
+            "(%s, %s, 0, 0, NOW())",
+            [(booking_id, s['total_room_cost']) for booking_id, s in zip(booking_ids, stays)])
+
+        record_changes(cursor, [("room", room_id) for room_id in room_ids] +
+                       [("guest", guest_id) for guest_id in new_ids] +
+                       [("booking", booking_id) for booking_id in booking_ids])
+
+        conn.commit()
+        return booking_ids
+    except Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+@_retry_on_contention
+def check_out_booking(conn, booking_id):
+    """
+    Ends a stay (or cancels a reservation). Raises BookingConflict if it
+    was already checked out, e.g. from another terminal a moment ago.
+    """
+    cursor = conn.cursor()
+    try:
+        # This function needs a transaction, so we start one.
+        conn.start_transaction()
+
+        # Rooms first, then bookings - the order check-in locks them in, so
+        # the two never deadlock. The room is free again unless another stay
+        # in it has already begun (checking out a future reservation cancels it).
+        cursor.execute("""
+            UPDATE rooms SET is_occupied = 0
+            WHERE room_id = (SELECT room_id FROM bookings WHERE booking_id = %s) AND NOT EXISTS (
+                SELECT 1 FROM bookings b
+                WHERE b.room_id = rooms.room_id AND b.is_active = 1 AND b.check_in_date <= %s AND b.booking_id <> %s
+            )
+        """, (booking_id, date.today(), booking_id))
+
+        cursor.execute("UPDATE bookings SET is_active = 0 WHERE booking_id = %s AND is_active = 1", (booking_id,))
+        if cursor.rowcount == 0:
+            raise BookingConflict(f"Booking {booking_id} is already checked out.")
+
+        cursor.execute("""
+            INSERT INTO changes (entity, entity_id, changed_at)
+            SELECT 'room', room_id, NOW() FROM bookings WHERE booking_id = %s
+        """, (booking_id,))
+        record_changes(cursor, [("booking", booking_id)])
+
+        conn.commit() # Manually commit this transaction
+    except Error:
+        conn.rollback() # Manually roll back
+        raise
+    finally:
+        cursor.close()
+
+
+# --- RESTAURANT (RELISH) QUERIES ---
+
+TableRow = db.row_type("TableRow", "table_id, table_number, status")
+MenuRow = db.row_type("MenuRow", "item_id, name, price, category")
+
+
+def fetch_tables(conn):
+    return db.query(conn, "SELECT table_id, table_number, status FROM tables ORDER BY table_number", row=TableRow)
+
+
+def fetch_tables_by_id(conn, table_ids):
+    table_ids = list(table_ids)
+    if not table_ids:
+        return []
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT table_id, table_number, status FROM tables WHERE table_id IN ({_in_list(table_ids)})", table_ids)
+        return [TableRow(row) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def fetch_menu(conn):
+    return db.query(conn, "SELECT item_id, name, price, category FROM menu_items ORDER BY category, name", row=MenuRow)
+
+
+def fetch_menu_prices(conn, item_ids):
+    """{item_id: price} for the given menu items."""
+    item_ids = list(item_ids)
+    if not item_ids:
+        return {}
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT item_id, price FROM menu_items WHERE item_id IN ({_in_list(item_ids)})", item_ids)
+        return dict(cursor.fetchall())
+    finally:
+        cursor.close()
+
+
+def fetch_item_popularity(conn, since):
+    """{item_id: quantity ordered} over the orders placed since `since`."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT oi.item_id, SUM(oi.quantity)
+            FROM orders o
+            JOIN order_items oi ON oi.order_id = o.order_id
+            WHERE o.order_timestamp >= %s
+            GROUP BY oi.item_id
+        """, (since,))
+        return {item_id: int(quantity) for item_id, quantity in cursor.fetchall()}
+    finally:
+        cursor.close()
+
+
+def find_active_booking_id(conn, room_number):
+    query = """
+    SELECT b.booking_id
+    FROM bookings b
+    JOIN rooms r ON b.room_id = r.room_id
+    WHERE r.room_number = %s AND b.is_active = 1 AND b.check_in_date <= %s
+    ORDER BY b.check_in_date DESC
+    LIMIT 1
+    """
+    # Only a stay that has begun can take room charges, not a future reservation
+    rows = db.query(conn, query, (room_number, date.today()))
+    return rows[0][0] if rows else None
+
+
+@_retry_on_contention
+def create_order(conn, table_id, booking_id, order_status, order_total, items):
+    cursor = conn.cursor()
+    try:
+        # This function needs a transaction, so we start one.
+        # This temporarily overrides autocommit=True
+        conn.start_transaction()
+
+        # Free the table first, conditionally: a table with an open tab is
+        # paid through that tab, or its lines would stay open underneath
+        cursor.execute(f"UPDATE tables SET status = 'available' WHERE table_id = %s AND NOT {TABLE_HAS_TAB}",
+                       (table_id,))
+        if cursor.rowcount == 0:
+            cursor.execute("SELECT 1 FROM tables WHERE table_id = %s", (table_id,))
+            raise TableConflict("Table has an open tab; pay it at the till that holds it."
+                                if cursor.fetchall() else "Table no longer exists.")
+
+        order_query = """
+        INSERT INTO orders (table_id, booking_id, order_status, order_total, order_timestamp)
+        VALUES (%s, %s, %s, %s, NOW())
+        """
+        order_data = (table_id, booking_id, order_status, order_total)
+        cursor.execute(order_query, order_data)
+
+        order_id = cursor.lastrowid
+
+        item_query = """
+        INSERT INTO order_items (order_id, item_id, quantity, sub_total)
+        VALUES (%s, %s, %s, %s)
+        """
+        item_data = [
+            (order_id, item['item_id'], item['quantity'], item['sub_total'])
+            for item in items
+        ]
+        cursor.executemany(item_query, item_data)
+
+        if order_status == 'charged_to_room':
+            _post_room_charge(cursor, booking_id, order_total)
+        _roll_up(cursor, [order_id])
+
+        record_changes(cursor, [("table", table_id), ("order", order_id), ("booking", booking_id)])
+
+        conn.commit() # We must manually commit this transaction
+        return order_id
+    except Error:
+        conn.rollback() # We must manually roll back on error
+        raise
+    finally:
+        cursor.close()
+
+
+@_retry_on_contention
+def replay_orders(conn, orders):
+    """
+    Writes orders taken from a payment journal (see journal.py) in one
+    transaction. `orders` are dicts with journal_ref, table_id, booking_id,
+    order_status, order_total, order_timestamp and items, as create_order()
+    takes them. An order whose journal_ref is already in the table was
+    written by an earlier replay and is skipped, so replaying twice is
+    harmless - unless it is an open tab (save_open_lines) with that ref:
+    the payment closes it, its lines replaced by the ones paid for.
+    Returns {journal_ref: order_id} for every order.
+    """
+    refs = [order['journal_ref'] for order in orders]
+    cursor = conn.cursor()
+    try:
+        conn.start_transaction()
+        cursor.execute(f"SELECT journal_ref, order_id, order_status FROM orders WHERE journal_ref IN ({_in_list(refs)})", refs)
+        found = {ref: (order_id, status) for ref, order_id, status in cursor.fetchall()}
+        written = {ref: order_id for ref, (order_id, status) in found.items() if status != 'open'}
+        new = [order for order in orders if order['journal_ref'] not in found]
+        tabs = [order for order in orders if order['journal_ref'] in found and order['journal_ref'] not in written]
+
+        order_ids = _insert_rows(
+            cursor, "INSERT INTO orders (table_id, booking_id, order_status, order_total, order_timestamp, journal_ref)",
+            "(%s, %s, %s, %s, %s, %s)",
+            [(o['table_id'], o['booking_id'], o['order_status'], o['order_total'], o['order_timestamp'], o['journal_ref'])
+             for o in new])
+        tab_ids = [found[order['journal_ref']][0] for order in tabs]
+        if tabs:
+            # Stamped with the payment time, so the sale counts on the day it was paid
+            cursor.executemany(
+                "UPDATE orders SET booking_id = %s, order_status = %s, order_total = %s, order_timestamp = %s "
+                "WHERE order_id = %s AND order_status = 'open'",
+                [(o['booking_id'], o['order_status'], o['order_total'], o['order_timestamp'], order_id)
+                 for order_id, o in zip(tab_ids, tabs)])
+            cursor.execute(f"DELETE FROM order_items WHERE order_id IN ({_in_list(tab_ids)})", tab_ids)
+        new, order_ids = new + tabs, order_ids + tab_ids
+        _insert_rows(
+            cursor, "INSERT INTO order_items (order_id, item_id, quantity, sub_total)", "(%s, %s, %s, %s)",
+            [(order_id, item['item_id'], item['quantity'], item['sub_total'])
+             for order_id, order in zip(order_ids, new) for item in order['items']])
+        for order in new:
+            if order['order_status'] == 'charged_to_room':
+                _post_room_charge(cursor, order['booking_id'], order['order_total'])
+        _roll_up(cursor, order_ids)
+
+        table_ids = sorted({order['table_id'] for order in new})
+        if table_ids:
+            cursor.execute(f"UPDATE tables SET status = 'available' WHERE table_id IN ({_in_list(table_ids)})", table_ids)
+        record_changes(cursor, [("table", table_id) for table_id in table_ids] +
+                       [("order", order_id) for order_id in order_ids] +
+                       [("booking", booking_id) for booking_id in {o['booking_id'] for o in new} if booking_id])
+
+        conn.commit()
+        written.update(zip((order['journal_ref'] for order in new), order_ids))
+        return written
+    except Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+# --- Open tabs ---
+
+TABLE_HAS_TAB = """EXISTS (
+    SELECT 1 FROM orders o
+    WHERE o.table_id = tables.table_id AND o.order_status = 'open'
+)"""
+
+
+@_retry_on_contention
+def save_open_lines(conn, tabs):
+    """
+    Writes open tabs' line changes in one transaction. `tabs` are dicts
+    with ref, table_id and lines {item_id: (quantity, sub_total)}; a
+    quantity of 0 removes the line. A tab seen for the first time becomes
+    an `orders` row with order_status 'open' and journal_ref = its ref, and
+    its table is marked occupied - unless the table already has an open
+    tab, opened on another terminal: such a tab is not saved and is left
+    out of the result, for the caller to read the table's tab back and
+    adopt it. Lines of a tab that has been paid meanwhile are ignored.
+    Returns {ref: order_id}.
+    """
+    refs = [tab['ref'] for tab in tabs]
+    cursor = conn.cursor()
+    try:
+        conn.start_transaction()
+        cursor.execute(f"SELECT journal_ref, order_id, order_status FROM orders WHERE journal_ref IN ({_in_list(refs)})", refs)
+        found = {ref: (order_id, status) for ref, order_id, status in cursor.fetchall()}
+
+        # Claim the table row of each new tab first, conditionally: on MySQL
+        # its row lock serialises two terminals opening a tab on the same
+        # table, and only the one that finds no open tab there goes on
+        new, claimed = [], set()
+        for tab in tabs:
+            if tab['ref'] in found or tab['table_id'] in claimed:
+                continue
+            cursor.execute(f"UPDATE tables SET status = 'occupied' WHERE table_id = %s AND NOT {TABLE_HAS_TAB}",
+                           (tab['table_id'],))
+            if cursor.rowcount:
+                new.append(tab)
+                claimed.add(tab['table_id'])
+
+        order_ids = _insert_rows(
+            cursor, "INSERT INTO orders (table_id, booking_id, order_status, order_total, order_timestamp, journal_ref)",
+            "(%s, NULL, 'open', 0, NOW(), %s)", [(tab['table_id'], tab['ref']) for tab in new])
+        saved = {ref: order_id for ref, (order_id, status) in found.items()}
+        saved.update(zip((tab['ref'] for tab in new), order_ids))
+        open_tabs = new + [tab for tab in tabs if tab['ref'] in found and found[tab['ref']][1] == 'open']
+
+        # A changed line is replaced, so each flush is one DELETE per tab and one multi-row INSERT
+        for tab in open_tabs:
+            item_ids = list(tab['lines'])
+            if item_ids and tab['ref'] in found:
+                cursor.execute(f"DELETE FROM order_items WHERE order_id = %s AND item_id IN ({_in_list(item_ids)})",
+                               [saved[tab['ref']]] + item_ids)
+        _insert_rows(
+            cursor, "INSERT INTO order_items (order_id, item_id, quantity, sub_total)", "(%s, %s, %s, %s)",
+            [(saved[tab['ref']], item_id, quantity, sub_total)
+             for tab in open_tabs for item_id, (quantity, sub_total) in tab['lines'].items() if quantity > 0])
+        order_ids = [saved[tab['ref']] for tab in open_tabs]
+        if order_ids:
+            cursor.execute(f"""
+                UPDATE orders SET order_total = (
+                    SELECT COALESCE(SUM(oi.sub_total), 0) FROM order_items oi WHERE oi.order_id = orders.order_id
+                ) WHERE order_id IN ({_in_list(order_ids)})
+            """, order_ids)
+
+        record_changes(cursor, [("table", table_id) for table_id in sorted(claimed)] +
+                       [("order", order_id) for order_id in order_ids])
+
+        conn.commit()
+        return saved
+    except Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def fetch_open_order(conn, table_id):
+    """
+    The table's open tab, as (ref, lines) with lines [(item_id, name,
+    quantity, sub_total)], or None.
+    """
+    rows = db.query(conn, """
+        SELECT order_id, journal_ref FROM orders
+        WHERE table_id = %s AND order_status = 'open'
+        ORDER BY order_id DESC
+        LIMIT 1
+    """, (table_id,))
+    if not rows:
+        return None
+    order_id, ref = rows[0]
+    return ref, fetch_order_items(conn, order_id)
+
+
+# --- Revenue rollups ---
+# revenue_rollups holds, per day, the paid orders and revenue by menu
+# category, table, room type (of the stay an order was charged to) and
+# order status. The rows of the orders paid in a transaction are added to
+# it before it commits (_roll_up); backfill_rollups() rebuilds it from the
+# orders. analytics.py reads it instead of the orders.
+
+ROLLUP_DIMENSIONS = ("category", "table", "room_type", "status")
+
+# dimension -> SELECT of (dimension, day, member, orders, items, revenue) for the orders matching {where}
+ROLLUP_QUERIES = {
+    "category": """
+        SELECT %s, DATE(o.order_timestamp), COALESCE(m.category, '(none)'), COUNT(DISTINCT o.order_id),
+               SUM(oi.quantity), ROUND(SUM(oi.sub_total), 2)
+        FROM orders o
+        JOIN order_items oi ON oi.order_id = o.order_id
+        JOIN menu_items m ON m.item_id = oi.item_id
+        WHERE {where} AND o.order_status <> 'open'
+        GROUP BY DATE(o.order_timestamp), COALESCE(m.category, '(none)')
+    """,
+    "table": """
+        SELECT %s, DATE(o.order_timestamp), t.table_number, COUNT(*), 0, ROUND(SUM(o.order_total), 2)
+        FROM orders o
+        JOIN tables t ON t.table_id = o.table_id
+        WHERE {where} AND o.order_status <> 'open'
+        GROUP BY DATE(o.order_timestamp), t.table_number
+    """,
+    "room_type": """
+        SELECT %s, DATE(o.order_timestamp), r.room_type, COUNT(*), 0, ROUND(SUM(o.order_total), 2)
+        FROM orders o
+        JOIN bookings b ON b.booking_id = o.booking_id
+        JOIN rooms r ON r.room_id = b.room_id
+        WHERE {where} AND o.order_status <> 'open'
+        GROUP BY DATE(o.order_timestamp), r.room_type
+    """,
+    "status": """
+        SELECT %s, DATE(o.order_timestamp), o.order_status, COUNT(*), 0, ROUND(SUM(o.order_total), 2)
+        FROM orders o
+        WHERE {where} AND o.order_status <> 'open'
+        GROUP BY DATE(o.order_timestamp), o.order_status
+    """,
+}
+
+
+def _roll_up(cursor, order_ids):
+    """Adds the just-paid `order_ids` to revenue_rollups, inside the caller's transaction."""
+    if not order_ids:
+        return
+    deltas = []
+    for dimension, sql in ROLLUP_QUERIES.items():
+        cursor.execute(sql.format(where=f"o.order_id IN ({_in_list(order_ids)})"), [dimension] + list(order_ids))
+        deltas += cursor.fetchall()
+    # Always in key order, so two transactions touching the same rows lock them alike
+    for dimension, day, member, orders, items, revenue in sorted(deltas, key=lambda d: (d[0], str(d[1]), d[2])):
+        update = ("UPDATE revenue_rollups SET orders = orders + %s, items = items + %s, revenue = revenue + %s "
+                  "WHERE dimension = %s AND day = %s AND member = %s")
+        params = (orders, items, revenue, dimension, day, member)
+        cursor.execute(update, params)
+        if cursor.rowcount:
+            continue
+        try:
+            cursor.execute(
+                "INSERT INTO revenue_rollups (dimension, day, member, orders, items, revenue) VALUES (%s, %s, %s, %s, %s, %s)",
+                (dimension, day, member, orders, items, revenue))
+        except Error as e:
+            if not db.is_duplicate(e):
+                raise
+            cursor.execute(update, params)  # another terminal's order created the row first
+
+
+def rebuild_rollups(cursor, start=None, end=None):
+    """
+    Replaces the revenue_rollups rows of the days in [start, end) (dates;
+    all days if not given) with totals read from the orders. Returns the
+    number of rows written.
+    """
+    if start is None:
+        cursor.execute("DELETE FROM revenue_rollups")
+        where, params = "1 = 1", []
+    else:
+        where, params = "o.order_timestamp >= %s AND o.order_timestamp < %s", [start, end]
+    written = 0
+    for dimension, sql in ROLLUP_QUERIES.items():
+        if start is not None:  # per dimension: a primary-key range, not a scan
+            cursor.execute("DELETE FROM revenue_rollups WHERE dimension = %s AND day >= %s AND day < %s",
+                           (dimension, start, end))
+        cursor.execute("INSERT INTO revenue_rollups (dimension, day, member, orders, items, revenue) " +
+                       sql.format(where=where), [dimension] + params)
+        written += cursor.rowcount
+    return written
+
+
+def backfill_rollups(conn, start=None, end=None):
+    """rebuild_rollups() in a transaction of its own."""
+    cursor = conn.cursor()
+    try:
+        conn.start_transaction()
+        written = rebuild_rollups(cursor, start, end)
+        conn.commit()
+        return written
+    except Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+# --- ORDER HISTORY QUERIES ---
+
+def fetch_orders_page(conn, direction, key, limit):
+    """
+    One keyset page of orders, newest first. "after" pages towards older
+    orders (order_id < key), "before" towards newer ones.
+    """
+    query = """
+        SELECT o.order_id, o.order_timestamp, t.table_number, r.room_number, o.order_status, o.order_total
+        FROM orders o
+        LEFT JOIN tables t ON o.table_id = t.table_id
+        LEFT JOIN bookings b ON o.booking_id = b.booking_id
+        LEFT JOIN rooms r ON b.room_id = r.room_id
+    """
+    params = []
+    if key is not None:
+        query += " WHERE o.order_id < %s" if direction == "after" else " WHERE o.order_id > %s"
+        params.append(key)
+    query += " ORDER BY o.order_id DESC LIMIT %s" if direction == "after" else " ORDER BY o.order_id ASC LIMIT %s"
+    params.append(limit)
+
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    if direction != "after":
+        rows.reverse()
+    return rows
+
+
+OrderItemRow = db.row_type("OrderItemRow", "item_id, name, quantity, sub_total")
+
+
+def fetch_order_items(conn, order_id):
+    return db.query(conn, """
+        SELECT oi.item_id, m.name, oi.quantity, oi.sub_total
+        FROM order_items oi
+        JOIN menu_items m ON oi.item_id = m.item_id
+        WHERE oi.order_id = %s
+        ORDER BY oi.order_item_id
+    """, (order_id,), row=OrderItemRow)
@@ -0,0 +1,295 @@
+"""
+Query-plan regression check.
+
+Seeds a scratch database, runs every function in queries.py and
+changefeed.py, and EXPLAINs each statement they issue before it runs. Any
+full table scan or whole-index walk that isn't in ALLOWED_SCANS is
+reported and the script exits with status 1, so a dropped index or a
+query rewritten into a scan shows up before it reaches the front desk.
+
+    python query_plans.py                      # scratch SQLite file
+    python query_plans.py -v                   # also print every plan
+    python query_plans.py --backend mysql --database rr_scratch
+
+The MySQL database must already have database.sql imported. Rows are
+inserted into it, so never point this at the live database.
+"""
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+
+import analytics
+import availability
+import changefeed
+import datagen
+import db
+import export
+import guest_index
+import menu_index
+import night_audit
+import queries
+
+# (scenario, table alias) -> why a full scan is fine there
+ALLOWED_SCANS = {
+    ("fetch_rooms", "rooms"): "whole reference table, rendered in full",
+    ("fetch_tables", "tables"): "whole reference table, rendered in full",
+    ("fetch_menu", "menu_items"): "whole reference table, cached",
+    ("backfill_folios", "b"): "one-off bulk backfill run by migration v2",
+    ("fetch_orders_page_first", "o"): "walks the primary key newest first and stops at LIMIT",
+    ("fetch_free_rooms", "r"): "every room is a candidate; its bookings are probed by index",
+    ("fetch_active_bookings_page_first", "r"): "walks rooms in page order, probing active bookings, until LIMIT",
+    ("fetch_active_bookings_page", "r"): "walks rooms in page order, probing active bookings, until LIMIT",
+    ("fetch_active_folios", "r"): "every room in number order, probing its active booking",
+    ("audit_occupancy", "rooms"): "counts the whole reference table",
+    # SQLite lists reading each UNION branch's own LIMITed index range scan as a SCAN
+    **{("search_guests", f"g{n}"): "the branch's LIMITed index range scan" for n in range(4)},
+}
+
+
+# --- Plan recording ---
+
+class PlanRecorder:
+    def __init__(self, dialect):
+        self.dialect = dialect
+        self.scenario = None
+        self.plans = []   # (scenario, sql, [(alias, detail, full_scan)])
+
+    def explain(self, conn, sql, params):
+        verb = sql.lstrip().split(None, 1)[0].upper()
+        if verb not in ("SELECT", "INSERT", "UPDATE", "DELETE"):
+            return
+        if verb == "INSERT" and "SELECT" not in sql.upper():
+            return  # INSERT ... VALUES has no access path to check
+        cursor = conn.cursor(dictionary=True)
+        try:
+            if self.dialect == "sqlite":
+                cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+                steps = [self._sqlite_step(row['detail']) for row in cursor.fetchall()]
+            else:
+                cursor.execute("EXPLAIN " + sql, params)
+                steps = [self._mysql_step(row) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+        self.plans.append((self.scenario, " ".join(sql.split()), steps))
+
+    def _sqlite_step(self, detail):
+        words = detail.split()
+        alias = words[1] if len(words) > 1 else ""
+        # SCAN ... USING [COVERING] INDEX still walks the whole index; SEARCH is a range.
+        # (subquery-N)/(join-N) are this statement's own temporary results
+        full_scan = words[0] == "SCAN" and alias != "CONSTANT" and not alias.startswith("(")
+        return alias, detail, full_scan
+
+    def _mysql_step(self, row):
+        detail = f"{row['table']}: type={row['type']} key={row['key']} rows={row['rows']}"
+        # <derivedN>/<unionN> are this statement's own (already limited) temporary results
+        # type=index walks the whole index, as ALL walks the whole table
+        return row['table'] or "", detail, row['type'] in ("ALL", "index") and not (row['table'] or "").startswith("<")
+
+    def regressions(self):
+        found = []
+        for scenario, sql, steps in self.plans:
+            for alias, detail, full_scan in steps:
+                if full_scan and (scenario, alias) not in ALLOWED_SCANS:
+                    found.append((scenario, sql, detail))
+        return found
+
+
+class RecordingCursor:
+    def __init__(self, cursor, conn, recorder):
+        self._cursor = cursor
+        self._conn = conn
+        self._recorder = recorder
+
+    def execute(self, sql, params=()):
+        self._recorder.explain(self._conn, sql, params)
+        return self._cursor.execute(sql, params)
+
+    def executemany(self, sql, seq):
+        seq = list(seq)
+        if seq:
+            self._recorder.explain(self._conn, sql, seq[0])
+        return self._cursor.executemany(sql, seq)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class RecordingConnection:
+    def __init__(self, conn, recorder):
+        self._conn = conn
+        self._recorder = recorder
+
+    def cursor(self, *args, **kwargs):
+        return RecordingCursor(self._conn.cursor(*args, **kwargs), self._conn, self._recorder)
+
+    def prepared(self, sql):
+        return RecordingCursor(self._conn.prepared(sql), self._conn, self._recorder)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+# --- Scenarios ---
+
+
+def run_scenarios(conn, recorder):
+    def scenario(name, fn, *args):
+        recorder.scenario = name
+        return fn(conn, *args)
+
+    rooms = scenario("fetch_rooms", queries.fetch_rooms)
+    scenario("fetch_rooms_by_id", queries.fetch_rooms_by_id, [r['room_id'] for r in rooms[:5]])
+    stay = (datetime.date.today() + datetime.timedelta(days=400), datetime.date.today() + datetime.timedelta(days=402))
+    free = scenario("fetch_free_rooms", queries.fetch_free_rooms, *stay)
+    page = scenario("fetch_active_bookings_page_first", queries.fetch_active_bookings_page, "after", None, 10)
+    key = (page[-1]['room_number'], page[-1]['booking_id'])
+    scenario("fetch_active_bookings_page", queries.fetch_active_bookings_page, "after", key, 10)
+    scenario("fetch_active_bookings_page", queries.fetch_active_bookings_page, "before", key, 10)
+
+    scenario("backfill_folios", queries.backfill_folios)
+    booking_id = page[0]['booking_id']
+    scenario("fetch_booking_folio", queries.fetch_booking_folio, booking_id)
+    scenario("fetch_active_folios", queries.fetch_active_folios)
+    room_number = page[0]['room_number']
+    scenario("find_active_booking_id", queries.find_active_booking_id, room_number)
+
+    tables = scenario("fetch_tables", queries.fetch_tables)
+    scenario("fetch_tables_by_id", queries.fetch_tables_by_id, [t['table_id'] for t in tables[:3]])
+    menu = scenario("fetch_menu", queries.fetch_menu)
+    scenario("fetch_item_popularity", queries.fetch_item_popularity,
+             datetime.datetime.now() - datetime.timedelta(days=menu_index.POPULAR_DAYS))
+    items = [{'item_id': menu[0]['item_id'], 'quantity': 2, 'sub_total': menu[0]['price'] * 2}]
+    scenario("create_order", queries.create_order, tables[0]['table_id'], booking_id,
+             'charged_to_room', items[0]['sub_total'], items)
+    order_id = scenario("create_order", queries.create_order, tables[1]['table_id'], None,
+                        'paid', items[0]['sub_total'], items)
+    replayed = {'journal_ref': "0" * 32, 'table_id': tables[1]['table_id'], 'booking_id': booking_id,
+                'order_status': 'charged_to_room', 'order_total': items[0]['sub_total'],
+                'order_timestamp': datetime.datetime.now(), 'items': items}
+    scenario("replay_orders", queries.replay_orders, [replayed])
+    scenario("replay_orders", queries.replay_orders, [replayed]) # already written: skipped
+    tab = {'ref': "1" * 32, 'table_id': tables[2]['table_id'],
+           'lines': {menu[0]['item_id']: (2, menu[0]['price'] * 2), menu[1]['item_id']: (1, menu[1]['price'])}}
+    scenario("save_open_lines", queries.save_open_lines, [tab]) # opens the tab
+    tab['lines'] = {menu[1]['item_id']: (0, 0)}
+    scenario("save_open_lines", queries.save_open_lines, [tab])
+    scenario("fetch_open_order", queries.fetch_open_order, tab['table_id'])
+    scenario("replay_orders", queries.replay_orders, [dict(replayed, journal_ref=tab['ref'], table_id=tab['table_id'])])
+
+    orders = scenario("fetch_orders_page_first", queries.fetch_orders_page, "after", None, 50)
+    scenario("fetch_orders_page", queries.fetch_orders_page, "after", orders[-1]['order_id'], 50)
+    scenario("fetch_orders_page", queries.fetch_orders_page, "before", orders[-1]['order_id'], 50)
+    scenario("fetch_order_items", queries.fetch_order_items, order_id)
+
+    guest = scenario("search_guests", queries.search_guests, guest_index.search_terms("guest1"), 10)[0]
+    scenario("search_guests", queries.search_guests, guest_index.search_terms(guest['last_name']), 10)
+    scenario("search_guests", queries.search_guests, guest_index.search_terms(f"{guest['first_name']} 9"), 10)
+    scenario("search_guests", queries.search_guests, guest_index.search_terms(guest['phone'][:5]), 10)
+    scenario("fetch_guest", queries.fetch_guest, guest['guest_id'])
+    scenario("fetch_guests_by_id", guest_index.fetch_guests_by_id, [guest['guest_id']])
+
+    seq = scenario("fetch_current_seq", changefeed.fetch_current_seq)
+    new_booking = scenario("check_in_guest", queries.check_in_guest, "Plan", "Check", None, None,
+                           free[0]['room_id'], stay[0].isoformat(), stay[1].isoformat(), free[0]['price_per_night'] * 2)
+    scenario("check_out_booking", queries.check_out_booking, new_booking)
+    # Walk-ins arriving today take the is_occupied claim rather than the reservation lock
+    today = (datetime.date.today(), datetime.date.today() + datetime.timedelta(days=2))
+    in_house = {room['room_id'] for room in rooms if room['occupied']}
+    vacant = [room for room in scenario("fetch_free_rooms", queries.fetch_free_rooms, *today)
+              if room['room_id'] not in in_house]
+    walk_in = scenario("check_in_guest", queries.check_in_guest, "Plan", "Walk-in", None, None, vacant[0]['room_id'],
+                       today[0].isoformat(), today[1].isoformat(), vacant[0]['price_per_night'] * 2)
+    scenario("check_out_booking", queries.check_out_booking, walk_in)
+    walk_ins = [{"first_name": "Plan", "last_name": f"Walk-in {n}", "email": None, "phone": None,
+                 "room_id": room['room_id'], "total_room_cost": room['price_per_night'] * 2}
+                for n, room in enumerate(vacant[1:3])]
+    for group_booking in scenario("group_check_in", queries.group_check_in, walk_ins, today[0].isoformat(), today[1].isoformat()):
+        scenario("check_out_booking", queries.check_out_booking, group_booking)
+    returning = scenario("check_in_guest", queries.check_in_guest, guest['first_name'], guest['last_name'], guest['email'],
+                         None, free[4]['room_id'], stay[0].isoformat(), stay[1].isoformat(), free[4]['price_per_night'] * 2)
+    scenario("check_out_booking", queries.check_out_booking, returning)
+    group = [{"first_name": "Plan", "last_name": f"Group {n}", "email": None, "phone": None,
+              "room_id": room['room_id'], "total_room_cost": room['price_per_night'] * 2}
+             for n, room in enumerate(free[1:4])]
+    for group_booking in scenario("group_check_in", queries.group_check_in, group, stay[0].isoformat(), stay[1].isoformat()):
+        scenario("check_out_booking", queries.check_out_booking, group_booking)
+    scenario("fetch_changes", changefeed.fetch_changes, seq)
+    scenario("load_index", availability.load_index)
+    end = datetime.date.today() + datetime.timedelta(days=1)
+    scenario("backfill_rollups", queries.backfill_rollups, end - datetime.timedelta(days=30), end)
+    recorder.scenario = "fetch_rollups"
+    for dimension in queries.ROLLUP_DIMENSIONS:
+        for _ in analytics.fetch_rollups(conn, dimension, end - datetime.timedelta(days=analytics.DEFAULT_DAYS), end):
+            pass
+    for name, fn in (("audit_orders", night_audit.audit_orders), ("audit_categories", night_audit.audit_categories),
+                     ("audit_occupancy", night_audit.audit_occupancy)):
+        scenario(name, fn, datetime.date.today())
+    scenario("audit_unpaid", night_audit.audit_unpaid)
+    since = datetime.datetime.now() - datetime.timedelta(days=2)
+    for name, source, watermark, mark in (("export_orders", export.order_lines, "order_id", order_id - 50),
+                                          ("export_orders", export.order_lines, "order_timestamp", (since, 0)),
+                                          ("export_bookings", export.bookings, "booking_id", booking_id)):
+        recorder.scenario = name
+        for _ in source(conn, watermark, mark):
+            pass
+
+
+# --- Entry point ---
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the query plans of every queries.py function")
+    parser.add_argument("--backend", choices=["sqlite", "mysql"], default="sqlite")
+    parser.add_argument("--database", help="scratch MySQL database (required with --backend mysql)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print every plan, not just regressions")
+    args = parser.parse_args(argv)
+
+    scratch = None
+    if args.backend == "sqlite":
+        fd, scratch = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        backend = db.SQLiteBackend(scratch)
+    else:
+        if not args.database:
+            parser.error("--backend mysql needs --database pointing at a scratch copy")
+        backend = db.MySQLBackend(**dict(db.MYSQL_CONFIG, database=args.database))
+
+    try:
+        pool = db.create_pool(backend, size=1)
+        recorder = PlanRecorder(backend.name)
+        with pool.connection() as conn:
+            # Large enough that the planner has a reason to prefer an index
+            datagen.generate(conn, **datagen.PROFILES["small"])
+            datagen.analyze(conn, backend.name)
+            run_scenarios(RecordingConnection(conn, recorder), recorder)
+        pool.close()
+    finally:
+        if scratch:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(scratch + suffix):
+                    os.remove(scratch + suffix)
+
+    if args.verbose:
+        for scenario, sql, steps in recorder.plans:
+            print(f"[{scenario}] {sql}")
+            for alias, detail, full_scan in steps:
+                note = ""
+                if full_scan:
+                    note = f"  <- allowed: {ALLOWED_SCANS[(scenario, alias)]}" if (scenario, alias) in ALLOWED_SCANS else "  <- FULL SCAN"
+                print(f"    {detail}{note}")
+            print()
+
+    regressions = recorder.regressions()
+    print(f"{len(recorder.plans)} statements checked on {backend.name}, {len(regressions)} unexpected full scan(s)")
+    for scenario, sql, detail in regressions:
+        print(f"  [{scenario}] {detail}\n      {sql}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,802 +1,1578 @@
-import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
-import mysql.connector
-from mysql.connector import Error
-from datetime import date, timedelta, datetime # Import datetime for date parsing
-
-# --- (Main App Class) ---
-class App(tk.Tk):
-    def __init__(self):
-        super().__init__()
-        self.title("Rest & Relish System")
-        self.geometry("900x700")
-        
-        # Configure styles for a more modern look
-        self.style = ttk.Style(self)
-        self.style.theme_use('clam') # 'clam', 'alt', 'default', 'classic'
-        self.style.configure('TNotebook.Tab', font=('Helvetica', 12, 'bold'), padding=[10, 5])
-        self.style.configure('TButton', font=('Helvetica', 10), padding=5)
-        self.style.configure('TLabel', font=('Helvetica', 10))
-        self.style.configure('TEntry', font=('Helvetica', 10))
-        self.style.configure('Treeview.Heading', font=('Helvetica', 10, 'bold'))
-        self.style.configure('Selected.TButton', font=('Helvetica', 10), padding=5, background='#0078d4', foreground='white')
-
-        self.db_conn = None
-        
-        # --- Direct Database Connection ---
-        try:
-            conn = mysql.connector.connect(
-                host="localhost",
-                user="root",
-                password="Your_Mysql_Password",  # <-- YOUR MYSQL PASSWORD
-                database="rest_relish_db",
-                autocommit=True  # <-- This fixes the transaction error
-            )
-            
-            if conn.is_connected():
-                self.db_conn = conn
-                self.create_main_widgets()
-                # Load initial data
-                self.refresh_room_dashboard()
-                self.refresh_table_dashboard()
-            
-        except Error as e:
-            messagebox.showerror("Database Connection Failed", f"Error connecting to database:\n{e}\n\nPlease ensure MySQL is running and credentials in the code are correct.")
-            self.destroy() # Close app if connection fails
-
-    def create_main_widgets(self):
-        # Create the main Tab controller (Notebook)
-        self.notebook = ttk.Notebook(self)
-        
-        # Create the two main frames for our tabs
-        self.hotel_frame = ttk.Frame(self.notebook, padding="10")
-        self.restaurant_frame = ttk.Frame(self.notebook, padding="10")
-        
-        # Add the frames as tabs
-        self.notebook.add(self.hotel_frame, text='REST (Hotel)')
-        self.notebook.add(self.restaurant_frame, text='RELISH (Restaurant)')
-        
-        self.notebook.pack(expand=True, fill='both')
-        
-        # --- Build the content for each tab ---
-        self.setup_hotel_tab()
-        self.setup_restaurant_tab()
-        
-        # --- Class variables for Restaurant ---
-        self.current_table_info = None
-        self.current_order_items = []
-
-    def setup_hotel_tab(self):
-        # --- Left Side: Controls ---
-        hotel_controls = ttk.Frame(self.hotel_frame, padding="10")
-        hotel_controls.pack(side="left", fill="y", padx=5)
-
-        ttk.Button(hotel_controls, text="Guest Check-In", command=self.open_check_in).pack(fill='x', pady=5)
-        ttk.Button(hotel_controls, text="Guest Check-Out", command=self.open_check_out).pack(fill='x', pady=5)
-        ttk.Button(hotel_controls, text="View Booking Folio", command=self.open_view_folio).pack(fill='x', pady=5)
-        
-        # --- Right Side: Dashboard ---
-        hotel_dashboard = ttk.Frame(self.hotel_frame, padding="10")
-        hotel_dashboard.pack(side="right", expand=True, fill="both")
-
-        ttk.Label(hotel_dashboard, text="Room Dashboard", font=("Helvetica", 14, "bold")).pack(pady=10)
-
-        cols = ("room_number", "room_type", "price", "status")
-        self.room_tree = ttk.Treeview(hotel_dashboard, columns=cols, show='headings')
-        for col in cols:
-            self.room_tree.heading(col, text=col.replace('_', ' ').title())
-        self.room_tree.pack(expand=True, fill="both", pady=5)
-        
-        # Add color tags
-        self.room_tree.tag_configure('Available', background='#d9f0d9')
-        self.room_tree.tag_configure('Occupied', background='#f0d9d9')
-
-        ttk.Button(hotel_dashboard, text="Refresh Dashboard", command=self.refresh_room_dashboard).pack(pady=10)
-
-    def setup_restaurant_tab(self):
-        # --- Left Side: Table Dashboard ---
-        table_dashboard = ttk.Frame(self.restaurant_frame, padding="10")
-        table_dashboard.pack(side="left", fill="y", padx=5)
-        
-        ttk.Label(table_dashboard, text="Table Dashboard", font=("Helvetica", 14, "bold")).pack(pady=10)
-        
-        self.table_grid_frame = ttk.Frame(table_dashboard)
-        self.table_grid_frame.pack(expand=True, fill='both')
-        
-        ttk.Button(table_dashboard, text="Refresh Tables", command=self.refresh_table_dashboard).pack(pady=10)
-
-        # --- Right Side: Order Management ---
-        order_frame = ttk.Frame(self.restaurant_frame, padding="10")
-        order_frame.pack(side="right", expand=True, fill="both")
-
-        self.selected_table_label = ttk.Label(order_frame, text="Selected Table: [None]", font=("Helvetica", 14, "bold"))
-        self.selected_table_label.pack(pady=10)
-        
-        # --- Menu Frame ---
-        menu_frame = ttk.Frame(order_frame)
-        menu_frame.pack(fill='both', expand=True, pady=5)
-        
-        ttk.Label(menu_frame, text="Menu", font=("Helvetica", 12, "bold")).pack()
-        
-        menu_cols = ("item_id", "name", "price", "category")
-        self.menu_tree = ttk.Treeview(menu_frame, columns=menu_cols, show='headings', height=10)
-        for col in menu_cols:
-            self.menu_tree.heading(col, text=col.replace('_', ' ').title())
-        self.menu_tree.column("item_id", width=50, anchor='center')
-        self.menu_tree.column("price", width=80, anchor='e')
-        self.menu_tree.pack(fill='both', expand=True, side='left')
-        
-        menu_scroll = ttk.Scrollbar(menu_frame, orient="vertical", command=self.menu_tree.yview)
-        menu_scroll.pack(side='right', fill='y')
-        self.menu_tree.configure(yscrollcommand=menu_scroll.set)
-
-        ttk.Button(order_frame, text="Add Selected Item to Order >>", command=self.add_item_to_order).pack(pady=5)
-
-        # --- Current Order Frame ---
-        current_order_frame = ttk.Frame(order_frame)
-        current_order_frame.pack(fill='both', expand=True, pady=10)
-        
-        ttk.Label(current_order_frame, text="Current Order", font=("Helvetica", 12, "bold")).pack()
-        
-        order_cols = ("item_id", "name", "qty", "sub_total")
-        self.current_order_tree = ttk.Treeview(current_order_frame, columns=order_cols, show='headings', height=5)
-        for col in order_cols:
-            self.current_order_tree.heading(col, text=col.replace('_', ' ').title())
-        self.current_order_tree.column("item_id", width=50, anchor='center')
-        self.current_order_tree.column("qty", width=50, anchor='center')
-        self.current_order_tree.column("sub_total", width=80, anchor='e')
-        self.current_order_tree.pack(fill='both', expand=True)
-
-        # --- Payment Frame ---
-        payment_frame = ttk.Frame(order_frame)
-        payment_frame.pack(fill='x', pady=10)
-        
-        self.pay_walk_in_btn = ttk.Button(payment_frame, text="Pay (Walk-In)", state="disabled", command=self.process_walk_in_payment)
-        self.pay_walk_in_btn.pack(side='left', expand=True, fill='x', padx=5)
-        
-        self.charge_to_room_btn = ttk.Button(payment_frame, text="Charge to Room", state="disabled", command=self.process_charge_to_room)
-        self.charge_to_room_btn.pack(side='right', expand=True, fill='x', padx=5)
-        
-
-    # --- HOTEL (REST) FUNCTIONS ---
-    
-    def refresh_room_dashboard(self):
-        # Clear existing items
-        for item in self.room_tree.get_children():
-            self.room_tree.delete(item)
-        
-        cursor = None # Define cursor outside try
-        try:
-            cursor = self.db_conn.cursor(dictionary=True)
-            cursor.execute("SELECT room_number, room_type, price_per_night, is_occupied FROM rooms ORDER BY room_number")
-            rooms = cursor.fetchall()
-            for room in rooms:
-                status = "Occupied" if room['is_occupied'] else "Available"
-                self.room_tree.insert("", "end", values=(
-                    room['room_number'],
-                    room['room_type'],
-                    f"₹{room['price_per_night']:.2f}", 
-                    status
-                ), tags=(status,))
-        except Error as e:
-            messagebox.showerror("Error", f"Failed to fetch room status:\n{e}")
-        finally:
-            if cursor: cursor.close()
-            # No commit needed because of autocommit=True
-
-    def open_check_in(self):
-        CheckInWindow(self, self.db_conn)
-        
-    def open_check_out(self):
-        CheckOutWindow(self, self.db_conn)
-        
-    def open_view_folio(self):
-        booking_id = simpledialog.askinteger("View Folio", "Enter Booking ID:", parent=self)
-        if not booking_id:
-            return
-            
-        folio_details, total = self._get_booking_folio(booking_id)
-        
-        if folio_details is None:
-            messagebox.showerror("Error", f"Could not find folio for Booking ID {booking_id}.", parent=self)
-            return
-            
-        messagebox.showinfo(f"Folio for Booking {booking_id}", f"{folio_details}\n----------------\nGRAND TOTAL: ₹{total:.2f}")
-
-    def _get_booking_folio(self, booking_id):
-        cursor = None
-        try:
-            cursor = self.db_conn.cursor(dictionary=True)
-            
-            # 1. Get room cost from bookings
-            cursor.execute("SELECT total_room_cost FROM bookings WHERE booking_id = %s", (booking_id,))
-            booking_result = cursor.fetchone()
-            
-            if not booking_result:
-                return None, None
-                
-            room_cost = booking_result['total_room_cost']
-            grand_total = room_cost
-            folio_details = f"Room Charges: ₹{room_cost:.2f}\n\nRestaurant Charges:\n"
-            
-            # 2. Get all 'charged_to_room' orders
-            cursor.execute("""
-                SELECT order_timestamp, order_total 
-                FROM orders 
-                WHERE booking_id = %s AND order_status = 'charged_to_room'
-            """, (booking_id,))
-            
-            orders = cursor.fetchall()
-            
-            if not orders:
-                folio_details += "  (None)\n"
-            else:
-                for order in orders:
-                    folio_details += f"  - {order['order_timestamp'].strftime('%Y-%m-%d %H:%M')}: ₹{order['order_total']:.2f}\n"
-                    grand_total += order['order_total']
-                    
-            return folio_details, grand_total
-            
-        except Error as e:
-            messagebox.showerror("Database Error", f"Error fetching folio:\n{e}")
-            return None, None
-        finally:
-            if cursor: cursor.close()
-            # No commit needed because of autocommit=True
-
-
-    # --- RESTAURANT (RELISH) FUNCTIONS ---
-    
-    def refresh_table_dashboard(self, selected_table_number=None):
-        for widget in self.table_grid_frame.winfo_children():
-            widget.destroy()
-            
-        cursor = None
-        try:
-            cursor = self.db_conn.cursor(dictionary=True)
-            cursor.execute("SELECT table_id, table_number, status FROM tables ORDER BY table_number")
-            tables = cursor.fetchall()
-            
-            row, col = 0, 0
-            for table in tables:
-                btn_text = f"{table['table_number']}\n({table['status']})"
-                
-                style_name = 'TButton'
-                if table['table_number'] == selected_table_number:
-                    style_name = 'Selected.TButton'
-                
-                btn = ttk.Button(self.table_grid_frame, text=btn_text, style=style_name, command=lambda t=table: self.select_table(t))
-                btn.grid(row=row, column=col, padx=5, pady=5, ipadx=10, ipady=10)
-                
-                col += 1
-                if col > 2: # 3 buttons per row
-                    col = 0
-                    row += 1
-                    
-        except Error as e:
-            messagebox.showerror("Error", f"Failed to fetch table status:\n{e}")
-        finally:
-            if cursor: cursor.close()
-            # No commit needed because of autocommit=True
-            
-    def select_table(self, table_info):
-        self.current_table_info = table_info
-        self.selected_table_label.config(text=f"Selected Table: {table_info['table_number']} ({table_info['status']})")
-        
-        self.clear_current_order()
-        
-        # --- Back to the original single function call ---
-        self.load_menu()
-        
-        self.pay_walk_in_btn.config(state="normal")
-        self.charge_to_room_btn.config(state="normal")
-        
-        self.refresh_table_dashboard(selected_table_number=table_info['table_number'])
-            
-    def load_menu(self):
-        """
-        Loads all menu items from the database into the menu_tree.
-        """
-        for item in self.menu_tree.get_children():
-            self.menu_tree.delete(item)
-            
-        cursor = None
-        try:
-            cursor = self.db_conn.cursor(dictionary=True)
-            
-            query = "SELECT item_id, name, price, category FROM menu_items ORDER BY category, name"
-            
-            cursor.execute(query)
-            menu_items = cursor.fetchall()
-            
-            for item in menu_items:
-                self.menu_tree.insert("", "end", values=(
-                    item['item_id'],
-                    item['name'],
-                    f"₹{item['price']:.2f}",
-                    item['category']
-                ))
-        except Error as e:
-            messagebox.showerror("Error", f"Failed to load menu:\n{e}")
-        finally:
-            if cursor: cursor.close()
-            # No commit needed because of autocommit=True
-
-    def add_item_to_order(self):
-        selected_item_iid = self.menu_tree.focus()
-        if not selected_item_iid:
-            messagebox.showwarning("No Selection", "Please select a menu item to add.")
-            return
-            
-        if not self.current_table_info:
-            messagebox.showwarning("No Table", "Please select a table before adding items.")
-            return
-
-        item_data = self.menu_tree.item(selected_item_iid)['values']
-        item_id = item_data[0]
-        name = item_data[1]
-        price = float(item_data[2].replace('₹', ''))
-        
-        for order_item_iid in self.current_order_tree.get_children():
-            values = self.current_order_tree.item(order_item_iid)['values']
-            if values[0] == item_id:
-                qty = values[2] + 1
-                new_sub_total = qty * price
-                self.current_order_tree.item(order_item_iid, values=(item_id, name, qty, f"₹{new_sub_total:.2f}"))
-                return
-                
-        self.current_order_tree.insert("", "end", values=(item_id, name, 1, f"₹{price:.2f}"))
-
-    def clear_current_order(self):
-        for item in self.current_order_tree.get_children():
-            self.current_order_tree.delete(item)
-
-    def process_walk_in_payment(self):
-        order_details = self._get_order_details_from_tree()
-        if not order_details:
-            messagebox.showwarning("Empty Order", "Cannot process an empty order.", parent=self)
-            return
-
-        if not messagebox.askyesno("Confirm Payment", f"Total bill is ₹{order_details['total']:.2f}. Confirm payment?"):
-            return
-
-        success = self._create_order_in_db(
-            table_id=self.current_table_info['table_id'],
-            booking_id=None,
-            order_status='paid',
-            order_total=order_details['total'],
-            items=order_details['items']
-        )
-        
-        if success:
-            messagebox.showinfo("Success", f"Payment of ₹{order_details['total']:.2f} recorded.")
-            self._reset_restaurant_ui()
-
-    def process_charge_to_room(self):
-        order_details = self._get_order_details_from_tree()
-        if not order_details:
-            messagebox.showwarning("Empty Order", "Cannot process an empty order.", parent=self)
-            return
-
-        room_number = simpledialog.askstring("Charge to Room", "Enter guest's room number:", parent=self)
-        if not room_number:
-            return
-
-        booking_id = self._get_booking_id_from_room(room_number)
-        if not booking_id:
-            messagebox.showerror("Error", f"Could not find an active booking for Room {room_number}.", parent=self)
-            return
-
-        if not messagebox.askyesno("Confirm Charge", f"Charge ₹{order_details['total']:.2f} to Room {room_number}?"):
-            return
-
-        success = self._create_order_in_db(
-            table_id=self.current_table_info['table_id'],
-            booking_id=booking_id,
-            order_status='charged_to_room',
-            order_total=order_details['total'],
-            items=order_details['items']
-        )
-
-        if success:
-            messagebox.showinfo("Success", f"Charge of ₹{order_details['total']:.2f} posted to Room {room_number}.")
-            self._reset_restaurant_ui()
-
-    # --- RESTAURANT HELPER FUNCTIONS ---
-
-    def _get_order_details_from_tree(self):
-        items_list = []
-        total_price = 0.0
-
-        for item_iid in self.current_order_tree.get_children():
-            values = self.current_order_tree.item(item_iid)['values']
-            item_id = int(values[0])
-            qty = int(values[2])
-            sub_total = float(values[3].replace('₹', ''))
-            
-            items_list.append({
-                "item_id": item_id,
-                "quantity": qty,
-                "sub_total": sub_total
-            })
-            total_price += sub_total
-        
-        if not items_list:
-            return None
-            
-        return {"items": items_list, "total": total_price}
-
-    def _get_booking_id_from_room(self, room_number):
-        query = """
-        SELECT b.booking_id 
-        FROM bookings b
-        JOIN rooms r ON b.room_id = r.room_id
-        WHERE r.room_number = %s AND b.is_active = 1
-        """
-        cursor = None
-        try:
-            cursor = self.db_conn.cursor(dictionary=True)
-            cursor.execute(query, (room_number,))
-            result = cursor.fetchone()
-            if result:
-                return result['booking_id']
-            else:
-                return None
-        except Error as e:
-            messagebox.showerror("Database Error", f"Error finding booking:\n{e}")
-            return None
-        finally:
-            if cursor: cursor.close()
-            # No commit needed because of autocommit=True
-
-    def _create_order_in_db(self, table_id, booking_id, order_status, order_total, items):
-        cursor = None
-        try:
-            cursor = self.db_conn.cursor()
-            
-            # This function needs a transaction, so we start one.
-            # This temporarily overrides autocommit=True
-            self.db_conn.start_transaction()
-            
-            order_query = """
-            INSERT INTO orders (table_id, booking_id, order_status, order_total, order_timestamp)
-            VALUES (%s, %s, %s, %s, NOW())
-            """
-            order_data = (table_id, booking_id, order_status, order_total)
-            cursor.execute(order_query, order_data)
-            
-            order_id = cursor.lastrowid
-            
-            item_query = """
-            INSERT INTO order_items (order_id, item_id, quantity, sub_total)
-            VALUES (%s, %s, %s, %s)
-            """
-            item_data = [
-                (order_id, item['item_id'], item['quantity'], item['sub_total'])
-                for item in items
-            ]
-            cursor.executemany(item_query, item_data)
-            
-            table_query = "UPDATE tables SET status = 'available' WHERE table_id = %s"
-            cursor.execute(table_query, (table_id,))
-            
-            self.db_conn.commit() # We must manually commit this transaction
-            return True
-            
-        except Error as e:
-            if self.db_conn:
-                self.db_conn.rollback() # We must manually roll back on error
-            messagebox.showerror("Transaction Failed", f"Could not save order. Changes were rolled back.\nError: {e}")
-            return False
-        finally:
-            if cursor: cursor.close()
-
-    def _reset_restaurant_ui(self):
-        self.clear_current_order()
-        self.selected_table_label.config(text="Selected Table: [None]")
-        self.pay_walk_in_btn.config(state="disabled")
-        self.charge_to_room_btn.config(state="disabled")
-        self.current_table_info = None
-        self.refresh_table_dashboard()
-
-
-    # --- APP LIFECYCLE ---
-    def on_closing(self):
-        if messagebox.askokcancel("Quit", "Do you want to quit?"):
-            if self.db_conn and self.db_conn.is_connected():
-                self.db_conn.close()
-                print("MySQL connection closed.")
-            self.destroy()
-
-# --- (End of Main App Class) ---
-
-
-# --- NEW Toplevel Window for CHECK-IN ---
-class CheckInWindow(tk.Toplevel):
-    def __init__(self, parent, db_conn):
-        super().__init__(parent)
-        self.parent_app = parent 
-        self.db_conn = db_conn
-        
-        self.title("Guest Check-In")
-        self.geometry("700x500")
-        self.transient(parent)
-        self.grab_set()
-
-        # --- Guest Details Frame ---
-        guest_frame = ttk.LabelFrame(self, text="Guest Details", padding=10)
-        guest_frame.pack(fill="x", padx=10, pady=10)
-        
-        ttk.Label(guest_frame, text="First Name:").grid(row=0, column=0, sticky='w', padx=5, pady=5)
-        self.first_name_entry = ttk.Entry(guest_frame)
-        self.first_name_entry.grid(row=0, column=1, sticky='ew', padx=5)
-        
-        ttk.Label(guest_frame, text="Last Name:").grid(row=1, column=0, sticky='w', padx=5, pady=5)
-        self.last_name_entry = ttk.Entry(guest_frame)
-        self.last_name_entry.grid(row=1, column=1, sticky='ew', padx=5)
-        
-        ttk.Label(guest_frame, text="Email:").grid(row=0, column=2, sticky='w', padx=5, pady=5)
-        self.email_entry = ttk.Entry(guest_frame)
-        self.email_entry.grid(row=0, column=3, sticky='ew', padx=5)
-        
-        ttk.Label(guest_frame, text="Phone:").grid(row=1, column=2, sticky='w', padx=5, pady=5)
-        self.phone_entry = ttk.Entry(guest_frame)
-        self.phone_entry.grid(row=1, column=3, sticky='ew', padx=5)
-        
-        guest_frame.columnconfigure(1, weight=1)
-        guest_frame.columnconfigure(3, weight=1)
-        
-        # --- Booking Details Frame ---
-        booking_frame = ttk.LabelFrame(self, text="Booking Details", padding=10)
-        booking_frame.pack(fill="x", padx=10, pady=5)
-        
-        ttk.Label(booking_frame, text="Check-In (YYYY-MM-DD):").grid(row=0, column=0, sticky='w', padx=5, pady=5)
-        self.check_in_entry = ttk.Entry(booking_frame)
-        self.check_in_entry.insert(0, date.today().isoformat()) # Default to today
-        self.check_in_entry.grid(row=0, column=1, sticky='ew', padx=5)
-        
-        ttk.Label(booking_frame, text="Check-Out (YYYY-MM-DD):").grid(row=0, column=2, sticky='w', padx=5, pady=5)
-        self.check_out_entry = ttk.Entry(booking_frame)
-        self.check_out_entry.insert(0, (date.today() + timedelta(days=1)).isoformat()) # Default to tomorrow
-        self.check_out_entry.grid(row=0, column=3, sticky='ew', padx=5)
-
-        booking_frame.columnconfigure(1, weight=1)
-        booking_frame.columnconfigure(3, weight=1)
-
-        # --- Available Rooms Frame ---
-        rooms_frame = ttk.LabelFrame(self, text="Select an Available Room", padding=10)
-        rooms_frame.pack(fill="both", expand=True, padx=10, pady=5)
-        
-        cols = ("room_id", "room_number", "room_type", "price")
-        self.rooms_tree = ttk.Treeview(rooms_frame, columns=cols, show='headings', height=5)
-        self.rooms_tree.heading("room_id", text="ID")
-        self.rooms_tree.heading("room_number", text="Room No.")
-        self.rooms_tree.heading("room_type", text="Type")
-        self.rooms_tree.heading("price", text="Price/Night")
-        self.rooms_tree.column("room_id", width=30, anchor='center')
-        self.rooms_tree.pack(fill="both", expand=True)
-        
-        self.load_available_rooms()
-
-        # --- Confirmation Button ---
-        confirm_btn = ttk.Button(self, text="Confirm Check-In", command=self.process_check_in)
-        confirm_btn.pack(pady=10)
-
-    def load_available_rooms(self):
-        for item in self.rooms_tree.get_children():
-            self.rooms_tree.delete(item)
-            
-        cursor = None
-        try:
-            cursor = self.db_conn.cursor(dictionary=True)
-            cursor.execute("SELECT room_id, room_number, room_type, price_per_night FROM rooms WHERE is_occupied = 0")
-            rooms = cursor.fetchall()
-            for room in rooms:
-                self.rooms_tree.insert("", "end", values=(
-                    room['room_id'],
-                    room['room_number'],
-                    room['room_type'],
-                    room['price_per_night'] 
-                ))
-        except Error as e:
-            messagebox.showerror("Error", f"Failed to fetch available rooms:\n{e}", parent=self)
-        finally:
-            if cursor: cursor.close()
-            # No commit needed because of autocommit=True
-            
-    def process_check_in(self):
-        first_name = self.first_name_entry.get()
-        last_name = self.last_name_entry.get()
-        email = self.email_entry.get()
-        phone = self.phone_entry.get()
-        check_in_str = self.check_in_entry.get()
-        check_out_str = self.check_out_entry.get()
-        
-        selected_item = self.rooms_tree.focus()
-        if not selected_item:
-            messagebox.showwarning("Warning", "Please select a room.", parent=self)
-            return
-            
-        if not (first_name and last_name and check_in_str and check_out_str):
-            messagebox.showwarning("Warning", "Please fill in all guest and date fields.", parent=self)
-            return
-
-        room_data = self.rooms_tree.item(selected_item)['values']
-        room_id = room_data[0]
-        price_per_night = float(room_data[3])
-        
-        try:
-            check_in_date = date.fromisoformat(check_in_str)
-            check_out_date = date.fromisoformat(check_out_str)
-            if check_in_date >= check_out_date:
-                raise ValueError("Check-out date must be after check-in date.")
-            
-            num_nights = (check_out_date - check_in_date).days
-            total_room_cost = num_nights * price_per_night
-            
-        except ValueError as e:
-            messagebox.showwarning("Invalid Date", f"Error in dates: {e}", parent=self)
-            return
-
-        cursor = None
-        try:
-            cursor = self.db_conn.cursor()
-            # This function needs a transaction, so we start one.
-            self.db_conn.start_transaction()
-            
-            guest_query = "INSERT INTO guests (first_name, last_name, email, phone) VALUES (%s, %s, %s, %s)"
-            cursor.execute(guest_query, (first_name, last_name, email, phone))
-            guest_id = cursor.lastrowid
-            
-            booking_query = """
-            INSERT INTO bookings (guest_id, room_id, check_in_date, check_out_date, total_room_cost, is_active)
-            VALUES (%s, %s, %s, %s, %s, 1)
-            """
-            cursor.execute(booking_query, (guest_id, room_id, check_in_str, check_out_str, total_room_cost))
-            
-            room_query = "UPDATE rooms SET is_occupied = 1 WHERE room_id = %s"
-            cursor.execute(room_query, (room_id,))
-            
-            self.db_conn.commit() # Manually commit this transaction
-            
-            messagebox.showinfo("Success", f"Guest {first_name} {last_name} checked into Room {room_data[1]}.", parent=self)
-            
-            self.parent_app.refresh_room_dashboard() 
-            self.destroy() 
-            
-        except Error as e:
-            if self.db_conn: self.db_conn.rollback() # Manually roll back
-            messagebox.showerror("Transaction Failed", f"Could not complete check-in.\nError: {e}", parent=self)
-        finally:
-            if cursor: cursor.close()
-
-
-# --- NEW Toplevel Window for CHECK-OUT ---
-# --- (This class includes the button-disabling fix, which is still good) ---
-class CheckOutWindow(tk.Toplevel):
-    def __init__(self, parent, db_conn):
-        super().__init__(parent)
-        self.parent_app = parent 
-        self.db_conn = db_conn
-        
-        self.title("Guest Check-Out")
-        self.geometry("800x400")
-        self.transient(parent)
-        self.grab_set()
-        
-        bookings_frame = ttk.LabelFrame(self, text="Select an Active Booking to Check-Out", padding=10)
-        bookings_frame.pack(fill="both", expand=True, padx=10, pady=10)
-        
-        cols = ("booking_id", "room_number", "guest_name", "check_in_date", "check_out_date")
-        self.bookings_tree = ttk.Treeview(bookings_frame, columns=cols, show='headings', height=10)
-        for col in cols:
-            self.bookings_tree.heading(col, text=col.replace('_', ' ').title())
-            
-        self.bookings_tree.column("booking_id", width=50, anchor='center')
-        self.bookings_tree.pack(fill="both", expand=True)
-        
-        self.load_active_bookings()
-        
-        # Save the button as a class variable so we can disable it
-        self.confirm_btn = ttk.Button(self, text="View Folio & Process Check-Out", command=self.process_check_out)
-        self.confirm_btn.pack(pady=10)
-        
-    def load_active_bookings(self):
-        for item in self.bookings_tree.get_children():
-            self.bookings_tree.delete(item)
-            
-        cursor = None
-        try:
-            cursor = self.db_conn.cursor(dictionary=True)
-            query = """
-            SELECT b.booking_id, r.room_number, CONCAT(g.first_name, ' ', g.last_name) AS guest_name, b.check_in_date, b.check_out_date
-            FROM bookings b
-            JOIN guests g ON b.guest_id = g.guest_id
-            JOIN rooms r ON b.room_id = r.room_id
-            WHERE b.is_active = 1
-            ORDER BY r.room_number
-            """
-            cursor.execute(query)
-            bookings = cursor.fetchall()
-            for b in bookings:
-                self.bookings_tree.insert("", "end", values=(
-                    b['booking_id'],
-                    b['room_number'],
-                    b['guest_name'],
-                    b['check_in_date'],
-                    b['check_out_date']
-                ))
-        except Error as e:
-            messagebox.showerror("Error", f"Failed to fetch active bookings:\n{e}", parent=self)
-        finally:
-            if cursor: cursor.close()
-            # No commit needed because of autocommit=True
-
-    def process_check_out(self):
-        selected_item = self.bookings_tree.focus()
-        if not selected_item:
-            messagebox.showwarning("Warning", "Please select a booking to check-out.", parent=self)
-            return
-            
-        booking_data = self.bookings_tree.item(selected_item)['values']
-        booking_id = booking_data[0]
-        guest_name = booking_data[2]
-        
-        # This function is now safe because _get_booking_folio will not leave an open transaction
-        folio_details, total = self.parent_app._get_booking_folio(booking_id)
-        if folio_details is None:
-            messagebox.showerror("Error", f"Could not calculate folio for Booking {booking_id}.", parent=self)
-            return
-            
-        confirm_msg = f"--- FINAL FOLIO for {guest_name} ---\n\n"
-        confirm_msg += f"{folio_details}\n----------------\nGRAND TOTAL: ₹{total:.2f}"
-        confirm_msg += "\n\nProcess payment and check-out this guest?"
-        
-        if not messagebox.askyesno("Confirm Check-Out & Payment", confirm_msg, parent=self):
-            return
-            
-        # Disable button to prevent double-clicks
-        self.confirm_btn.config(state="disabled")
-        
-        cursor = None
-        try: 
-            cursor = self.db_conn.cursor()
-            # This function needs a transaction, so we start one.
-            self.db_conn.start_transaction()
-            
-            cursor.execute("SELECT room_id FROM bookings WHERE booking_id = %s", (booking_id,))
-            result = cursor.fetchone()
-            if not result:
-                raise Error("Booking ID not found during check-out.")
-            
-            room_id = result[0]
-            
-            cursor.execute("UPDATE bookings SET is_active = 0 WHERE booking_id = %s", (booking_id,))
-            
-            cursor.execute("UPDATE rooms SET is_occupied = 0 WHERE room_id = %s", (room_id,))
-            
-            self.db_conn.commit() # Manually commit this transaction
-            
-            messagebox.showinfo("Success", f"Guest {guest_name} has been checked out.", parent=self)
-            
-            # --- THIS IS THE FIXED LINE ---
-            self.parent_app.refresh_room_dashboard() 
-            self.destroy() # Window closes on success
-            
-        except Error as e:
-            if self.db_conn: self.db_conn.rollback() # Manually roll back
-            messagebox.showerror("Transaction Failed", f"Could not complete check-out.\nError: {e}", parent=self)
-            
-            # Re-enable button ONLY if it failed
-            try:
-                self.confirm_btn.config(state="normal")
-            except tk.TclError:
-                pass # Ignore if window is already closing
-        finally:
-            if cursor: cursor.close()
-
-
-if __name__ == "__main__":
-    app = App()
-    app.protocol("WM_DELETE_WINDOW", app.on_closing) # Handle window close
+import time
+_STARTED = time.perf_counter() # Import time is part of the startup timing report
+import logging
+import tkinter as tk
+from tkinter import ttk, messagebox, simpledialog, filedialog
+import availability
+import changefeed
+import db
+import guest_index
+import journal
+import kitchen
+import metrics
+import open_tabs
+import queries
+import services
+from cache import ReferenceCache
+from cart import OrderCart
+from changefeed import ChangeFeed
+from executor import QueryExecutor
+from menu_index import MenuIndex, POPULAR_DAYS
+from widgets import TableGrid, TreeSync, VirtualList, list_loader
+from datetime import date, timedelta, datetime # Import datetime for date parsing
+_IMPORTED = time.perf_counter()
+
+CHANGE_POLL_MS = 3000 # How often to pick up other terminals' changes
+JOURNAL_FLUSH_MS = 2000 # How often the payment journal is replayed to the database
+TAB_FLUSH_MS = 500 # How often open tabs' new lines are saved
+ALL_CATEGORIES = "All categories"
+POPULARITY_REFRESH_S = 600 # How stale the pinned most-ordered items may get
+NOTICE_MS = 10000 # How long a background notice stays in the status bar
+
+log = logging.getLogger("rest_n_relish")
+
+# --- (Main App Class) ---
+class App(tk.Tk):
+    def __init__(self):
+        self.startup = metrics.StartupTimer(started=_STARTED)
+        self.startup.record("imports", _IMPORTED - _STARTED)
+        with self.startup.phase("window"):
+            super().__init__()
+            self.title("Rest & Relish System")
+            self.geometry("900x700")
+
+            # Configure styles for a more modern look
+            self.style = ttk.Style(self)
+            self.style.theme_use('clam') # 'clam', 'alt', 'default', 'classic'
+            self.style.configure('TNotebook.Tab', font=('Helvetica', 12, 'bold'), padding=[10, 5])
+            self.style.configure('TButton', font=('Helvetica', 10), padding=5)
+            self.style.configure('TLabel', font=('Helvetica', 10))
+            self.style.configure('TEntry', font=('Helvetica', 10))
+            self.style.configure('Treeview.Heading', font=('Helvetica', 10, 'bold'))
+            self.style.configure('Selected.TButton', font=('Helvetica', 10), padding=5, background='#0078d4', foreground='white')
+        self.bind("<Map>", lambda e: self.startup.mark("window_shown"), add="+")
+
+        # Sales are journaled to a local file first, then flushed to the database
+        try:
+            self.journal = journal.PaymentJournal()
+        except OSError as e:
+            messagebox.showerror("Payment Journal Unavailable", f"Cannot open the payment journal {journal.JOURNAL_FILE}:\n{e}")
+            self.destroy()
+            raise SystemExit(1) # Nothing to run: leave before __main__ wires up the window
+        self._journal_down = False # True while flushes fail; only the first failure is reported
+        # Tables' orders are saved as they are taken, and their lines sent to the kitchen display
+        self.open_tabs = open_tabs.OpenTabs()
+        self._tabs_down = False
+        self.kitchen = kitchen.TicketQueue()
+        self.kitchen.start()
+
+        # --- Database Connection Pool ---
+        # Credentials and backend (MySQL or embedded SQLite) are configured in db.py.
+        # The pool is created in the background (connect()) so the window shows at
+        # once; queries run on worker threads so it never freezes on a round-trip.
+        self.db_pool = None
+        self.executor = QueryExecutor(self, workers=db.POOL_SIZE, error_handler=self._show_db_error)
+        # Menu, rooms and tables are cached; the menu also expires after 10 minutes
+        # in case it is edited from another terminal
+        self.cache = ReferenceCache(max_age={"menu": 600})
+        self._rendered = {} # cache name -> CacheEntry currently shown in its widget
+        self._rooms_day = date.today() # Rooms' occupancy is as of this day
+        self.availability = None # Booked-night bitmaps per room, loaded after the first data
+        self.guests = None # Type-ahead guest search index, loaded after the first data
+        self.create_main_widgets()
+        self.connect()
+
+    # --- STARTUP ---
+
+    def connect(self):
+        self.startup.begin("connect")
+        show = self.loading("Connecting to database...")
+        show(True)
+
+        def on_connected(pool):
+            show(False)
+            self.startup.end("connect")
+            self.db_pool = pool
+            # Data for the tabs built so far; the others load when first shown
+            for name, build, load in self._tabs.values():
+                if name in self._built_tabs:
+                    load()
+            self.start_change_feed()
+            self.flush_journal() # Also picks up sales left over from the last session
+            self.flush_tabs()
+            if metrics.METRICS_FILE:
+                self.after(metrics.METRICS_EXPORT_SECONDS * 1000, self._export_metrics)
+
+        def on_error(e):
+            show(False)
+            if messagebox.askretrycancel("Database Connection Failed", f"Error connecting to database:\n{e}\n\nPlease ensure the database is running and the settings in db.py are correct."):
+                self.connect()
+            else:
+                self.shutdown()
+
+        self.executor.connect(db.create_pool, on_success=on_connected, on_error=on_error)
+
+    def _first_data(self):
+        """Called when a dashboard first shows database rows."""
+        if "first_data" in self.startup.marks:
+            return
+        self.startup.mark("first_data")
+        self.startup.publish()
+        # The search indexes are big reads; they wait until the first tab has its data
+        self.executor.submit(availability.load_index, on_success=self._set_availability,
+                             on_error=lambda e: self.notify(f"Availability index unavailable: {e}"))
+        self.executor.submit(guest_index.load_index, on_success=self._set_guest_index,
+                             on_error=lambda e: self.notify(f"Guest search index unavailable: {e}"))
+
+    def _on_tab_changed(self, event=None):
+        # A tab's widgets and data are built the first time it is shown
+        name, build, load = self._tabs[self.notebook.select()]
+        if name in self._built_tabs:
+            return
+        with self.startup.phase(f"{name}_tab"):
+            build()
+        self._built_tabs.add(name)
+        if self.db_pool is not None:
+            load()
+
+    def create_main_widgets(self):
+        menubar = tk.Menu(self)
+        tools_menu = tk.Menu(menubar, tearoff=0)
+        tools_menu.add_command(label="Diagnostics", command=self.open_diagnostics)
+        menubar.add_cascade(label="Tools", menu=tools_menu)
+        self.config(menu=menubar)
+
+        # Create the main Tab controller (Notebook)
+        self.notebook = ttk.Notebook(self)
+        
+        # Create the two main frames for our tabs
+        self.hotel_frame = ttk.Frame(self.notebook, padding="10")
+        self.restaurant_frame = ttk.Frame(self.notebook, padding="10")
+        
+        # Add the frames as tabs
+        self.notebook.add(self.hotel_frame, text='REST (Hotel)')
+        self.notebook.add(self.restaurant_frame, text='RELISH (Restaurant)')
+        
+        # Status bar shows which queries are still loading, and notices from background work
+        self._loading_texts = []
+        self._notice = ""
+        self._notice_job = None
+        self.status_label = ttk.Label(self, text="", anchor='w', padding=(10, 2))
+        self.status_label.pack(side='bottom', fill='x')
+        
+        self.notebook.pack(expand=True, fill='both')
+        
+        # --- Class variables for Restaurant ---
+        self.current_table_info = None
+        self.tab = None # The selected table's open_tabs.Tab
+        self.cart = OrderCart() # Its cart; current_order_tree only renders it
+        self.menu_items = {} # item_id -> menu row currently shown
+        self.menu_index = None # Built from the cached menu; drives search and filter
+        self.item_popularity = {} # item_id -> quantity ordered over the last POPULAR_DAYS
+        self.menu_index_rows = None
+        self.popularity_loaded_at = float('-inf')
+
+        # --- Build the content for each tab, when it is first shown ---
+        self._tabs = { # notebook tab id -> (name, build widgets, load data)
+            str(self.hotel_frame): ("hotel", self.setup_hotel_tab, self.refresh_room_dashboard),
+            str(self.restaurant_frame): ("restaurant", self.setup_restaurant_tab, self.refresh_table_dashboard),
+        }
+        self._built_tabs = set()
+        self.notebook.bind("<<NotebookTabChanged>>", self._on_tab_changed)
+        self._on_tab_changed()
+
+    def setup_hotel_tab(self):
+        # --- Left Side: Controls ---
+        hotel_controls = ttk.Frame(self.hotel_frame, padding="10")
+        hotel_controls.pack(side="left", fill="y", padx=5)
+
+        ttk.Button(hotel_controls, text="Guest Check-In", command=self.open_check_in).pack(fill='x', pady=5)
+        ttk.Button(hotel_controls, text="Group Check-In", command=self.open_group_check_in).pack(fill='x', pady=5)
+        ttk.Button(hotel_controls, text="Guest Check-Out", command=self.open_check_out).pack(fill='x', pady=5)
+        ttk.Button(hotel_controls, text="View Booking Folio", command=self.open_view_folio).pack(fill='x', pady=5)
+        ttk.Button(hotel_controls, text="All Active Folios", command=self.open_active_folios).pack(fill='x', pady=5)
+        
+        # --- Right Side: Dashboard ---
+        hotel_dashboard = ttk.Frame(self.hotel_frame, padding="10")
+        hotel_dashboard.pack(side="right", expand=True, fill="both")
+
+        ttk.Label(hotel_dashboard, text="Room Dashboard", font=("Helvetica", 14, "bold")).pack(pady=10)
+
+        cols = ("room_number", "room_type", "price", "status")
+        self.room_tree = ttk.Treeview(hotel_dashboard, columns=cols, show='headings')
+        for col in cols:
+            self.room_tree.heading(col, text=col.replace('_', ' ').title())
+        self.room_tree.pack(expand=True, fill="both", pady=5)
+        # Rows are keyed by room_number and refreshed by diffing, not rebuilt
+        self.room_sync = TreeSync(self.room_tree)
+        
+        # Add color tags
+        self.room_tree.tag_configure('Available', background='#d9f0d9')
+        self.room_tree.tag_configure('Occupied', background='#f0d9d9')
+
+        ttk.Button(hotel_dashboard, text="Refresh Dashboard", command=lambda: self.refresh_room_dashboard(force=True)).pack(pady=10)
+
+    def setup_restaurant_tab(self):
+        # --- Left Side: Table Dashboard ---
+        table_dashboard = ttk.Frame(self.restaurant_frame, padding="10")
+        table_dashboard.pack(side="left", fill="y", padx=5)
+        
+        ttk.Label(table_dashboard, text="Table Dashboard", font=("Helvetica", 14, "bold")).pack(pady=10)
+        
+        # One persistent button per table; refreshes only restyle what changed
+        self.table_grid = TableGrid(table_dashboard, on_select=self.select_table)
+        self.table_grid.pack(expand=True, fill='both')
+        
+        ttk.Button(table_dashboard, text="Refresh Tables", command=lambda: self.refresh_table_dashboard(force=True)).pack(pady=10)
+        ttk.Button(table_dashboard, text="Order History", command=self.open_order_history).pack(pady=5)
+
+        # --- Right Side: Order Management ---
+        order_frame = ttk.Frame(self.restaurant_frame, padding="10")
+        order_frame.pack(side="right", expand=True, fill="both")
+
+        self.selected_table_label = ttk.Label(order_frame, text="Selected Table: [None]", font=("Helvetica", 14, "bold"))
+        self.selected_table_label.pack(pady=10)
+        
+        # --- Menu Frame ---
+        menu_frame = ttk.Frame(order_frame)
+        menu_frame.pack(fill='both', expand=True, pady=5)
+        
+        ttk.Label(menu_frame, text="Menu", font=("Helvetica", 12, "bold")).pack()
+
+        # Search and category filter; answered from menu_index, not the database
+        menu_filter = ttk.Frame(menu_frame)
+        menu_filter.pack(fill='x', pady=(0, 5))
+        ttk.Label(menu_filter, text="Search:").pack(side='left')
+        self.menu_search_entry = ttk.Entry(menu_filter)
+        self.menu_search_entry.pack(side='left', fill='x', expand=True, padx=5)
+        self.menu_search_entry.bind("<KeyRelease>", lambda e: self._filter_menu())
+        self.menu_category = ttk.Combobox(menu_filter, state="readonly", values=[ALL_CATEGORIES], width=18)
+        self.menu_category.set(ALL_CATEGORIES)
+        self.menu_category.pack(side='left')
+        self.menu_category.bind("<<ComboboxSelected>>", lambda e: self._filter_menu())
+
+        menu_cols = ("item_id", "name", "price", "category")
+        # Virtualized: only a window of the menu is ever inserted into the Treeview
+        self.menu_list = VirtualList(menu_frame, menu_cols, loader=None, height=10)
+        self.menu_list.pack(fill='both', expand=True)
+        self.menu_tree = self.menu_list.tree
+        for col in menu_cols:
+            self.menu_tree.heading(col, text=col.replace('_', ' ').title())
+        self.menu_tree.column("item_id", width=50, anchor='center')
+        self.menu_tree.column("price", width=80, anchor='e')
+        self.menu_tree.tag_configure('popular', background='#fff4d6') # pinned most-ordered items
+
+        ttk.Button(order_frame, text="Add Selected Item to Order >>", command=self.add_item_to_order).pack(pady=5)
+
+        # --- Current Order Frame ---
+        current_order_frame = ttk.Frame(order_frame)
+        current_order_frame.pack(fill='both', expand=True, pady=10)
+        
+        ttk.Label(current_order_frame, text="Current Order", font=("Helvetica", 12, "bold")).pack()
+        
+        order_cols = ("item_id", "name", "qty", "sub_total")
+        self.current_order_tree = ttk.Treeview(current_order_frame, columns=order_cols, show='headings', height=5)
+        for col in order_cols:
+            self.current_order_tree.heading(col, text=col.replace('_', ' ').title())
+        self.current_order_tree.column("item_id", width=50, anchor='center')
+        self.current_order_tree.column("qty", width=50, anchor='center')
+        self.current_order_tree.column("sub_total", width=80, anchor='e')
+        self.current_order_tree.pack(fill='both', expand=True)
+
+        order_footer = ttk.Frame(current_order_frame)
+        order_footer.pack(fill='x', pady=5)
+        ttk.Button(order_footer, text="Remove Selected Item", command=self.remove_item_from_order).pack(side='left')
+        self.order_total_label = ttk.Label(order_footer, text="Total: ₹0.00", font=("Helvetica", 11, "bold"))
+        self.order_total_label.pack(side='right')
+
+        # --- Payment Frame ---
+        payment_frame = ttk.Frame(order_frame)
+        payment_frame.pack(fill='x', pady=10)
+        
+        self.pay_walk_in_btn = ttk.Button(payment_frame, text="Pay (Walk-In)", state="disabled", command=self.process_walk_in_payment)
+        self.pay_walk_in_btn.pack(side='left', expand=True, fill='x', padx=5)
+        
+        self.charge_to_room_btn = ttk.Button(payment_frame, text="Charge to Room", state="disabled", command=self.process_charge_to_room)
+        self.charge_to_room_btn.pack(side='right', expand=True, fill='x', padx=5)
+        
+
+    # --- BACKGROUND QUERY HELPERS ---
+
+    def loading(self, text):
+        """Returns an on_loading callback that shows `text` in the status bar."""
+        def on_loading(active):
+            if active:
+                self._loading_texts.append(text)
+            elif text in self._loading_texts:
+                self._loading_texts.remove(text)
+            self._render_status()
+            self.config(cursor="watch" if self._loading_texts else "")
+        return on_loading
+
+    def notify(self, text, error=True, keep=False):
+        """
+        Reports background work nobody is waiting on: shows `text` in the
+        status bar and logs it. The notice goes after NOTICE_MS, or with
+        keep=True stays until the next one (a state such as "journal
+        down" that a later notice reports the end of).
+        """
+        (log.warning if error else log.info)(text)
+        self._notice = text
+        self._render_status()
+        if self._notice_job is not None:
+            self.after_cancel(self._notice_job)
+            self._notice_job = None
+        if not keep:
+            self._notice_job = self.after(NOTICE_MS, self._clear_notice)
+
+    def _clear_notice(self):
+        self._notice, self._notice_job = "", None
+        self._render_status()
+
+    def _render_status(self):
+        self.status_label.config(text="  |  ".join(self._loading_texts + ([self._notice] if self._notice else [])))
+
+    def _show_db_error(self, error):
+        messagebox.showerror("Database Error", f"{error}")
+
+    def _load_reference(self, name, fetch, on_success, error_text, loading_text, force=False):
+        """
+        Read-through load of cached reference data. On a hit on_success(entry)
+        runs immediately without touching the database.
+        """
+        if force:
+            self.cache.invalidate(name)
+        entry = self.cache.lookup(name)
+        if entry is not None:
+            on_success(entry)
+            return
+        version = self.cache.version(name)
+        self.executor.submit(
+            fetch,
+            key=name, # A newer load replaces one still pending
+            on_success=lambda rows: on_success(self.cache.store(name, version, rows)),
+            on_error=lambda e: messagebox.showerror("Error", f"{error_text}:\n{e}"),
+            on_loading=self.loading(loading_text),
+        )
+
+    def keyset_loader(self, fetch, to_row, error_text, widget=None):
+        """
+        Builds a VirtualList loader that runs fetch(conn, direction, key, limit)
+        in the background and converts each result row with to_row(row).
+        """
+        def loader(direction, key, limit, callback):
+            def on_error(e):
+                messagebox.showerror("Error", f"{error_text}:\n{e}", parent=widget or self)
+                callback([])
+
+            self.executor.submit(
+                fetch, direction, key, limit,
+                widget=widget,
+                on_success=lambda rows: callback([to_row(r) for r in rows]),
+                on_error=on_error,
+                on_loading=self.loading("Loading..."),
+            )
+        return loader
+
+    def _needs_render(self, name, entry):
+        """True unless `entry` is exactly what the widget for `name` already shows."""
+        if name in self._rendered and self._rendered[name] == entry: # CacheEntry compares by identity
+            return False
+        self._rendered[name] = entry
+        return True
+
+    # --- CHANGE FEED (updates from other terminals) ---
+
+    def start_change_feed(self):
+        def on_current_seq(seq):
+            self.change_feed = ChangeFeed(since=seq)
+            self.after(CHANGE_POLL_MS, self.poll_changes)
+
+        self.executor.submit(changefeed.fetch_current_seq, on_success=on_current_seq,
+                             on_error=lambda e: self.notify(f"Change feed unavailable: {e}"))
+
+    def poll_changes(self):
+        def on_error(e):
+            self.notify(f"Change feed poll failed: {e}")
+            self.after(CHANGE_POLL_MS, self.poll_changes) # Try again next time
+
+        self.executor.submit(changefeed.fetch_changes, self.change_feed.since,
+                             on_success=self._apply_changes, on_error=on_error)
+
+    def _apply_changes(self, result):
+        fresh = self.change_feed.advance(result["changes"])
+        entities = {c['entity'] for c in fresh}
+        if self._rooms_day != date.today():
+            # Reservations starting today are now in house; no change marks that
+            self._rooms_day = date.today()
+            self.refresh_room_dashboard(force=True)
+        
+        # Patch only the touched rows into the cache; the widgets then diff them in
+        if 'room' in entities:
+            entry = self.cache.patch("rooms", "room_id", result["room_ids"], result["rooms"],
+                                     sort_key=lambda r: r['room_number'])
+            if entry is not None:
+                self._render_room_dashboard(entry)
+            else:
+                self.refresh_room_dashboard()
+        if 'booking' in entities and self.availability is not None:
+            self.availability.apply(result["bookings"])
+        if 'guest' in entities and self.guests is not None:
+            self.guests.apply(result["guests"])
+        if 'table' in entities:
+            entry = self.cache.patch("tables", "table_id", result["table_ids"], result["tables"],
+                                     sort_key=lambda t: t['table_number'])
+            if entry is not None:
+                self._render_table_dashboard(entry)
+            else:
+                self.refresh_table_dashboard()
+                
+        self.after(CHANGE_POLL_MS, self.poll_changes)
+
+    # --- HOTEL (REST) FUNCTIONS ---
+    
+    def refresh_room_dashboard(self, force=False):
+        # force=True re-reads the rooms table (after a check-in/out or a manual refresh)
+        if "hotel" not in self._built_tabs:
+            return # Loaded when the tab is first shown
+        self._load_reference("rooms", queries.fetch_rooms, self._render_room_dashboard,
+                             "Failed to fetch room status", "Loading rooms...", force=force)
+
+    def _render_room_dashboard(self, entry):
+        if "hotel" not in self._built_tabs or not self._needs_render("rooms", entry):
+            return
+        self._first_data()
+        rows = []
+        for room in entry.rows:
+            status = "Occupied" if room['occupied'] else "Available"
+            rows.append((room['room_number'], (
+                room['room_number'],
+                room['room_type'],
+                f"₹{room['price_per_night']:.2f}", 
+                status
+            ), (status,)))
+        self.room_sync.sync(rows)
+
+    def _set_availability(self, index):
+        self.availability = index
+
+    def _set_guest_index(self, index):
+        self.guests = index
+
+    def search_guests(self, text, callback, widget):
+        """Calls callback(guests) with the guests matching the typed prefix."""
+        if self.guests is not None:
+            self.executor.cancel((widget, "guest_search"))
+            callback(self.guests.search(text))
+            return
+        # Index still loading: the guests indexes answer instead
+        self.executor.submit(
+            services.search_guests, text,
+            key=(widget, "guest_search"),
+            widget=widget,
+            on_success=callback,
+            on_error=lambda e: self.notify(f"Guest search failed: {e}"),
+        )
+
+    def find_free_rooms(self, check_in, check_out, callback, widget):
+        """Calls callback(rooms) with the rooms free for [check_in, check_out)."""
+        # Answered in memory from the availability bitmaps and the cached
+        # rooms; the database is only asked while either is still loading
+        rooms = self.cache.lookup("rooms")
+        if self.availability is not None and rooms is not None:
+            self.executor.cancel((widget, "available_rooms"))
+            callback(self.availability.free_rooms(rooms.rows, check_in, check_out))
+            return
+
+        self.executor.submit(
+            queries.fetch_free_rooms, check_in, check_out,
+            key=(widget, "available_rooms"),
+            widget=widget, # Drop the result if the window was closed meanwhile
+            on_success=callback,
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to fetch available rooms:\n{e}", parent=widget),
+            on_loading=self.loading("Loading available rooms..."),
+        )
+
+    def _record_bookings(self, bookings):
+        if self.availability is not None:
+            for booking in bookings:
+                self.availability.set_booking(booking['booking_id'], booking['room_id'],
+                                              booking['check_in_date'], booking['check_out_date'])
+        self.refresh_room_dashboard(force=True)
+
+    def open_check_in(self):
+        CheckInWindow(self, self.executor)
+
+    def open_group_check_in(self):
+        GroupCheckInWindow(self, self.executor)
+        
+    def open_check_out(self):
+        CheckOutWindow(self, self.executor)
+        
+    def open_view_folio(self):
+        booking_id = simpledialog.askinteger("View Folio", "Enter Booking ID:", parent=self)
+        if not booking_id:
+            return
+            
+        def show_folio(folio_details, total):
+            if folio_details is None:
+                messagebox.showerror("Error", f"Could not find folio for Booking ID {booking_id}.", parent=self)
+                return
+                
+            messagebox.showinfo(f"Folio for Booking {booking_id}", f"{folio_details}\n----------------\nGRAND TOTAL: ₹{total:.2f}")
+
+        self._get_booking_folio(booking_id, show_folio)
+
+    def open_active_folios(self):
+        ActiveFoliosWindow(self, self.executor)
+
+    def _get_booking_folio(self, booking_id, callback, widget=None):
+        """Fetches the folio in the background, then calls callback(folio_details, total)."""
+        def on_error(e):
+            if not isinstance(e, services.NotFound): # callback reports a missing booking itself
+                messagebox.showerror("Database Error", f"Error fetching folio:\n{e}", parent=widget or self)
+            callback(None, None)
+
+        self.executor.submit(
+            services.booking_folio, booking_id,
+            widget=widget,
+            on_success=lambda folio: callback(folio['details'], folio['grand_total']),
+            on_error=on_error,
+            on_loading=self.loading("Loading folio..."),
+        )
+
+
+    # --- RESTAURANT (RELISH) FUNCTIONS ---
+    
+    def refresh_table_dashboard(self, force=False):
+        if "restaurant" not in self._built_tabs:
+            return # Loaded when the tab is first shown
+        self._load_reference("tables", queries.fetch_tables, self._render_table_dashboard,
+                             "Failed to fetch table status", "Loading tables...", force=force)
+
+    def _render_table_dashboard(self, entry):
+        if "restaurant" not in self._built_tabs or not self._needs_render("tables", entry):
+            return
+        self._first_data()
+        self.table_grid.update_tables(entry.rows)
+            
+    def open_order_history(self):
+        OrderHistoryWindow(self, self.executor)
+
+    def select_table(self, table_info):
+        self.current_table_info = table_info
+        self.selected_table_label.config(text=f"Selected Table: {table_info['table_number']} ({table_info['status']})")
+        
+        self.tab = self.open_tabs.get(table_info['table_id'])
+        self._show_tab()
+        # The table may have a tab saved earlier, on this terminal or another
+        table_id = table_info['table_id']
+        self.executor.submit(
+            queries.fetch_open_order, table_id,
+            key="open_tab", # Clicking through tables cancels stale lookups
+            on_success=lambda found: self._tab_loaded(table_id, found),
+            on_error=lambda e: self.notify(f"Could not read the open tab of table {table_info['table_number']}: {e}"),
+            on_loading=self.loading("Loading tab..."),
+        )
+        
+        # --- Back to the original single function call ---
+        self.load_menu()
+        
+        self.pay_walk_in_btn.config(state="normal")
+        self.charge_to_room_btn.config(state="normal")
+        
+        # Only the previously selected and newly selected buttons change
+        self.table_grid.select(table_info['table_id'])
+            
+    def load_menu(self):
+        """
+        Loads all menu items from the database into the menu_tree.
+        """
+        self._load_reference("menu", queries.fetch_menu, self._render_menu,
+                             "Failed to load menu", "Loading menu...")
+
+    def _render_menu(self, entry):
+        # Usually a cache hit on the menu we already show: nothing to rebuild
+        if not self._needs_render("menu", entry):
+            return
+        if self.menu_index is None or entry.rows is not self.menu_index_rows:
+            # Built once per menu version; a cache hit reuses it
+            self.menu_items = {item['item_id']: item for item in entry.rows}
+            self.menu_index = MenuIndex(entry.rows, self.item_popularity)
+            self.menu_index_rows = entry.rows
+            categories = self.menu_index.categories()
+            self.menu_category.config(values=[ALL_CATEGORIES] + categories)
+            if self.menu_category.get() not in categories:
+                self.menu_category.set(ALL_CATEGORIES)
+        self._filter_menu()
+        if time.monotonic() - self.popularity_loaded_at > POPULARITY_REFRESH_S:
+            self.popularity_loaded_at = time.monotonic()
+            self.executor.submit(
+                queries.fetch_item_popularity, datetime.now() - timedelta(days=POPULAR_DAYS),
+                key="item_popularity",
+                on_success=self._set_item_popularity,
+                on_error=lambda e: self.notify(f"Item popularity unavailable: {e}"),
+            )
+
+    def _set_item_popularity(self, counts):
+        self.item_popularity = counts
+        if self.menu_index is not None:
+            self.menu_index.popularity = dict(counts)
+            self._filter_menu()
+
+    def _filter_menu(self):
+        if self.menu_index is None:
+            return
+        category = self.menu_category.get()
+        pinned, rest = self.menu_index.search(self.menu_search_entry.get(),
+                                              None if category == ALL_CATEGORIES else category)
+
+        def row(key, item, tags):
+            return key, (item['item_id'], item['name'], f"₹{item['price']:.2f}", item['category']), tags
+
+        # Keys sort pinned rows first, then menu order; list_loader pages by key
+        rows = [row((0, n), item, ('popular',)) for n, item in enumerate(pinned)]
+        rows += [row((1, n), item, ()) for n, item in enumerate(rest)]
+        self.menu_list.set_loader(list_loader(rows))
+
+    def add_item_to_order(self):
+        selected_item_iid = self.menu_tree.focus()
+        if not selected_item_iid:
+            messagebox.showwarning("No Selection", "Please select a menu item to add.")
+            return
+            
+        if not self.current_table_info:
+            messagebox.showwarning("No Table", "Please select a table before adding items.")
+            return
+
+        # Name and price come from the menu row itself, not the displayed text
+        item = self.menu_items[int(self.menu_tree.item(selected_item_iid)['values'][0])]
+        line = self.cart.add(item['item_id'], item['name'], item['price'])
+        self._line_changed(line, 1)
+
+    def remove_item_from_order(self):
+        selected_iid = self.current_order_tree.focus()
+        if not selected_iid:
+            messagebox.showwarning("No Selection", "Please select an item in the current order to remove.")
+            return
+        line = self.cart.remove(int(selected_iid))
+        if line is not None:
+            self._line_changed(line, -1)
+
+    def _line_changed(self, line, quantity):
+        # Saved with the next flush_tabs(); the kitchen hears about it now
+        self.open_tabs.set_line(self.tab, line)
+        self.kitchen.put(kitchen.ticket(self.current_table_info['table_number'], self.tab.ref,
+                                        line.item_id, line.name, quantity))
+        self._render_cart_line(line.item_id)
+
+    def _render_cart_line(self, item_id):
+        """Shows the cart's current state for one item; the tree's iid is the item_id."""
+        iid = str(item_id)
+        line = self.cart.get(item_id)
+        if line is None:
+            if self.current_order_tree.exists(iid):
+                self.current_order_tree.delete(iid)
+        else:
+            values = (line.item_id, line.name, line.quantity, f"₹{line.sub_total:.2f}")
+            if self.current_order_tree.exists(iid):
+                self.current_order_tree.item(iid, values=values)
+            else:
+                self.current_order_tree.insert("", "end", iid=iid, values=values)
+        self.order_total_label.config(text=f"Total: ₹{self.cart.total:.2f}")
+
+    def clear_current_order(self):
+        self.tab = None
+        self.cart = OrderCart()
+        self._show_tab()
+
+    def _show_tab(self):
+        if self.tab is not None:
+            self.cart = self.tab.cart
+        self.current_order_tree.delete(*self.current_order_tree.get_children())
+        for line in self.cart:
+            self._render_cart_line(line.item_id)
+        self.order_total_label.config(text=f"Total: ₹{self.cart.total:.2f}")
+
+    def _tab_loaded(self, table_id, found):
+        if found is None:
+            return
+        tab = self.open_tabs.adopt(table_id, *found)
+        if self.current_table_info and self.current_table_info['table_id'] == table_id:
+            self.tab = tab
+            self._show_tab()
+
+    def process_walk_in_payment(self):
+        order_details = self._get_order_details()
+        if not order_details:
+            messagebox.showwarning("Empty Order", "Cannot process an empty order.", parent=self)
+            return
+
+        if not messagebox.askyesno("Confirm Payment", f"Total bill is ₹{order_details['total']:.2f}. Confirm payment?"):
+            return
+
+        def on_saved():
+            messagebox.showinfo("Success", f"Payment of ₹{order_details['total']:.2f} recorded.")
+            self._reset_restaurant_ui()
+
+        self._create_order_in_db(
+            table_id=self.current_table_info['table_id'],
+            items=order_details['items'],
+            booking_id=None,
+            on_saved=on_saved,
+            ref=order_details['ref']
+        )
+
+    def process_charge_to_room(self):
+        order_details = self._get_order_details()
+        if not order_details:
+            messagebox.showwarning("Empty Order", "Cannot process an empty order.", parent=self)
+            return
+
+        room_number = simpledialog.askstring("Charge to Room", "Enter guest's room number:", parent=self)
+        if not room_number:
+            return
+
+        table_id = self.current_table_info['table_id']
+
+        def on_booking_found(booking_id):
+            if not booking_id:
+                messagebox.showerror("Error", f"Could not find an active booking for Room {room_number}.", parent=self)
+                return
+
+            if not messagebox.askyesno("Confirm Charge", f"Charge ₹{order_details['total']:.2f} to Room {room_number}?"):
+                return
+
+            def on_saved():
+                messagebox.showinfo("Success", f"Charge of ₹{order_details['total']:.2f} posted to Room {room_number}.")
+                self._reset_restaurant_ui()
+
+            self._create_order_in_db(
+                table_id=table_id,
+                items=order_details['items'],
+                booking_id=booking_id,
+                on_saved=on_saved,
+                ref=order_details['ref']
+            )
+
+        self._get_booking_id_from_room(room_number, on_booking_found)
+
+    # --- RESTAURANT HELPER FUNCTIONS ---
+
+    def _get_order_details(self):
+        # Snapshot of the cart, so edits made while the order saves don't leak in
+        if not self.cart:
+            return None
+        return {"items": self.cart.items(), "total": self.cart.total, "ref": self.tab.ref if self.tab else None}
+
+    def _get_booking_id_from_room(self, room_number, callback):
+        """Looks up the active booking in the background, then calls callback(booking_id or None)."""
+        def on_error(e):
+            if isinstance(e, services.NotFound):
+                callback(None)
+            else:
+                messagebox.showerror("Database Error", f"Error finding booking:\n{e}")
+
+        self.executor.submit(
+            services.find_booking, room_number,
+            on_success=callback,
+            on_error=on_error,
+            on_loading=self.loading("Finding booking..."),
+        )
+
+    def _create_order_in_db(self, table_id, items, booking_id, on_saved, ref=None):
+        """
+        Records the order as paid, or charged to booking_id; `ref` is the
+        open tab it pays. It goes to the payment journal and on to the
+        database in the background, so the till doesn't wait on (or fail
+        with) the database.
+        """
+        try:
+            services.journal_order(self.journal, table_id, items, booking_id, ref)
+        except services.ServiceError as e:
+            messagebox.showerror("Transaction Failed", f"Could not save order.\nError: {e}")
+            return
+        self.open_tabs.close(table_id)
+        if self.menu_index is not None:
+            self.menu_index.record_order(items)
+        on_saved()
+        self.flush_journal(reschedule=False)
+
+    # --- PAYMENT JOURNAL ---
+
+    def flush_journal(self, reschedule=True):
+        """Replays journaled sales to the database; reschedules itself every JOURNAL_FLUSH_MS."""
+        if reschedule:
+            self.after(JOURNAL_FLUSH_MS, self.flush_journal)
+        if not self.journal.pending_count():
+            return
+        self.executor.submit(self.journal.flush, on_success=self._journal_flushed, on_error=self._journal_flush_failed)
+
+    def _journal_flushed(self, result):
+        written, failed = result
+        if self._journal_down and not self.journal.pending_count():
+            self.notify("Payment journal caught up with the database.", error=False)
+            self._journal_down = False
+        if written:
+            self.refresh_table_dashboard(force=True)
+        if failed:
+            messagebox.showerror(
+                "Orders Not Saved",
+                f"The database refused {len(failed)} journaled order(s):\n" +
+                "\n".join(f"{ref[:8]}: {error}" for ref, error in failed[:5]) +
+                f"\n\nThey are kept in {self.journal.path} to be settled by hand."
+            )
+
+    def _journal_flush_failed(self, e):
+        if not self._journal_down:
+            self.notify(f"Payment journal flush failed, will retry ({self.journal.pending_count()} pending): {e}", keep=True)
+            self._journal_down = True
+
+    # --- OPEN TABS ---
+
+    def flush_tabs(self, reschedule=True):
+        """Saves open tabs' new lines; reschedules itself every TAB_FLUSH_MS."""
+        if reschedule:
+            self.after(TAB_FLUSH_MS, self.flush_tabs)
+        if not self.open_tabs.pending_count():
+            return
+        self.executor.submit(self.open_tabs.flush, on_success=self._tabs_flushed, on_error=self._tabs_flush_failed)
+
+    def _tabs_flushed(self, result):
+        saved, elsewhere = result
+        # Tables whose tab was opened on another terminal first: take that tab over
+        for table_id, found in elsewhere.items():
+            self._tab_loaded(table_id, found)
+        if self._tabs_down and not self.open_tabs.pending_count():
+            self.notify("Open tabs saved again.", error=False)
+            self._tabs_down = False
+
+    def _tabs_flush_failed(self, e):
+        if not self._tabs_down:
+            self.notify(f"Could not save open tabs, will retry: {e}", keep=True)
+            self._tabs_down = True
+
+    def _reset_restaurant_ui(self):
+        self.clear_current_order()
+        self.selected_table_label.config(text="Selected Table: [None]")
+        self.pay_walk_in_btn.config(state="disabled")
+        self.charge_to_room_btn.config(state="disabled")
+        self.current_table_info = None
+        self.table_grid.select(None)
+        self.refresh_table_dashboard(force=True) # The order changed the table's status
+
+
+    # --- DIAGNOSTICS ---
+
+    def open_diagnostics(self):
+        if self.db_pool is None:
+            messagebox.showinfo("Diagnostics", "Not connected to the database yet.", parent=self)
+            return
+        DiagnosticsWindow(self, self.db_pool.metrics)
+
+    def _export_metrics(self):
+        try:
+            self.db_pool.metrics.write_prometheus(metrics.METRICS_FILE)
+        except OSError as e:
+            self.notify(f"Could not write metrics to {metrics.METRICS_FILE}: {e}")
+        self.after(metrics.METRICS_EXPORT_SECONDS * 1000, self._export_metrics)
+
+    # --- APP LIFECYCLE ---
+    def on_closing(self):
+        if messagebox.askokcancel("Quit", "Do you want to quit?"):
+            self.shutdown()
+
+    def shutdown(self):
+        # Let in-flight transactions finish (there are none before the connection is up)
+        self.executor.shutdown(wait=self.db_pool is not None)
+        if self.db_pool:
+            try:
+                with self.db_pool.connection() as conn:
+                    self.open_tabs.flush(conn) # The last lines taken
+            except db.Error as e:
+                log.error("Could not save %d open tab(s): %s", self.open_tabs.pending_count(), e)
+                messagebox.showwarning("Open Tabs Not Saved",
+                                       f"The last lines of {self.open_tabs.pending_count()} open tab(s) could not be saved:\n{e}")
+            self.db_pool.close()
+            log.info("Database connections closed.")
+        pending = self.journal.pending_count()
+        if pending:
+            log.info("%d journaled order(s) not yet in the database; they are written at the next start.", pending)
+        self.journal.close()
+        self.kitchen.close()
+        self.destroy()
+
+# --- (End of Main App Class) ---
+
+
+# --- NEW Toplevel Window for CHECK-IN ---
+class CheckInWindow(tk.Toplevel):
+    def __init__(self, parent, executor):
+        super().__init__(parent)
+        self.parent_app = parent 
+        self.executor = executor
+        
+        self.title("Guest Check-In")
+        self.geometry("700x620")
+        self.transient(parent)
+        self.grab_set()
+        self.guest_id = None # Set when a returning guest is picked from the search
+        self._search_job = None
+
+        # --- Returning Guest Frame ---
+        search_frame = ttk.LabelFrame(self, text="Returning Guest (name, email or phone)", padding=10)
+        search_frame.pack(fill="x", padx=10, pady=(10, 0))
+        self.search_entry = ttk.Entry(search_frame)
+        self.search_entry.pack(fill='x')
+        self.search_entry.bind("<KeyRelease>", self._on_search_key)
+        self.search_results = tk.Listbox(search_frame, height=4)
+        self.search_results.pack(fill='x', pady=(5, 0))
+        self.search_results.bind("<<ListboxSelect>>", self._on_guest_selected)
+        self._matches = []
+        self.guest_label = ttk.Label(search_frame, text="New guest")
+        self.guest_label.pack(side='left', pady=(5, 0))
+        ttk.Button(search_frame, text="New Guest", command=self._clear_guest).pack(side='right', pady=(5, 0))
+
+        # --- Guest Details Frame ---
+        guest_frame = ttk.LabelFrame(self, text="Guest Details", padding=10)
+        guest_frame.pack(fill="x", padx=10, pady=10)
+        
+        ttk.Label(guest_frame, text="First Name:").grid(row=0, column=0, sticky='w', padx=5, pady=5)
+        self.first_name_entry = ttk.Entry(guest_frame)
+        self.first_name_entry.grid(row=0, column=1, sticky='ew', padx=5)
+        
+        ttk.Label(guest_frame, text="Last Name:").grid(row=1, column=0, sticky='w', padx=5, pady=5)
+        self.last_name_entry = ttk.Entry(guest_frame)
+        self.last_name_entry.grid(row=1, column=1, sticky='ew', padx=5)
+        
+        ttk.Label(guest_frame, text="Email:").grid(row=0, column=2, sticky='w', padx=5, pady=5)
+        self.email_entry = ttk.Entry(guest_frame)
+        self.email_entry.grid(row=0, column=3, sticky='ew', padx=5)
+        
+        ttk.Label(guest_frame, text="Phone:").grid(row=1, column=2, sticky='w', padx=5, pady=5)
+        self.phone_entry = ttk.Entry(guest_frame)
+        self.phone_entry.grid(row=1, column=3, sticky='ew', padx=5)
+        
+        guest_frame.columnconfigure(1, weight=1)
+        guest_frame.columnconfigure(3, weight=1)
+        
+        # --- Booking Details Frame ---
+        booking_frame = ttk.LabelFrame(self, text="Booking Details", padding=10)
+        booking_frame.pack(fill="x", padx=10, pady=5)
+        
+        ttk.Label(booking_frame, text="Check-In (YYYY-MM-DD):").grid(row=0, column=0, sticky='w', padx=5, pady=5)
+        self.check_in_entry = ttk.Entry(booking_frame)
+        self.check_in_entry.insert(0, date.today().isoformat()) # Default to today
+        self.check_in_entry.grid(row=0, column=1, sticky='ew', padx=5)
+        
+        ttk.Label(booking_frame, text="Check-Out (YYYY-MM-DD):").grid(row=0, column=2, sticky='w', padx=5, pady=5)
+        self.check_out_entry = ttk.Entry(booking_frame)
+        self.check_out_entry.insert(0, (date.today() + timedelta(days=1)).isoformat()) # Default to tomorrow
+        self.check_out_entry.grid(row=0, column=3, sticky='ew', padx=5)
+
+        ttk.Button(booking_frame, text="Find Rooms", command=self.load_available_rooms).grid(row=0, column=4, padx=5)
+        for entry in (self.check_in_entry, self.check_out_entry):
+            entry.bind("<Return>", lambda e: self.load_available_rooms())
+
+        booking_frame.columnconfigure(1, weight=1)
+        booking_frame.columnconfigure(3, weight=1)
+
+        # --- Available Rooms Frame ---
+        rooms_frame = ttk.LabelFrame(self, text="Select a Room Free for These Dates", padding=10)
+        rooms_frame.pack(fill="both", expand=True, padx=10, pady=5)
+        
+        cols = ("room_id", "room_number", "room_type", "price")
+        self.rooms_tree = ttk.Treeview(rooms_frame, columns=cols, show='headings', height=5)
+        self.rooms_tree.heading("room_id", text="ID")
+        self.rooms_tree.heading("room_number", text="Room No.")
+        self.rooms_tree.heading("room_type", text="Type")
+        self.rooms_tree.heading("price", text="Price/Night")
+        self.rooms_tree.column("room_id", width=30, anchor='center')
+        self.rooms_tree.pack(fill="both", expand=True)
+        self.rooms_sync = TreeSync(self.rooms_tree)
+        
+        self.load_available_rooms()
+
+        # --- Confirmation Button ---
+        self.confirm_btn = ttk.Button(self, text="Confirm Check-In", command=self.process_check_in)
+        self.confirm_btn.pack(pady=10)
+
+    # --- Returning guest search ---
+
+    def _on_search_key(self, event=None):
+        # Searched once typing pauses, not on every keystroke of a burst
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(120, self._run_search)
+
+    def _run_search(self):
+        self._search_job = None
+        text = self.search_entry.get()
+        if not guest_index.search_terms(text):
+            self._render_matches([])
+            return
+        self.parent_app.search_guests(text, self._render_matches, self)
+
+    def _render_matches(self, guests):
+        self._matches = guests
+        self.search_results.delete(0, 'end')
+        for g in guests:
+            self.search_results.insert('end', f"{g['first_name']} {g['last_name']}   {g['email'] or ''}   {g['phone'] or ''}")
+
+    def _on_guest_selected(self, event=None):
+        selection = self.search_results.curselection()
+        if not selection:
+            return
+        guest = self._matches[selection[0]]
+        self.guest_id = guest['guest_id']
+        for entry, value in ((self.first_name_entry, guest['first_name']), (self.last_name_entry, guest['last_name']),
+                             (self.email_entry, guest['email']), (self.phone_entry, guest['phone'])):
+            entry.delete(0, 'end')
+            entry.insert(0, value or "")
+        self.guest_label.config(text=f"Returning guest #{guest['guest_id']}")
+
+    def _clear_guest(self):
+        self.guest_id = None
+        for entry in (self.search_entry, self.first_name_entry, self.last_name_entry, self.email_entry, self.phone_entry):
+            entry.delete(0, 'end')
+        self._render_matches([])
+        self.guest_label.config(text="New guest")
+
+    def load_available_rooms(self):
+        try:
+            check_in, check_out = services.parse_stay(self.check_in_entry.get(), self.check_out_entry.get())
+        except services.ServiceError as e:
+            messagebox.showwarning("Invalid Date", f"Error in dates: {e}", parent=self)
+            return
+
+        self.parent_app.find_free_rooms(check_in, check_out, self._render_available_rooms, self)
+
+    def _render_available_rooms(self, rooms):
+        self.rooms_sync.sync(
+            (room['room_id'], (
+                room['room_id'],
+                room['room_number'],
+                room['room_type'],
+                room['price_per_night'] 
+            ), ())
+            for room in rooms
+        )
+            
+    def process_check_in(self):
+        first_name = self.first_name_entry.get()
+        last_name = self.last_name_entry.get()
+        email = self.email_entry.get()
+        phone = self.phone_entry.get()
+        check_in_str = self.check_in_entry.get()
+        check_out_str = self.check_out_entry.get()
+        
+        selected_item = self.rooms_tree.focus()
+        if not selected_item:
+            messagebox.showwarning("Warning", "Please select a room.", parent=self)
+            return
+            
+        if not (first_name and last_name and check_in_str and check_out_str):
+            messagebox.showwarning("Warning", "Please fill in all guest and date fields.", parent=self)
+            return
+
+        room_id = self.rooms_tree.item(selected_item)['values'][0]
+
+        # Disable button to prevent double-clicks while the transaction runs
+        self.confirm_btn.config(state="disabled")
+
+        def on_checked_in(booking):
+            if booking['reservation']:
+                messagebox.showinfo("Success", f"Room {booking['room_number']} reserved for {first_name} {last_name} from {booking['check_in_date']}.", parent=self)
+            else:
+                messagebox.showinfo("Success", f"Guest {first_name} {last_name} checked into Room {booking['room_number']}.", parent=self)
+            
+            self.parent_app._record_bookings([booking])
+            self.destroy() 
+
+        def on_error(e):
+            messagebox.showerror("Transaction Failed", f"Could not complete check-in.\nError: {e}", parent=self)
+            self.confirm_btn.config(state="normal")
+            self.load_available_rooms() # The room may have been taken by another terminal
+
+        self.executor.submit(
+            services.check_in,
+            first_name, last_name, email, phone, room_id, check_in_str, check_out_str, self.guest_id,
+            widget=self,
+            on_success=on_checked_in,
+            on_error=on_error,
+            on_loading=self.parent_app.loading("Checking in..."),
+        )
+
+
+# --- Toplevel Window for GROUP CHECK-IN (tour groups) ---
+class GroupCheckInWindow(tk.Toplevel):
+    def __init__(self, parent, executor):
+        super().__init__(parent)
+        self.parent_app = parent
+        self.executor = executor
+        self.assignment = None # (roster text, check_in, check_out, assigned roster) of the preview shown
+
+        self.title("Group Check-In")
+        self.geometry("750x600")
+        self.transient(parent)
+        self.grab_set()
+
+        # --- Dates Frame ---
+        dates_frame = ttk.LabelFrame(self, text="Stay (same dates for the whole group)", padding=10)
+        dates_frame.pack(fill="x", padx=10, pady=10)
+
+        ttk.Label(dates_frame, text="Check-In (YYYY-MM-DD):").grid(row=0, column=0, sticky='w', padx=5, pady=5)
+        self.check_in_entry = ttk.Entry(dates_frame)
+        self.check_in_entry.insert(0, date.today().isoformat())
+        self.check_in_entry.grid(row=0, column=1, sticky='ew', padx=5)
+
+        ttk.Label(dates_frame, text="Check-Out (YYYY-MM-DD):").grid(row=0, column=2, sticky='w', padx=5, pady=5)
+        self.check_out_entry = ttk.Entry(dates_frame)
+        self.check_out_entry.insert(0, (date.today() + timedelta(days=1)).isoformat())
+        self.check_out_entry.grid(row=0, column=3, sticky='ew', padx=5)
+        dates_frame.columnconfigure(1, weight=1)
+        dates_frame.columnconfigure(3, weight=1)
+
+        # --- Roster Frame ---
+        roster_frame = ttk.LabelFrame(self, text="Roster", padding=10)
+        roster_frame.pack(fill="both", expand=True, padx=10, pady=5)
+        ttk.Label(roster_frame, text="One guest per line: first name, last name, email, phone, room type (optional)").pack(anchor='w')
+        self.roster_text = tk.Text(roster_frame, height=8, wrap='none')
+        self.roster_text.pack(fill="both", expand=True, pady=5)
+
+        roster_buttons = ttk.Frame(roster_frame)
+        roster_buttons.pack(fill='x')
+        ttk.Button(roster_buttons, text="Import CSV...", command=self.import_csv).pack(side='left', padx=5)
+        ttk.Button(roster_buttons, text="Assign Rooms", command=self.assign_rooms).pack(side='left', padx=5)
+
+        # --- Assignment Frame ---
+        assign_frame = ttk.LabelFrame(self, text="Room Assignment", padding=10)
+        assign_frame.pack(fill="both", expand=True, padx=10, pady=5)
+        cols = ("guest", "room_number", "room_type", "price")
+        self.assign_tree = ttk.Treeview(assign_frame, columns=cols, show='headings', height=6)
+        for col, text in zip(cols, ("Guest", "Room No.", "Type", "Price/Night")):
+            self.assign_tree.heading(col, text=text)
+        self.assign_tree.pack(fill="both", expand=True)
+
+        self.confirm_btn = ttk.Button(self, text="Confirm Group Check-In", command=self.process_group_check_in)
+        self.confirm_btn.pack(pady=10)
+
+    def _read_form(self):
+        """(roster text, roster, check_in, check_out), or None after showing what is wrong."""
+        text = self.roster_text.get("1.0", "end")
+        try:
+            check_in, check_out = services.parse_stay(self.check_in_entry.get(), self.check_out_entry.get())
+            roster = services.parse_roster(text)
+        except services.ServiceError as e:
+            messagebox.showwarning("Warning", str(e), parent=self)
+            return None
+        if not roster:
+            messagebox.showwarning("Warning", "Please enter or import the group's roster.", parent=self)
+            return None
+        return text, roster, check_in, check_out
+
+    def import_csv(self):
+        path = filedialog.askopenfilename(parent=self, title="Import Roster",
+                                          filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            with open(path, newline="", encoding="utf-8-sig") as f:
+                text = f.read()
+        except (OSError, UnicodeDecodeError) as e:
+            messagebox.showerror("Import Failed", f"Could not read {path}:\n{e}", parent=self)
+            return
+        self.roster_text.delete("1.0", "end")
+        self.roster_text.insert("1.0", text)
+        self.assign_rooms()
+
+    def assign_rooms(self):
+        form = self._read_form()
+        if form is None:
+            return
+        text, roster, check_in, check_out = form
+
+        def on_free_rooms(rooms):
+            try:
+                assigned = services.assign_rooms(roster, rooms)
+            except services.ServiceError as e:
+                self.assignment = None
+                self.assign_tree.delete(*self.assign_tree.get_children())
+                messagebox.showwarning("Not Enough Rooms", str(e), parent=self)
+                return
+            by_id = {room['room_id']: room for room in rooms}
+            self.assignment = (text, check_in, check_out, assigned)
+            self.assign_tree.delete(*self.assign_tree.get_children())
+            for guest in assigned:
+                room = by_id[guest['room_id']]
+                self.assign_tree.insert("", "end", values=(
+                    f"{guest['first_name']} {guest['last_name']}", room['room_number'],
+                    room['room_type'], room['price_per_night']))
+
+        self.parent_app.find_free_rooms(check_in, check_out, on_free_rooms, self)
+
+    def process_group_check_in(self):
+        form = self._read_form()
+        if form is None:
+            return
+        text, roster, check_in, check_out = form
+        # Keep the rooms previewed for this exact roster and dates; otherwise
+        # the service assigns free rooms itself
+        if self.assignment and self.assignment[:3] == (text, check_in, check_out):
+            roster = self.assignment[3]
+
+        self.confirm_btn.config(state="disabled")
+
+        def on_checked_in(bookings):
+            self.parent_app._record_bookings(bookings)
+            action = "reserved rooms from " + check_in.isoformat() if bookings[0]['reservation'] else "checked in"
+            rooms = ", ".join(str(b['room_number']) for b in bookings)
+            messagebox.showinfo("Success", f"{len(bookings)} guests {action}.\nRooms: {rooms}", parent=self)
+            self.destroy()
+
+        def on_error(e):
+            messagebox.showerror("Transaction Failed", f"Could not complete the group check-in; no guest was checked in.\nError: {e}", parent=self)
+            self.confirm_btn.config(state="normal")
+            self.assign_rooms() # Rooms may have been taken by another terminal
+
+        self.executor.submit(
+            services.group_check_in, roster, check_in, check_out,
+            widget=self,
+            on_success=on_checked_in,
+            on_error=on_error,
+            on_loading=self.parent_app.loading(f"Checking in {len(roster)} guests..."),
+        )
+
+
+# --- NEW Toplevel Window for CHECK-OUT ---
+# --- (This class includes the button-disabling fix, which is still good) ---
+class CheckOutWindow(tk.Toplevel):
+    def __init__(self, parent, executor):
+        super().__init__(parent)
+        self.parent_app = parent 
+        self.executor = executor
+        
+        self.title("Guest Check-Out")
+        self.geometry("800x400")
+        self.transient(parent)
+        self.grab_set()
+        
+        bookings_frame = ttk.LabelFrame(self, text="Select an Active Booking to Check-Out", padding=10)
+        bookings_frame.pack(fill="both", expand=True, padx=10, pady=10)
+        
+        cols = ("booking_id", "room_number", "guest_name", "check_in_date", "check_out_date")
+        # Keyset-paginated on (room_number, booking_id); only a window of bookings is loaded
+        self.bookings_list = VirtualList(bookings_frame, cols, loader=self._bookings_loader(), height=10)
+        self.bookings_list.pack(fill="both", expand=True)
+        self.bookings_tree = self.bookings_list.tree
+        for col in cols:
+            self.bookings_tree.heading(col, text=col.replace('_', ' ').title())
+            
+        self.bookings_tree.column("booking_id", width=50, anchor='center')
+        
+        # Save the button as a class variable so we can disable it
+        self.confirm_btn = ttk.Button(self, text="View Folio & Process Check-Out", command=self.process_check_out)
+        self.confirm_btn.pack(pady=10)
+        
+    def _bookings_loader(self):
+        def to_row(b):
+            return ((b['room_number'], b['booking_id']), (
+                b['booking_id'],
+                b['room_number'],
+                b['guest_name'],
+                b['check_in_date'],
+                b['check_out_date']
+            ), ())
+
+        return self.parent_app.keyset_loader(queries.fetch_active_bookings_page, to_row,
+                                             "Failed to fetch active bookings", widget=self)
+
+    def load_active_bookings(self):
+        self.bookings_list.reload()
+
+    def process_check_out(self):
+        selected_item = self.bookings_tree.focus()
+        if not selected_item:
+            messagebox.showwarning("Warning", "Please select a booking to check-out.", parent=self)
+            return
+            
+        booking_data = self.bookings_tree.item(selected_item)['values']
+        booking_id = booking_data[0]
+        guest_name = booking_data[2]
+        
+        # Fetch the folio in the background, then confirm and check out
+        self.confirm_btn.config(state="disabled")
+        self.parent_app._get_booking_folio(
+            booking_id,
+            lambda folio_details, total: self._confirm_check_out(booking_id, guest_name, folio_details, total),
+            widget=self,
+        )
+
+    def _confirm_check_out(self, booking_id, guest_name, folio_details, total):
+        self.confirm_btn.config(state="normal")
+        if folio_details is None:
+            messagebox.showerror("Error", f"Could not calculate folio for Booking {booking_id}.", parent=self)
+            return
+            
+        confirm_msg = f"--- FINAL FOLIO for {guest_name} ---\n\n"
+        confirm_msg += f"{folio_details}\n----------------\nGRAND TOTAL: ₹{total:.2f}"
+        confirm_msg += "\n\nProcess payment and check-out this guest?"
+        
+        if not messagebox.askyesno("Confirm Check-Out & Payment", confirm_msg, parent=self):
+            return
+            
+        # Disable button to prevent double-clicks
+        self.confirm_btn.config(state="disabled")
+        
+        def on_checked_out(result):
+            if self.parent_app.availability is not None:
+                self.parent_app.availability.drop_booking(booking_id)
+            messagebox.showinfo("Success", f"Guest {guest_name} has been checked out.", parent=self)
+            
+            self.parent_app.refresh_room_dashboard(force=True) 
+            self.destroy() # Window closes on success
+
+        def on_error(e):
+            messagebox.showerror("Transaction Failed", f"Could not complete check-out.\nError: {e}", parent=self)
+            
+            # Re-enable button ONLY if it failed
+            try:
+                self.confirm_btn.config(state="normal")
+            except tk.TclError:
+                pass # Ignore if window is already closing
+
+        self.executor.submit(
+            services.check_out, booking_id,
+            widget=self,
+            on_success=on_checked_out,
+            on_error=on_error,
+            on_loading=self.parent_app.loading("Checking out..."),
+        )
+
+
+
+# --- Toplevel Window for ALL ACTIVE FOLIOS (checkout rush) ---
+class ActiveFoliosWindow(tk.Toplevel):
+    def __init__(self, parent, executor):
+        super().__init__(parent)
+        self.parent_app = parent
+        self.executor = executor
+
+        self.title("Active Booking Folios")
+        self.geometry("750x400")
+        self.transient(parent)
+
+        folios_frame = ttk.LabelFrame(self, text="Folio Totals for All Active Bookings", padding=10)
+        folios_frame.pack(fill="both", expand=True, padx=10, pady=10)
+
+        cols = ("booking_id", "room_number", "guest_name", "room_charges", "restaurant_charges", "grand_total")
+        self.folios_tree = ttk.Treeview(folios_frame, columns=cols, show='headings', height=12)
+        for col in cols:
+            self.folios_tree.heading(col, text=col.replace('_', ' ').title())
+        self.folios_tree.column("booking_id", width=70, anchor='center')
+        for col in ("room_charges", "restaurant_charges", "grand_total"):
+            self.folios_tree.column(col, width=110, anchor='e')
+        self.folios_tree.pack(side='left', fill="both", expand=True)
+        folios_scroll = ttk.Scrollbar(folios_frame, orient="vertical", command=self.folios_tree.yview)
+        folios_scroll.pack(side='right', fill='y')
+        self.folios_tree.configure(yscrollcommand=folios_scroll.set)
+        self.folios_sync = TreeSync(self.folios_tree)
+
+        ttk.Button(self, text="Refresh", command=self.load_folios).pack(pady=(0, 10))
+        self.load_folios()
+
+    def load_folios(self):
+        # One query computes every active folio from the ledger
+        self.executor.submit(
+            queries.fetch_active_folios,
+            key=(self, "folios"),
+            widget=self,
+            on_success=self._render_folios,
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to fetch folios:\n{e}", parent=self),
+            on_loading=self.parent_app.loading("Loading folios..."),
+        )
+
+    def _render_folios(self, folios):
+        self.folios_sync.sync(
+            (f['booking_id'], (
+                f['booking_id'],
+                f['room_number'],
+                f['guest_name'],
+                f"₹{f['room_total']:.2f}",
+                f"₹{f['restaurant_total']:.2f}",
+                f"₹{f['grand_total']:.2f}"
+            ), ())
+            for f in folios
+        )
+
+
+# --- Toplevel Window for ORDER HISTORY ---
+class OrderHistoryWindow(tk.Toplevel):
+    def __init__(self, parent, executor):
+        super().__init__(parent)
+        self.parent_app = parent
+        self.executor = executor
+
+        self.title("Order History")
+        self.geometry("800x550")
+        self.transient(parent)
+
+        orders_frame = ttk.LabelFrame(self, text="Orders (newest first)", padding=10)
+        orders_frame.pack(fill="both", expand=True, padx=10, pady=10)
+
+        # Keyset-paginated on order_id, so memory stays constant however many orders exist
+        cols = ("order_id", "order_timestamp", "table_number", "room_number", "order_status", "order_total")
+        self.orders_list = VirtualList(orders_frame, cols, loader=self._orders_loader(), height=12)
+        self.orders_list.pack(fill="both", expand=True)
+        self.orders_tree = self.orders_list.tree
+        for col in cols:
+            self.orders_tree.heading(col, text=col.replace('_', ' ').title())
+        self.orders_tree.column("order_id", width=60, anchor='center')
+        self.orders_tree.column("order_total", width=90, anchor='e')
+        self.orders_tree.bind("<<TreeviewSelect>>", self.on_order_selected)
+
+        items_frame = ttk.LabelFrame(self, text="Order Items", padding=10)
+        items_frame.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+
+        item_cols = ("item_id", "name", "qty", "sub_total")
+        self.items_tree = ttk.Treeview(items_frame, columns=item_cols, show='headings', height=5)
+        for col in item_cols:
+            self.items_tree.heading(col, text=col.replace('_', ' ').title())
+        self.items_tree.column("item_id", width=50, anchor='center')
+        self.items_tree.column("qty", width=50, anchor='center')
+        self.items_tree.column("sub_total", width=80, anchor='e')
+        self.items_tree.pack(fill="both", expand=True)
+        self.items_sync = TreeSync(self.items_tree)
+
+    def _orders_loader(self):
+        def to_row(o):
+            timestamp = o['order_timestamp'].strftime('%Y-%m-%d %H:%M') if o['order_timestamp'] else ""
+            return (o['order_id'], (
+                o['order_id'],
+                timestamp,
+                o['table_number'] or "",
+                o['room_number'] or "",
+                o['order_status'],
+                f"₹{o['order_total']:.2f}"
+            ), ())
+
+        return self.parent_app.keyset_loader(queries.fetch_orders_page, to_row,
+                                             "Failed to fetch orders", widget=self)
+
+    def on_order_selected(self, event=None):
+        selected = self.orders_tree.focus()
+        if not selected:
+            return
+        order_id = self.orders_tree.item(selected)['values'][0]
+        self.executor.submit(
+            queries.fetch_order_items, order_id,
+            key=(self, "order_items"), # Clicking through orders cancels stale lookups
+            widget=self,
+            on_success=self._render_order_items,
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to fetch order items:\n{e}", parent=self),
+        )
+
+    def _render_order_items(self, items):
+        self.items_sync.sync(
+            (index, (item['item_id'], item['name'], item['quantity'], f"₹{item['sub_total']:.2f}"), ())
+            for index, item in enumerate(items)
+        )
+
+
+# --- Toplevel Window for DIAGNOSTICS ---
+class DiagnosticsWindow(tk.Toplevel):
+    REFRESH_MS = 2000
+
+    def __init__(self, parent, registry):
+        super().__init__(parent)
+        self.registry = registry
+
+        self.title("Diagnostics")
+        self.geometry("900x550")
+        self.transient(parent)
+
+        ops_frame = ttk.LabelFrame(self, text="Operations", padding=10)
+        ops_frame.pack(fill="both", expand=True, padx=10, pady=(10, 5))
+        cols = ("operation", "count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "rows", "slow")
+        self.ops_tree = ttk.Treeview(ops_frame, columns=cols, show='headings', height=8)
+        for col in cols:
+            self.ops_tree.heading(col, text=col.replace('_', ' ').title())
+            self.ops_tree.column(col, width=80, anchor='e')
+        self.ops_tree.column("operation", width=160, anchor='w')
+        self.ops_tree.pack(fill="both", expand=True)
+        self.ops_sync = TreeSync(self.ops_tree)
+
+        slow_frame = ttk.LabelFrame(self, text=f"Slow Queries (over {registry.slow_query_ms:g} ms)", padding=10)
+        slow_frame.pack(fill="both", expand=True, padx=10, pady=5)
+        slow_cols = ("at", "operation", "ms", "sql")
+        self.slow_tree = ttk.Treeview(slow_frame, columns=slow_cols, show='headings', height=6)
+        for col in slow_cols:
+            self.slow_tree.heading(col, text=col.upper() if col in ("ms", "sql") else col.title())
+        self.slow_tree.column("at", width=140)
+        self.slow_tree.column("operation", width=120)
+        self.slow_tree.column("ms", width=70, anchor='e')
+        self.slow_tree.column("sql", width=500)
+        self.slow_tree.pack(fill="both", expand=True)
+        self.slow_sync = TreeSync(self.slow_tree)
+
+        buttons = ttk.Frame(self)
+        buttons.pack(pady=(0, 10))
+        ttk.Button(buttons, text="Export Prometheus...", command=self.export_prometheus).pack(side='left', padx=5)
+        ttk.Button(buttons, text="Export JSON...", command=self.export_json).pack(side='left', padx=5)
+        ttk.Button(buttons, text="Reset", command=self.reset).pack(side='left', padx=5)
+
+        self.refresh()
+
+    def refresh(self):
+        # The one polling loop: only this re-arms itself
+        if not self.winfo_exists():
+            return
+        self._render()
+        self.after(self.REFRESH_MS, self.refresh)
+
+    def _render(self):
+        snap = self.registry.snapshot()
+
+        def ms(value):
+            return "" if value is None else (value if isinstance(value, str) else f"{value:.2f}")
+
+        self.ops_sync.sync(
+            (name, (name, h['count'], ms(h['mean_ms']), ms(h['p50_ms']), ms(h['p95_ms']), ms(h['p99_ms']),
+                    snap['rows'].get(name, 0), snap['slow_queries'].get(name, 0)), ())
+            for name, h in snap['operations'].items()
+        )
+        # Newest first; the log is bounded, so (timestamp, index) keys stay unique
+        slow = list(reversed(snap['slow_log']))
+        self.slow_sync.sync(
+            ((e['at'], len(slow) - i), (e['at'], e['operation'], e['ms'], e['sql']), ())
+            for i, e in enumerate(slow)
+        )
+
+    def _export(self, write, path):
+        try:
+            write(path)
+        except OSError as e:
+            messagebox.showerror("Export Failed", f"Could not write {path}:\n{e}", parent=self)
+
+    def export_prometheus(self):
+        path = filedialog.asksaveasfilename(parent=self, defaultextension=".prom",
+                                            filetypes=[("Prometheus text", "*.prom"), ("All files", "*.*")])
+        if path:
+            self._export(self.registry.write_prometheus, path)
+
+    def export_json(self):
+        path = filedialog.asksaveasfilename(parent=self, defaultextension=".json",
+                                            filetypes=[("JSON", "*.json"), ("All files", "*.*")])
+        if path:
+            self._export(self.registry.write_json, path)
+
+    def reset(self):
+        self.registry.reset()
+        self._render()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    app = App()
+    app.protocol("WM_DELETE_WINDOW", app.on_closing) # Handle window close
     app.mainloop()
\ No newline at end of file
@@ -0,0 +1,324 @@
+"""
+Hotel and restaurant operations, independent of any GUI.
+
+Each function takes a connection first (like queries.py), validates its
+input, runs the queries and returns plain data. Problems the caller can
+fix are raised as ServiceError subclasses with a message fit to show a
+user; the Tk windows and the HTTP API (api.py) both call these, so a
+check-in or an order behaves the same whichever one it came from.
+"""
+import csv
+import io
+from datetime import date
+from decimal import Decimal
+
+import guest_index
+import queries
+
+
+class ServiceError(Exception):
+    """Invalid request (bad dates, empty order, ...)."""
+
+
+class NotFound(ServiceError):
+    pass
+
+
+class Conflict(ServiceError):
+    pass
+
+
+def _parse_date(value, field):
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value))
+    except ValueError:
+        raise ServiceError(f"{field} must be a date in YYYY-MM-DD format.")
+
+
+def _parse_id(value, field):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ServiceError(f"{field} must be a number.")
+
+
+def _parse_text(value, field):
+    """`value` stripped, "" if missing; it must be a string (JSON can send anything)."""
+    if value is None:
+        return ""
+    if not isinstance(value, str):
+        raise ServiceError(f"{field} must be text.")
+    return value.strip()
+
+
+def parse_stay(check_in, check_out):
+    """Returns (check_in, check_out) as dates, or raises ServiceError."""
+    check_in = _parse_date(check_in, "Check-in")
+    check_out = _parse_date(check_out, "Check-out")
+    if check_in >= check_out:
+        raise ServiceError("Check-out date must be after check-in date.")
+    return check_in, check_out
+
+
+# --- HOTEL (REST) ---
+
+def available_rooms(conn, check_in, check_out):
+    check_in, check_out = parse_stay(check_in, check_out)
+    return queries.fetch_free_rooms(conn, check_in, check_out)
+
+
+def search_guests(conn, text, limit=20):
+    """Guests whose name, email or phone start with the words of `text`."""
+    return queries.search_guests(conn, guest_index.search_terms(text), limit)
+
+
+def check_in(conn, first_name, last_name, email, phone, room_id, check_in, check_out, guest_id=None):
+    """
+    Checks a guest in (or reserves the room, for a future check-in date).
+    `guest_id` books a returning guest found with search_guests().
+    """
+    first_name, last_name = _parse_text(first_name, "First name"), _parse_text(last_name, "Last name")
+    if not (first_name and last_name):
+        raise ServiceError("First and last name are required.")
+    email, phone = _parse_text(email, "Email"), _parse_text(phone, "Phone")
+    check_in, check_out = parse_stay(check_in, check_out)
+    room_id = _parse_id(room_id, "Room")
+    if guest_id:
+        guest_id = _parse_id(guest_id, "Guest")
+        if queries.fetch_guest(conn, guest_id) is None:
+            raise NotFound(f"Guest {guest_id} does not exist.")
+    else:
+        guest_id = None
+
+    # The price is read from the database, not trusted from the caller
+    rooms = queries.fetch_rooms_by_id(conn, [room_id])
+    if not rooms:
+        raise NotFound(f"Room {room_id} does not exist.")
+    room = rooms[0]
+    total_room_cost = room['price_per_night'] * (check_out - check_in).days
+
+    try:
+        booking_id = queries.check_in_guest(
+            conn, first_name, last_name, email or None, phone or None, room_id,
+            check_in.isoformat(), check_out.isoformat(), total_room_cost, guest_id
+        )
+    except queries.BookingConflict as e:
+        raise Conflict(str(e))
+    return {
+        "booking_id": booking_id,
+        "room_id": room_id,
+        "room_number": room['room_number'],
+        "check_in_date": check_in,
+        "check_out_date": check_out,
+        "total_room_cost": total_room_cost,
+        "reservation": check_in > date.today(),
+    }
+
+
+# --- Group check-in ---
+
+ROSTER_FIELDS = ("first_name", "last_name", "email", "phone", "room_type")
+MAX_GROUP_SIZE = 500
+
+
+def parse_roster(text):
+    """
+    Reads a group roster: CSV lines of first_name, last_name[, email,
+    phone, room_type], optionally under a header row naming those columns
+    (in any order). Blank lines and lines starting with # are skipped.
+    Returns a list of guest dicts.
+    """
+    lines = [line for line in io.StringIO(text or "") if line.strip() and not line.lstrip().startswith("#")]
+    rows = list(csv.reader(lines))
+    fields = ROSTER_FIELDS
+    if rows and "first_name" in [c.strip().lower() for c in rows[0]]:
+        fields = [c.strip().lower() for c in rows.pop(0)]
+
+    roster = []
+    for number, row in enumerate(rows, 1):
+        guest = {field: (value.strip() or None) for field, value in zip(fields, row) if field in ROSTER_FIELDS}
+        if not (guest.get("first_name") and guest.get("last_name")):
+            raise ServiceError(f"Roster line {number}: first and last name are required.")
+        roster.append(guest)
+    return roster
+
+
+def assign_rooms(roster, free_rooms):
+    """
+    Gives every roster guest without a room_id one of `free_rooms` (rows
+    with room_id, room_type), matching the requested room_type when there
+    is one. Returns new guest dicts; raises Conflict if the rooms run out.
+    """
+    taken = {guest['room_id'] for guest in roster if guest.get('room_id')}
+    pool = [room for room in free_rooms if room['room_id'] not in taken]
+    assigned = []
+    for guest in roster:
+        guest = dict(guest)
+        if not guest.get('room_id'):
+            wanted = (guest.get('room_type') or "").lower()
+            room = next((r for r in pool if not wanted or r['room_type'].lower() == wanted), None)
+            if room is None:
+                kind = f"{guest['room_type']} " if wanted else ""
+                raise Conflict(f"Not enough free {kind}rooms for {guest['first_name']} {guest['last_name']}.")
+            pool.remove(room)
+            guest['room_id'] = room['room_id']
+        assigned.append(guest)
+    return assigned
+
+
+def group_check_in(conn, roster, check_in, check_out):
+    """
+    Checks a group in (or reserves its rooms) for the same dates in one
+    transaction. Guests without a room_id are given free rooms. Returns a
+    booking dict (as check_in() does) per guest, in roster order.
+    """
+    if not roster:
+        raise ServiceError("The roster is empty.")
+    if not isinstance(roster, list) or not all(isinstance(guest, dict) for guest in roster):
+        raise ServiceError("The roster must be a list of guests.")
+    if len(roster) > MAX_GROUP_SIZE:
+        raise ServiceError(f"A group can have at most {MAX_GROUP_SIZE} guests.")
+    check_in, check_out = parse_stay(check_in, check_out)
+    roster = [dict(guest) for guest in roster]
+    for guest in roster:
+        for field in ROSTER_FIELDS:
+            guest[field] = _parse_text(guest.get(field), field.replace("_", " ").capitalize()) or None
+        if not (guest['first_name'] and guest['last_name']):
+            raise ServiceError("First and last name are required for every guest.")
+        if guest.get('room_id'):
+            guest['room_id'] = _parse_id(guest['room_id'], "Room")
+        if guest.get('guest_id'):
+            guest['guest_id'] = _parse_id(guest['guest_id'], "Guest")
+    if not all(guest.get('room_id') for guest in roster):
+        roster = assign_rooms(roster, queries.fetch_free_rooms(conn, check_in, check_out))
+
+    rooms = {room['room_id']: room for room in queries.fetch_rooms_by_id(conn, {g['room_id'] for g in roster})}
+    nights = (check_out - check_in).days
+    stays = []
+    for guest in roster:
+        room = rooms.get(guest['room_id'])
+        if room is None:
+            raise NotFound(f"Room {guest['room_id']} does not exist.")
+        stays.append({
+            "first_name": guest['first_name'], "last_name": guest['last_name'],
+            "email": guest['email'], "phone": guest['phone'],
+            "room_id": room['room_id'], "total_room_cost": room['price_per_night'] * nights,
+            "guest_id": guest.get('guest_id') or None,
+        })
+
+    try:
+        booking_ids = queries.group_check_in(conn, stays, check_in.isoformat(), check_out.isoformat())
+    except queries.BookingConflict as e:
+        raise Conflict(str(e))
+    return [{
+        "booking_id": booking_id,
+        "guest_name": f"{stay['first_name']} {stay['last_name']}",
+        "room_id": stay['room_id'],
+        "room_number": rooms[stay['room_id']]['room_number'],
+        "check_in_date": check_in,
+        "check_out_date": check_out,
+        "total_room_cost": stay['total_room_cost'],
+        "reservation": check_in > date.today(),
+    } for booking_id, stay in zip(booking_ids, stays)]
+
+
+def booking_folio(conn, booking_id):
+    booking_id = _parse_id(booking_id, "Booking ID")
+    details, total = queries.fetch_booking_folio(conn, booking_id)
+    if details is None:
+        raise NotFound(f"Booking ID {booking_id} not found.")
+    return {"booking_id": booking_id, "details": details, "grand_total": total}
+
+
+def check_out(conn, booking_id):
+    """Checks a booking out and returns its final folio."""
+    folio = booking_folio(conn, booking_id)
+    try:
+        queries.check_out_booking(conn, folio['booking_id'])
+    except queries.BookingConflict as e:
+        raise Conflict(str(e))
+    return folio
+
+
+def find_booking(conn, room_number):
+    """The booking_id of the stay currently in `room_number`."""
+    room_number = str(room_number or "").strip()
+    booking_id = queries.find_active_booking_id(conn, room_number)
+    if not booking_id:
+        raise NotFound(f"Could not find an active booking for Room {room_number}.")
+    return booking_id
+
+
+# --- RESTAURANT (RELISH) ---
+
+def price_items(conn, lines):
+    """
+    Turns [{"item_id", "quantity"}] into create_order() items priced from
+    menu_items. Returns (items, total).
+    """
+    if lines is None:
+        lines = []
+    if not isinstance(lines, list) or not all(isinstance(line, dict) for line in lines):
+        raise ServiceError("items must be a list of objects.")
+    quantities = {}
+    for line in lines:
+        item_id = _parse_id(line.get("item_id"), "item_id")
+        quantity = _parse_id(line.get("quantity", 1), "quantity")
+        if quantity <= 0:
+            raise ServiceError("Quantities must be positive.")
+        quantities[item_id] = quantities.get(item_id, 0) + quantity
+    if not quantities:
+        raise ServiceError("Cannot process an empty order.")
+
+    prices = queries.fetch_menu_prices(conn, quantities)
+    missing = [str(i) for i in quantities if i not in prices]
+    if missing:
+        raise NotFound(f"Unknown menu item(s): {', '.join(missing)}.")
+    items = [
+        {"item_id": item_id, "quantity": quantity, "sub_total": prices[item_id] * quantity}
+        for item_id, quantity in quantities.items()
+    ]
+    return items, sum((item['sub_total'] for item in items), Decimal("0.00"))
+
+
+def place_order(conn, table_id, items, room_number=None):
+    """
+    Records a table's order as paid, or charged to the stay in `room_number`.
+    `items` are [{"item_id", "quantity", "sub_total"}] as priced by
+    price_items() (or an OrderCart). Raises Conflict while the table has an
+    open tab: that is paid through the journal, under the tab's ref.
+    """
+    table_id = _parse_id(table_id, "Table")
+    if not items:
+        raise ServiceError("Cannot process an empty order.")
+    total = sum((item['sub_total'] for item in items), Decimal("0.00"))
+    booking_id = find_booking(conn, room_number) if room_number else None
+    status = 'charged_to_room' if booking_id else 'paid'
+    try:
+        order_id = queries.create_order(conn, table_id, booking_id, status, total, items)
+    except queries.TableConflict as e:
+        raise Conflict(str(e))
+    return {"order_id": order_id, "table_id": table_id, "booking_id": booking_id,
+            "order_status": status, "order_total": total}
+
+
+def journal_order(journal, table_id, items, booking_id=None, ref=None):
+    """
+    Like place_order(), but only appends the order to a journal.PaymentJournal
+    (charged to `booking_id`, if given); the journal's flusher writes it to
+    the database. Needs no connection, so the till keeps working while the
+    database is down. `ref` pays the open tab with that ref. Returns the
+    journal ref.
+    """
+    table_id = _parse_id(table_id, "Table")
+    if not items:
+        raise ServiceError("Cannot process an empty order.")
+    if booking_id is not None:
+        booking_id = _parse_id(booking_id, "Booking ID")
+    status = 'charged_to_room' if booking_id else 'paid'
+    try:
+        return journal.record_order(table_id, booking_id, status, items, ref)
+    except OSError as e:
+        raise ServiceError(f"Could not write the payment journal: {e}")
@@ -0,0 +1,88 @@
+import unittest
+from datetime import date, timedelta
+
+from availability import AvailabilityIndex
+
+START = date(2026, 3, 1)
+
+
+def day(n):
+    return START + timedelta(days=n)
+
+
+class AvailabilityIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = AvailabilityIndex(START)
+        self.index.set_booking(1, 10, day(2), day(5))  # nights 2, 3 and 4
+
+    def test_overlapping_stay_is_not_free(self):
+        self.assertFalse(self.index.is_free(10, day(4), day(6)))
+        self.assertFalse(self.index.is_free(10, day(0), day(3)))
+        self.assertFalse(self.index.is_free(10, day(3), day(4)))
+
+    def test_check_out_day_is_free_for_the_next_guest(self):
+        self.assertTrue(self.index.is_free(10, day(5), day(7)))
+        self.assertTrue(self.index.is_free(10, day(0), day(2)))
+
+    def test_other_rooms_are_free(self):
+        self.assertTrue(self.index.is_free(11, day(2), day(5)))
+
+    def test_empty_or_past_stay_is_free(self):
+        self.assertTrue(self.index.is_free(10, day(3), day(3)))
+        self.assertTrue(self.index.is_free(10, day(-5), day(-1)))
+
+    def test_stay_starting_in_the_past_only_counts_from_start(self):
+        self.index.set_booking(2, 11, day(-3), day(1))
+        self.assertFalse(self.index.is_free(11, day(0), day(1)))
+        self.assertTrue(self.index.is_free(11, day(1), day(4)))
+
+    def test_dates_may_be_strings(self):
+        self.index.set_booking(2, 11, "2026-03-10", "2026-03-12")
+        self.assertFalse(self.index.is_free(11, "2026-03-11", "2026-03-13"))
+
+    def test_moving_a_booking_frees_its_old_nights(self):
+        self.index.set_booking(1, 10, day(8), day(9))
+        self.assertTrue(self.index.is_free(10, day(2), day(5)))
+        self.assertFalse(self.index.is_free(10, day(8), day(9)))
+
+    def test_moving_a_booking_to_another_room(self):
+        self.index.set_booking(1, 11, day(2), day(5))
+        self.assertTrue(self.index.is_free(10, day(2), day(5)))
+        self.assertFalse(self.index.is_free(11, day(2), day(5)))
+
+    def test_drop_keeps_other_bookings_of_the_room(self):
+        self.index.set_booking(2, 10, day(4), day(6))  # overlaps booking 1 on night 4
+        self.index.drop_booking(1)
+        self.assertTrue(self.index.is_free(10, day(2), day(4)))
+        self.assertFalse(self.index.is_free(10, day(4), day(5)))
+        self.index.drop_booking(2)
+        self.assertTrue(self.index.is_free(10, day(0), day(10)))
+
+    def test_drop_unknown_booking_is_ignored(self):
+        self.index.drop_booking(99)
+        self.assertFalse(self.index.is_free(10, day(2), day(5)))
+
+    def test_apply_sets_and_drops(self):
+        self.index.apply([
+            (1, 10, day(2), day(5), 0),
+            (2, 12, day(1), day(3), 1),
+        ])
+        self.assertTrue(self.index.is_free(10, day(2), day(5)))
+        self.assertFalse(self.index.is_free(12, day(2), day(3)))
+
+    def test_free_rooms(self):
+        rooms = [{"room_id": 10}, {"room_id": 11}]
+        self.assertEqual(self.index.free_rooms(rooms, day(1), day(3)), [{"room_id": 11}])
+        self.assertEqual(self.index.free_rooms(rooms, day(5), day(6)), rooms)
+
+    def test_occupancy(self):
+        self.index.set_booking(2, 11, day(4), day(6))
+        self.assertEqual(self.index.occupancy(day(1)), 0)
+        self.assertEqual(self.index.occupancy(day(2)), 1)
+        self.assertEqual(self.index.occupancy(day(4)), 2)
+        self.assertEqual(self.index.occupancy(day(5)), 1)
+        self.assertEqual(self.index.occupancy(day(-1)), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
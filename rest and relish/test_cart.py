@@ -0,0 +1,52 @@
+import unittest
+from decimal import Decimal
+
+from cart import OrderCart
+
+
+class OrderCartTest(unittest.TestCase):
+    def setUp(self):
+        self.cart = OrderCart()
+        self.cart.add(1, "Dosa", "120.00")
+        self.cart.add(2, "Chai", Decimal("30.50"), quantity=2)
+
+    def test_total_follows_the_lines(self):
+        self.assertEqual(self.cart.total, Decimal("181.00"))
+        self.cart.add(1, "Dosa", "120.00")
+        self.assertEqual(self.cart.get(1).quantity, 2)
+        self.assertEqual(self.cart.total, Decimal("301.00"))
+        self.assertEqual(len(self.cart), 2)
+
+    def test_remove_part_of_a_line(self):
+        line = self.cart.remove(2)
+        self.assertEqual(line.quantity, 1)
+        self.assertEqual(self.cart.total, Decimal("150.50"))
+
+    def test_remove_whole_line(self):
+        line = self.cart.remove(2, quantity=None)
+        self.assertEqual(line.quantity, 0)
+        self.assertIsNone(self.cart.get(2))
+        self.assertEqual(self.cart.total, Decimal("120.00"))
+        self.assertEqual(self.cart.remove(1, quantity=5).quantity, 0)
+        self.assertEqual(self.cart.total, Decimal("0.00"))
+        self.assertEqual(len(self.cart), 0)
+
+    def test_remove_missing_item(self):
+        self.assertIsNone(self.cart.remove(3))
+        self.assertEqual(self.cart.total, Decimal("181.00"))
+
+    def test_items_keep_the_order_lines_were_added(self):
+        self.cart.add(1, "Dosa", "120.00")
+        self.assertEqual(self.cart.items(), [
+            {"item_id": 1, "quantity": 2, "sub_total": Decimal("240.00")},
+            {"item_id": 2, "quantity": 2, "sub_total": Decimal("61.00")},
+        ])
+
+    def test_clear(self):
+        self.cart.clear()
+        self.assertEqual(self.cart.items(), [])
+        self.assertEqual(self.cart.total, Decimal("0.00"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+from unittest import mock
+
+import changefeed
+from changefeed import ChangeFeed
+
+
+def changes(*seqs):
+    return [{"seq": seq, "entity": "room", "entity_id": seq} for seq in seqs]
+
+
+def seqs(batch):
+    return [c["seq"] for c in batch]
+
+
+class ChangeFeedTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(changefeed.time, "monotonic", return_value=1000.0)
+        self.clock = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.feed = ChangeFeed()
+
+    def test_contiguous_batch_advances_the_watermark(self):
+        self.assertEqual(seqs(self.feed.advance(changes(1, 2, 3))), [1, 2, 3])
+        self.assertEqual(self.feed.since, 3)
+
+    def test_already_applied_changes_are_not_returned_again(self):
+        self.feed.advance(changes(1, 2))
+        self.assertEqual(seqs(self.feed.advance(changes(1, 2, 3))), [3])
+        self.assertEqual(self.feed.since, 3)
+
+    def test_gap_holds_the_watermark(self):
+        self.assertEqual(seqs(self.feed.advance(changes(1, 3, 4))), [1, 3, 4])
+        self.assertEqual(self.feed.since, 1)
+        # The next poll (since=1) sees 3 and 4 again, but they aren't re-applied
+        self.assertEqual(seqs(self.feed.advance(changes(3, 4))), [])
+        self.assertEqual(self.feed.since, 1)
+
+    def test_late_commit_fills_the_gap(self):
+        self.feed.advance(changes(1, 3, 4))
+        self.assertEqual(seqs(self.feed.advance(changes(2, 3, 4))), [2])
+        self.assertEqual(self.feed.since, 4)
+
+    def test_gap_is_given_up_after_the_timeout(self):
+        self.feed.advance(changes(1, 3))
+        self.clock.return_value += changefeed.GAP_TIMEOUT
+        self.feed.advance(changes(3))
+        self.assertEqual(self.feed.since, 1)
+        self.clock.return_value += 1
+        self.assertEqual(seqs(self.feed.advance(changes(3, 4))), [4])
+        self.assertEqual(self.feed.since, 4)
+
+    def test_each_gap_has_its_own_timeout(self):
+        self.feed.advance(changes(2))
+        self.clock.return_value += changefeed.GAP_TIMEOUT + 1
+        self.feed.advance(changes(4))  # seq 1 given up; seq 3 first noticed now
+        self.assertEqual(self.feed.since, 2)
+        self.clock.return_value += changefeed.GAP_TIMEOUT
+        self.feed.advance([])
+        self.assertEqual(self.feed.since, 2)
+        self.clock.return_value += 1
+        self.feed.advance([])
+        self.assertEqual(self.feed.since, 4)
+
+    def test_starting_watermark(self):
+        feed = ChangeFeed(since=10)
+        self.assertEqual(seqs(feed.advance(changes(9, 10, 11))), [11])
+        self.assertEqual(feed.since, 11)
+
+
+if __name__ == "__main__":
+    unittest.main()
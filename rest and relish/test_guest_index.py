@@ -0,0 +1,66 @@
+import unittest
+
+from guest_index import GuestIndex, normalize
+
+GUESTS = [
+    (1, "Ann", "Smith", "ann@example.com", "+91 98450 12345"),
+    (2, "Annie", "Smythe", None, None),
+    (3, "Bob", "Annand", "bob@example.com", "080-2222"),
+    (4, "Mary Ann", "Jones", None, None),
+]
+
+
+def ids(results):
+    return [g["guest_id"] for g in results]
+
+
+class GuestIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = GuestIndex()
+        self.index.apply(GUESTS, bulk=True)
+
+    def test_prefix_matches_any_word_sorted_by_name(self):
+        self.assertEqual(ids(self.index.search("ann")), [3, 4, 1, 2])
+
+    def test_every_word_must_match(self):
+        self.assertEqual(ids(self.index.search("ann sm")), [1, 2])
+        self.assertEqual(ids(self.index.search("sm ann")), [1, 2])
+        self.assertEqual(ids(self.index.search("ann smi")), [1])
+        self.assertEqual(ids(self.index.search("ann zz")), [])
+
+    def test_email_and_phone(self):
+        self.assertEqual(ids(self.index.search("BOB@")), [3])
+        self.assertEqual(ids(self.index.search("+91-98450")), [1])
+        self.assertEqual(ids(self.index.search("(080)-22")), [3])
+
+    def test_limit(self):
+        self.assertEqual(len(self.index.search("ann", limit=2)), 2)
+
+    def test_blank_search(self):
+        self.assertEqual(self.index.search("  "), [])
+        self.assertEqual(self.index.search(None), [])
+
+    def test_update_and_remove(self):
+        self.index.add(2, "Annie", "Baker", None, None)
+        self.assertEqual(ids(self.index.search("smy")), [])
+        self.assertEqual(ids(self.index.search("bak")), [2])
+        self.index.remove(1)
+        self.assertEqual(ids(self.index.search("smi")), [])
+        self.assertIsNone(self.index.get(1))
+        self.assertEqual(len(self.index), 3)
+
+    def test_incremental_add_is_searchable(self):
+        index = GuestIndex()
+        index.add(5, "Zed", "Quinn", None, None)
+        index.add(6, "Zara", "Quill", None, None)
+        self.assertEqual(ids(index.search("qui")), [6, 5])
+        self.assertEqual(index.get(5)["last_name"], "Quinn")
+
+    def test_normalize(self):
+        self.assertEqual(normalize(" Ann "), "ann")
+        self.assertEqual(normalize("+91 (984) 50-12"), "919845012")
+        self.assertEqual(normalize("a.b@x.com"), "a.b@x.com")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import os
+import shutil
+import tempfile
+import unittest
+from decimal import Decimal
+from unittest import mock
+
+import db
+import journal
+import queries
+from journal import PaymentJournal
+
+
+class PaymentJournalTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.path = os.path.join(self.dir, "payments.journal")
+        self.pool = db.create_pool(db.SQLiteBackend(os.path.join(self.dir, "rest_relish.db")), size=1)
+        self.addCleanup(self.pool.close)
+        self.conn = self.pool.get_connection()
+        self.addCleanup(self.conn.close)
+        cursor = self.conn.cursor()
+        cursor.execute("INSERT INTO tables (table_number, capacity) VALUES ('T1', 4)")
+        self.table_id = cursor.lastrowid
+        cursor.execute("INSERT INTO menu_items (name, price, category) VALUES ('Dosa', 120.00, 'Mains')")
+        self.item_id = cursor.lastrowid
+        cursor.close()
+        self.journal = self.open_journal()
+
+    def open_journal(self):
+        j = PaymentJournal(self.path)
+        self.addCleanup(j.close)
+        return j
+
+    def record(self, j=None, item_id=None, quantity=2):
+        items = [{"item_id": item_id or self.item_id, "quantity": quantity, "sub_total": Decimal("120.00") * quantity}]
+        return (j or self.journal).record_order(self.table_id, None, "paid", items)
+
+    def orders(self):
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT order_id, journal_ref, order_total FROM orders ORDER BY order_id")
+        rows = cursor.fetchall()
+        cursor.close()
+        return rows
+
+    def test_flush_writes_pending_orders(self):
+        refs = [self.record(), self.record(quantity=1)]
+        written, failed = self.journal.flush(self.conn)
+        self.assertEqual(set(written), set(refs))
+        self.assertEqual(failed, [])
+        self.assertEqual(self.journal.pending_count(), 0)
+        self.assertEqual([row[1] for row in self.orders()], refs)
+        self.assertEqual(self.open_journal().pending_count(), 0)
+
+    def test_pending_orders_survive_a_restart(self):
+        ref = self.record()
+        self.journal.close()
+        reopened = self.open_journal()
+        self.assertEqual(reopened.pending_count(), 1)
+        self.assertEqual(list(reopened.flush(self.conn)[0]), [ref])
+
+    def test_replay_after_a_lost_done_line_does_not_write_twice(self):
+        ref = self.record()
+        # Written to the database, but the terminal died before journaling "done"
+        order_id = queries.replay_orders(self.conn, [journal._as_order(self.journal._pending[ref])])[ref]
+        self.journal.close()
+        reopened = self.open_journal()
+        self.assertEqual(reopened.flush(self.conn)[0], {ref: order_id})
+        self.assertEqual(len(self.orders()), 1)
+
+    def test_torn_last_line_is_dropped(self):
+        ref = self.record()
+        self.journal.close()
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write('{"type":"order","ref":"torn')
+        reopened = self.open_journal()
+        self.assertEqual(reopened.pending_count(), 1)
+        second = self.record(reopened)
+        reopened.close()
+        again = self.open_journal()
+        self.assertEqual(again.pending_count(), 2)
+        self.assertEqual(set(again.flush(self.conn)[0]), {ref, second})
+
+    def test_rejected_order_is_failed_and_the_rest_written(self):
+        good = self.record()
+        bad = self.record(item_id=9999)  # no such menu item
+        written, failed = self.journal.flush(self.conn)
+        self.assertEqual(list(written), [good])
+        self.assertEqual([ref for ref, error in failed], [bad])
+        self.assertEqual(self.journal.pending_count(), 0)
+        self.assertEqual([record["ref"] for record, error in self.journal.failed()], [bad])
+        reopened = self.open_journal()
+        self.assertEqual(reopened.pending_count(), 0)
+        self.assertEqual([record["ref"] for record, error in reopened.failed()], [bad])
+
+    def test_contention_keeps_orders_pending(self):
+        ref = self.record()
+        locked = db.Error("database is locked")
+        with mock.patch.object(queries, "replay_orders", side_effect=locked):
+            with self.assertRaises(db.Error):
+                self.journal.flush(self.conn)
+        self.assertEqual(self.journal.pending_count(), 1)
+        self.assertEqual(self.journal.failed(), [])
+        self.assertEqual(list(self.journal.flush(self.conn)[0]), [ref])
+
+    def test_contention_while_finding_a_bad_order_keeps_it_pending(self):
+        self.record()
+        self.record()
+        errors = [db.Error("FOREIGN KEY constraint failed"), db.Error("database is locked")]
+        with mock.patch.object(queries, "replay_orders", side_effect=errors):
+            with self.assertRaises(db.Error):
+                self.journal.flush(self.conn)
+        self.assertEqual(self.journal.pending_count(), 2)
+        self.assertEqual(self.journal.failed(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
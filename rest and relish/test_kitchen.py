@@ -0,0 +1,37 @@
+import unittest
+
+import kitchen
+
+
+def tickets(n, start=0):
+    return [kitchen.ticket("T1", "ref", i, "Dosa", 1) for i in range(start, start + n)]
+
+
+class TicketQueueTest(unittest.TestCase):
+    def setUp(self):
+        # Not started: the test plays the sender thread
+        self.tickets = kitchen.TicketQueue("127.0.0.1:9", max_queued=3)
+
+    def test_take_drains_the_queue_into_the_batch(self):
+        for t in tickets(2):
+            self.tickets._queue.put(t)
+        batch = self.tickets._take([])
+        self.assertEqual([t["item_id"] for t in batch], [0, 1])
+        self.assertTrue(self.tickets._queue.empty())
+
+    def test_batch_held_while_the_display_is_down_stays_bounded(self):
+        batch = self.tickets._take(tickets(2))
+        for t in tickets(4, start=2):
+            self.tickets._queue.put(t)
+        batch = self.tickets._take(batch)
+        self.assertEqual([t["item_id"] for t in batch], [3, 4, 5])
+        self.assertEqual(self.tickets.dropped, 3)
+
+    def test_close_sentinel_is_not_sent(self):
+        held = tickets(1)
+        self.tickets._queue.put(None)
+        self.assertEqual(self.tickets._take(list(held)), held)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+
+from menu_index import PINNED, MenuIndex
+
+ITEMS = [
+    {"item_id": 1, "name": "Masala Dosa", "category": "Mains", "price": "120.00"},
+    {"item_id": 2, "name": "Plain Dosa", "category": "Mains", "price": "90.00"},
+    {"item_id": 3, "name": "Masala Chai", "category": "Drinks", "price": "30.00"},
+    {"item_id": 4, "name": "Lime Soda", "category": "Drinks", "price": "40.00"},
+    {"item_id": 5, "name": "Papad", "category": None, "price": "20.00"},
+]
+
+
+def ids(rows):
+    return [row["item_id"] for row in rows]
+
+
+class MenuIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = MenuIndex(ITEMS)
+
+    def test_no_filter_lists_the_menu_by_category_then_name(self):
+        pinned, rest = self.index.search()
+        self.assertEqual(pinned, [])
+        self.assertEqual(ids(rest), [5, 4, 3, 1, 2])
+
+    def test_every_word_is_a_prefix(self):
+        self.assertEqual(ids(self.index.search("mas")[1]), [3, 1])
+        self.assertEqual(ids(self.index.search("mas do")[1]), [1])
+        self.assertEqual(ids(self.index.search("DRI")[1]), [4, 3])
+        self.assertEqual(self.index.search("masala pizza"), ([], []))
+
+    def test_category(self):
+        self.assertEqual(ids(self.index.search(category="Drinks")[1]), [4, 3])
+        self.assertEqual(ids(self.index.search("masala", category="Mains")[1]), [1])
+        self.assertEqual(self.index.search(category="Desserts"), ([], []))
+        self.assertEqual(self.index.categories(), ["Drinks", "Mains"])
+
+    def test_most_ordered_matches_are_pinned(self):
+        index = MenuIndex(ITEMS, popularity={2: 10, 3: 4})
+        pinned, rest = index.search("dosa")
+        self.assertEqual(ids(pinned), [2])
+        self.assertEqual(ids(rest), [1])
+        index.record_order([{"item_id": 1, "quantity": 11}])
+        pinned, rest = index.search("dosa")
+        self.assertEqual(ids(pinned), [1, 2])
+        self.assertEqual(rest, [])
+
+    def test_at_most_pinned_items(self):
+        index = MenuIndex(ITEMS, popularity={i: i for i in range(1, 6)})
+        pinned, rest = index.search()
+        self.assertEqual(len(pinned), min(PINNED, len(ITEMS)))
+        self.assertEqual(ids(pinned), [5, 4, 3, 2, 1][:PINNED])
+
+
+if __name__ == "__main__":
+    unittest.main()
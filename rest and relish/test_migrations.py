@@ -0,0 +1,59 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import db
+import migrations
+
+
+class SQLiteUpgradeTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.path = os.path.join(self.dir, "rest_relish.db")
+
+    def open(self):
+        pool = db.create_pool(db.SQLiteBackend(self.path), size=1)
+        pool.close()
+
+    def raw(self):
+        conn = sqlite3.connect(self.path)
+        self.addCleanup(conn.close)
+        return conn
+
+    def test_fresh_database_gets_every_migration(self):
+        self.open()
+        versions = {row[0] for row in self.raw().execute("SELECT version FROM schema_migrations")}
+        self.assertEqual(versions, {version for version, _, _ in migrations.MIGRATIONS})
+
+    def test_database_from_before_the_payment_journal_upgrades(self):
+        self.open()
+        # Back to the schema of a release before migration 6 (orders.journal_ref)
+        conn = self.raw()
+        conn.executescript("""
+            DROP INDEX orders_journal_ref;
+            DROP INDEX orders_table_status;
+            ALTER TABLE orders DROP COLUMN journal_ref;
+            DROP TABLE revenue_rollups;
+            DELETE FROM schema_migrations WHERE version >= 6;
+            INSERT INTO tables (table_number, capacity) VALUES ('T1', 4);
+            INSERT INTO orders (table_id, order_status, order_total) VALUES (1, 'paid', 50.00);
+        """)
+        conn.close()
+
+        self.open()
+        conn = self.raw()
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(orders)")]
+        self.assertIn("journal_ref", columns)
+        unique = {row[1]: row[2] for row in conn.execute("PRAGMA index_list(orders)")}
+        self.assertEqual(unique.get("orders_journal_ref"), 1)
+        self.assertIn("orders_table_status", unique)
+        self.assertEqual(conn.execute("SELECT MAX(version) FROM schema_migrations").fetchone()[0],
+                         migrations.MIGRATIONS[-1][0])
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import shutil
+import tempfile
+import unittest
+from decimal import Decimal
+
+import db
+import queries
+from open_tabs import OpenTabs
+
+
+class OpenTabsTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.pool = db.create_pool(db.SQLiteBackend(os.path.join(self.dir, "rest_relish.db")), size=1)
+        self.addCleanup(self.pool.close)
+        self.conn = self.pool.get_connection()
+        self.addCleanup(self.conn.close)
+        cursor = self.conn.cursor()
+        cursor.execute("INSERT INTO tables (table_number, capacity) VALUES ('T1', 4)")
+        self.table_id = cursor.lastrowid
+        cursor.execute("INSERT INTO menu_items (name, price, category) VALUES ('Dosa', 120.00, 'Mains')")
+        self.dosa = cursor.lastrowid
+        cursor.execute("INSERT INTO menu_items (name, price, category) VALUES ('Chai', 30.00, 'Drinks')")
+        self.chai = cursor.lastrowid
+        cursor.close()
+
+    def take(self, tabs, item_id, name, price, quantity=1):
+        tab = tabs.get(self.table_id)
+        line = tab.cart.add(item_id, name, Decimal(price), quantity)
+        tabs.set_line(tab, line)
+        return tab
+
+    def open_orders(self):
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT journal_ref, order_total FROM orders WHERE order_status = 'open'")
+        rows = cursor.fetchall()
+        cursor.close()
+        return rows
+
+    def lines(self, tab):
+        return {line.item_id: line.quantity for line in tab.cart}
+
+    def test_tab_is_saved_and_read_back(self):
+        tabs = OpenTabs()
+        tab = self.take(tabs, self.dosa, "Dosa", "120.00", 2)
+        saved, elsewhere = tabs.flush(self.conn)
+        self.assertEqual(list(saved), [tab.ref])
+        self.assertEqual(elsewhere, {})
+        ref, lines = queries.fetch_open_order(self.conn, self.table_id)
+        self.assertEqual(ref, tab.ref)
+        self.assertEqual([(item_id, quantity) for item_id, name, quantity, sub_total in lines], [(self.dosa, 2)])
+
+    def test_second_terminal_adopts_the_table_tab(self):
+        first, second = OpenTabs(), OpenTabs()
+        mine = self.take(first, self.dosa, "Dosa", "120.00", 2)
+        self.take(second, self.dosa, "Dosa", "120.00")
+        self.take(second, self.chai, "Chai", "30.00")
+        first.flush(self.conn)
+
+        saved, elsewhere = second.flush(self.conn)
+        self.assertEqual(saved, {})
+        self.assertEqual(list(elsewhere), [self.table_id])
+        self.assertEqual(elsewhere[self.table_id][0], mine.ref)
+        self.assertEqual(len(self.open_orders()), 1)
+
+        adopted = second.adopt(self.table_id, *elsewhere[self.table_id])
+        self.assertEqual(adopted.ref, mine.ref)
+        self.assertEqual(self.lines(adopted), {self.dosa: 3, self.chai: 1})
+        second.flush(self.conn)
+        self.assertEqual(self.open_orders(), [(mine.ref, Decimal("390.00"))])
+
+    def test_new_tab_opens_once_the_other_tab_is_paid(self):
+        first, second = OpenTabs(), OpenTabs()
+        self.take(first, self.dosa, "Dosa", "120.00")
+        mine = self.take(second, self.chai, "Chai", "30.00")
+        first.flush(self.conn)
+        cursor = self.conn.cursor()
+        cursor.execute("UPDATE orders SET order_status = 'paid'")
+        cursor.close()
+
+        saved, elsewhere = second.flush(self.conn)
+        self.assertEqual(list(saved), [mine.ref])
+        self.assertEqual(elsewhere, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
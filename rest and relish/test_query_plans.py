@@ -0,0 +1,17 @@
+import contextlib
+import io
+import unittest
+
+import query_plans
+
+
+class QueryPlansTest(unittest.TestCase):
+    def test_no_unexpected_full_scans_on_sqlite(self):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            status = query_plans.main(["--backend", "sqlite"])
+        self.assertEqual(status, 0, out.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
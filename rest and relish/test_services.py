@@ -0,0 +1,55 @@
+import os
+import shutil
+import tempfile
+import unittest
+from decimal import Decimal
+
+import db
+import queries
+import services
+
+
+class PlaceOrderTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.pool = db.create_pool(db.SQLiteBackend(os.path.join(self.dir, "rest_relish.db")), size=1)
+        self.addCleanup(self.pool.close)
+        self.conn = self.pool.get_connection()
+        self.addCleanup(self.conn.close)
+        cursor = self.conn.cursor()
+        cursor.execute("INSERT INTO tables (table_number, capacity, status) VALUES ('T1', 4, 'occupied')")
+        self.table_id = cursor.lastrowid
+        cursor.execute("INSERT INTO menu_items (name, price, category) VALUES ('Dosa', 120.00, 'Mains')")
+        self.item_id = cursor.lastrowid
+        cursor.close()
+        self.items, _ = services.price_items(self.conn, [{"item_id": self.item_id, "quantity": 2}])
+
+    def table_status(self):
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT status FROM tables WHERE table_id = %s", (self.table_id,))
+        status = cursor.fetchone()[0]
+        cursor.close()
+        return status
+
+    def test_order_frees_the_table(self):
+        order = services.place_order(self.conn, self.table_id, self.items)
+        self.assertEqual(order["order_status"], "paid")
+        self.assertEqual(order["order_total"], Decimal("240.00"))
+        self.assertEqual(self.table_status(), "available")
+
+    def test_table_with_an_open_tab_is_refused(self):
+        queries.save_open_lines(self.conn, [{"ref": "a" * 32, "table_id": self.table_id,
+                                             "lines": {self.item_id: (1, Decimal("120.00"))}}])
+        with self.assertRaises(services.Conflict):
+            services.place_order(self.conn, self.table_id, self.items)
+        self.assertEqual(self.table_status(), "occupied")
+        self.assertEqual(queries.fetch_open_order(self.conn, self.table_id)[0], "a" * 32)
+
+    def test_unknown_table(self):
+        with self.assertRaises(services.Conflict):
+            services.place_order(self.conn, self.table_id + 1, self.items)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,241 @@
+"""
+Reusable widget helpers for the Rest & Relish windows.
+"""
+from bisect import bisect_left, bisect_right
+from tkinter import ttk
+
+
+class TreeSync:
+    """
+    Keeps a ttk.Treeview in step with a list of rows by applying only the
+    differences against the last snapshot, instead of deleting and
+    re-inserting every row.
+
+    Rows are keyed (e.g. by room_number) and the key doubles as the
+    Treeview iid, so selection and focus survive a refresh. The scroll
+    position is kept anchored on the row that was at the top.
+    """
+
+    def __init__(self, tree):
+        self.tree = tree
+        self._snapshot = {}   # key -> (values, tags)
+        self._order = []      # keys in display order
+
+    def sync(self, rows):
+        """rows: iterable of (key, values, tags) in display order."""
+        new = {}
+        for key, values, tags in rows:
+            new[key] = (tuple(values), tuple(tags))
+        new_order = list(new)
+        if new_order == self._order and all(self._snapshot[k] == v for k, v in new.items()):
+            return  # nothing changed
+
+        tree = self.tree
+        top_key = self._top_key()
+
+        # 1. Deletes, in a single Tk call
+        deleted = [k for k in self._order if k not in new]
+        if deleted:
+            tree.delete(*(self._iid(k) for k in deleted))
+
+        # 2. If surviving rows kept their relative order, new rows can be
+        # inserted in place; otherwise move existing rows as we go
+        survivors = [k for k in self._order if k in new]
+        reorder = survivors != [k for k in new_order if k in self._snapshot]
+
+        for index, key in enumerate(new_order):
+            values, tags = new[key]
+            old = self._snapshot.get(key)
+            if old is None:
+                tree.insert("", index, iid=self._iid(key), values=values, tags=tags)
+                continue
+            if old != (values, tags):
+                tree.item(self._iid(key), values=values, tags=tags)
+            if reorder:
+                tree.move(self._iid(key), "", index)
+
+        self._snapshot = new
+        self._order = new_order
+        self._restore_top(top_key)
+
+    def clear(self):
+        self.sync(())
+
+    def _iid(self, key):
+        return str(key)
+
+    def _top_key(self):
+        if not self._order:
+            return None
+        first = self.tree.yview()[0]
+        index = min(int(round(first * len(self._order))), len(self._order) - 1)
+        return self._order[index] if first > 0 else None
+
+    def _restore_top(self, top_key):
+        if top_key is None or top_key not in self._snapshot or not self._order:
+            return
+        self.tree.yview_moveto(self._order.index(top_key) / len(self._order))
+
+
+class TableGrid(ttk.Frame):
+    """
+    Grid of restaurant table buttons that keeps one persistent button per
+    table_id. update_tables() only changes the text of buttons whose status
+    changed, and select() only restyles the old and new selection.
+    """
+
+    def __init__(self, parent, on_select, columns=3, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.on_select = on_select
+        self.columns = columns
+        self.selected_id = None
+        self._buttons = {}   # table_id -> ttk.Button
+        self._tables = {}    # table_id -> latest table row
+        self._order = []     # table_ids in grid order
+
+    def update_tables(self, tables):
+        tables = list(tables)
+        seen = set()
+        for table in tables:
+            table_id = table['table_id']
+            seen.add(table_id)
+            old = self._tables.get(table_id)
+            self._tables[table_id] = table
+            if old is None:
+                self._buttons[table_id] = ttk.Button(
+                    self, text=self._text(table), style=self._style(table_id),
+                    command=lambda t=table_id: self.on_select(self._tables[t]))
+            elif self._text(old) != self._text(table):
+                self._buttons[table_id].config(text=self._text(table))
+
+        for table_id in [t for t in self._buttons if t not in seen]:
+            self._buttons.pop(table_id).destroy()
+            del self._tables[table_id]
+            if table_id == self.selected_id:
+                self.selected_id = None
+
+        order = [t['table_id'] for t in tables]
+        if order != self._order:
+            # Only re-grid when tables were added, removed or renumbered
+            for index, table_id in enumerate(order):
+                row, col = divmod(index, self.columns)
+                self._buttons[table_id].grid(row=row, column=col, padx=5, pady=5, ipadx=10, ipady=10)
+            self._order = order
+
+    def select(self, table_id):
+        if table_id == self.selected_id:
+            return
+        previous, self.selected_id = self.selected_id, table_id
+        for t in (previous, table_id):
+            if t in self._buttons:
+                self._buttons[t].config(style=self._style(t))
+
+    def _text(self, table):
+        return f"{table['table_number']}\n({table['status']})"
+
+    def _style(self, table_id):
+        return 'Selected.TButton' if table_id == self.selected_id else 'TButton'
+
+
+def list_loader(rows):
+    """
+    VirtualList loader over rows already in memory (e.g. the cached menu).
+    `rows` is a list of (key, values, tags) sorted by key.
+    """
+    keys = [row[0] for row in rows]
+
+    def loader(direction, key, limit, callback):
+        if direction == "after":
+            start = 0 if key is None else bisect_right(keys, key)
+            callback(rows[start:start + limit])
+        else:
+            end = len(rows) if key is None else bisect_left(keys, key)
+            callback(rows[max(0, end - limit):end])
+    return loader
+
+
+class VirtualList(ttk.Frame):
+    """
+    Scrollable Treeview that holds only a window of a (possibly huge) list.
+
+    Rows come from a keyset-paginated `loader(direction, key, limit, callback)`:
+    "after" returns up to `limit` rows following `key` (None = from the
+    start), "before" the rows preceding it, both as (key, values, tags) in
+    display order. Pages are fetched as the view nears either edge of the
+    window and rows scrolled far out of view are dropped, so at most
+    `max_rows` rows are ever held, however long the list is.
+    """
+
+    def __init__(self, parent, columns, loader, page_size=50, max_rows=200, height=10, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.page_size = page_size
+        self.max_rows = max(max_rows, 2 * page_size)
+        self.tree = ttk.Treeview(self, columns=columns, show='headings', height=height)
+        scroll = ttk.Scrollbar(self, orient="vertical", command=self.tree.yview)
+        scroll.pack(side='right', fill='y')
+        self.tree.pack(side='left', fill='both', expand=True)
+        self._scrollbar = scroll
+        self.tree.configure(yscrollcommand=self._on_scroll)
+        self._sync = TreeSync(self.tree)
+        self.loader = loader
+        self.rows = []
+        self._generation = 0
+        self._loading = False
+        self._at_start = True
+        self._at_end = False
+        self.reload()
+
+    def set_loader(self, loader):
+        self.loader = loader
+        self.reload()
+
+    def reload(self):
+        """Starts again from the top of the list."""
+        self._generation += 1
+        self.rows = []
+        self._at_start = True
+        self._at_end = False
+        self._loading = False
+        self._load("after", None, replace=True)
+
+    def _load(self, direction, key, replace=False):
+        if self.loader is None:
+            return
+        self._loading = True
+        generation = self._generation
+        self.loader(direction, key, self.page_size,
+                    lambda rows: self._on_page(generation, direction, rows, replace))
+
+    def _on_page(self, generation, direction, rows, replace):
+        if generation != self._generation:
+            return  # list was reloaded while this page was in flight
+        self._loading = False
+        rows = list(rows)
+        if replace:
+            self.rows = rows
+            self._at_end = len(rows) < self.page_size
+        elif direction == "after":
+            self.rows.extend(rows)
+            self._at_end = len(rows) < self.page_size
+            if len(self.rows) > self.max_rows:
+                del self.rows[:len(self.rows) - self.max_rows]
+                self._at_start = False
+        else:
+            self.rows[:0] = rows
+            self._at_start = len(rows) < self.page_size
+            if len(self.rows) > self.max_rows:
+                del self.rows[self.max_rows:]
+                self._at_end = False
+        self._sync.sync(self.rows)
+
+    def _on_scroll(self, first, last):
+        self._scrollbar.set(first, last)
+        if self._loading or not self.rows:
+            return
+        first, last = float(first), float(last)
+        # Prefetch when within half a page of either edge of the window
+        margin = (self.page_size / 2) / len(self.rows)
+        if last >= 1.0 - margin and not self._at_end:
+            self._load("after", self.rows[-1][0])
+        elif first <= margin and not self._at_start:
+            self._load("before", self.rows[0][0])